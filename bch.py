@@ -2,7 +2,7 @@
 # vim: set ts=4 sw=4 tw=0 et pm=:
 from fec import stringify, listify
 
-def nndivide(poly,num): # both args as int
+def nndivide_bits(poly,num): # both args as int, bit-by-bit reference version
     if(num==0):
         return 0
     bits=num.bit_length()-poly.bit_length()
@@ -15,6 +15,32 @@ def nndivide(poly,num): # both args as int
         bits-=1
     return num
 
+# Remainder tables (CRC style, 8 bits at a time) for the polys in CODES.
+# Division is linear in GF(2), so the remainder of a number is the xor of
+# the remainders of its bytes: div_tables[poly][k][x] = (x<<8*k) % poly
+# They are set up (with the syndromes) on the first division by a poly.
+div_tables={}
+
+def mk_div_tables(poly):
+    tables=[]
+    for k in range(4):
+        t=[0]*256
+        for b in range(8):
+            r=nndivide_bits(poly, 1<<(8*k+b))
+            for x in range(1<<b):
+                t[x|(1<<b)]=t[x]^r
+        tables.append(t)
+    div_tables[poly]=tables
+
+def nndivide(poly,num): # both args as int
+    if poly in div_tables and num>>32==0:
+        (t0,t1,t2,t3)=div_tables[poly]
+        return t0[num&0xff]^t1[(num>>8)&0xff]^t2[(num>>16)&0xff]^t3[num>>24]
+    if poly in CODES and poly not in div_tables:
+        setup(poly)
+        return nndivide(poly,num)
+    return nndivide_bits(poly,num)
+
 def ndivide(poly,bits):
     num=int(bits,2)
     return nndivide(poly,num)
@@ -102,19 +128,20 @@ def repair(a,b): # "repair" two bit errors by brute force.
                 return (2,bnum2str)
     return(-1,b)
 
+def nnrepair1(poly, num, blen): # "repair" one bit error by brute force (int version)
+    if nndivide(poly, num)==0:
+        return (0, num)
+    for b1 in range(blen):
+        bnum1=num^(1<<b1)
+        if nndivide(poly, bnum1)==0:
+            return (1, bnum1)
+    return (-1, num)
+
 def nrepair1(a,b): # "repair" one bit error by brute force.
-    r=ndivide(a,b)
-    if(r==0):
-        return (0,b)
-    blen=len(b)
-    bnum=int(b,2)
-    for b1 in range(len(b)):
-        bnum1=bnum^(1<<b1)
-        r=nndivide(a,bnum1)
-        if(r==0):
-            bnum1str=("{0:0%db}"%blen).format(bnum1)
-            return (1,bnum1str)
-    return(-1,b)
+    (errs,bnum)=nnrepair1(a, int(b,2), len(b))
+    if errs<=0:
+        return (errs,b)
+    return (errs,("{0:0%db}"%len(b)).format(bnum))
 
 def nrepair2(a,b): # "repair" two bit errors by brute force.
     r=ndivide(a,b)
@@ -138,19 +165,53 @@ def nrepair2(a,b): # "repair" two bit errors by brute force.
                 return (2,bnum2str)
     return(-1,b)
 
-def nrepair(poly, b): # "repair" any bit errors by syndromes
-    r=nndivide(poly, int(b,2))
+def nnrepair(poly, num): # "repair" any bit errors by syndromes (int version)
+    r=nndivide(poly, num)
     if(r==0):
-        return (0,b)
+        return (0,num)
     if syndromes[poly][r] is None: # uncorrectable
-        return(-1,b)
+        return(-1,num)
 
     ecnt, eloc = syndromes[poly][r]
-    bnum=eloc ^ int(b,2)
+    return (ecnt,eloc ^ num)
+
+def nrepair(poly, b): # "repair" any bit errors by syndromes
+    (ecnt,bnum)=nnrepair(poly, int(b,2))
+    if ecnt<=0:
+        return (ecnt,b)
 
     fstr="{0:0%db}"%len(b)
     return (ecnt,fstr.format(bnum))
 
+# Batch versions working on numpy arrays of up to 32-bit blocks.
+# Division is linear in GF(2), so the remainder of a block is the xor of
+# the remainders of its four bytes, which are looked up in tables.
+batch_tables={}
+
+def mk_batch_tables(poly):
+    import numpy as np
+    if poly not in syndromes:
+        setup(poly)
+    rem=np.array(div_tables[poly], dtype=np.uint32)
+    ecnt=np.array([-1 if v is None else v[0] for v in syndromes[poly]], dtype=np.int8)
+    ecnt[0]=0
+    eloc=np.array([0 if v is None else v[1] for v in syndromes[poly]], dtype=np.uint32)
+    batch_tables[poly]=(rem, ecnt, eloc)
+    return batch_tables[poly]
+
+def nndivide_batch(poly, nums): # nums as numpy array (or list) of ints
+    import numpy as np
+    rem=(batch_tables.get(poly) or mk_batch_tables(poly))[0]
+    nums=np.asarray(nums, dtype=np.uint32)
+    return rem[0][nums&0xff]^rem[1][(nums>>8)&0xff]^rem[2][(nums>>16)&0xff]^rem[3][nums>>24]
+
+def nnrepair_batch(poly, nums): # nnrepair for many blocks, returns arrays (errs, repaired)
+    import numpy as np
+    (_, ecnt, eloc)=batch_tables.get(poly) or mk_batch_tables(poly)
+    nums=np.asarray(nums, dtype=np.uint32)
+    r=nndivide_batch(poly, nums)
+    return (ecnt[r], nums^eloc[r])
+
 def bch_repair1(poly,bits):
     (errs,repaired)=nrepair1(poly,bits)
     return (errs,repaired[:-poly.bit_length()+1],repaired[-poly.bit_length()+1:])
@@ -165,15 +226,19 @@ def bch_repair(poly,bits):
 
 def mk_syn(poly, bits, synbits, errors=1, debug=False):
     assert errors in (1,2,3)
+    mk_div_tables(poly)
     syndromes[poly]=[None]*(2**(synbits))
 
     if debug:
         print("Creating syndromes for poly=%d with %d bits and max %d bit-errors"%(poly, bits, errors))
         print("Max syndrome value is: 2^%d = %d"%(synbits, 2**synbits))
 
+    # remainders of single bits, the one of several bits is their xor
+    rems=[nndivide(poly,1<<n) for n in range(bits)]
+
     for n1 in range(0,bits):
         val=(1<<n1)
-        r=nndivide(poly,val)
+        r=rems[n1]
         if debug:
             print(("1 {:0%db} -> {:4d} / {:0%db}"%(bits,synbits)).format(val,r,r))
         syndromes[poly][r]=(1, val)
@@ -182,7 +247,7 @@ def mk_syn(poly, bits, synbits, errors=1, debug=False):
         for n1 in range(0,bits):
             for n2 in range(n1+1,bits):
                 val=(1<<n1)|(1<<n2)
-                r=nndivide(poly,val)
+                r=rems[n1]^rems[n2]
                 if debug:
                     print(("2 {:0%db} -> {:4d} / {:0%db}"%(bits,synbits)).format(val,r,r))
                 if syndromes[poly][r] is None:
@@ -195,7 +260,7 @@ def mk_syn(poly, bits, synbits, errors=1, debug=False):
             for n2 in range(n1+1,bits):
                 for n3 in range(n2+1,bits):
                     val=(1<<n1)|(1<<n2)|(1<<n3)
-                    r=nndivide(poly,val)
+                    r=rems[n1]^rems[n2]^rems[n3]
                     if debug:
                         print(("3 {:0%db} -> {:4d} / {:0%db}"%(bits,synbits)).format(val,r,r))
                     if syndromes[poly][r] is None:
@@ -222,15 +287,62 @@ def print_syn(syndromes, bits=31, synbits=10):
 
 syndromes={}
 
+# poly: (bits, synbits, errors)
+CODES={
+    29:   (7,  4,  1),
+    465:  (14, 8,  2),
+    41:   (26, 5,  1),
+    1897: (31, 10, 2),
+    1207: (31, 10, 2),
+    3545: (31, 11, 2),
+}
+
+def setup(poly, debug=False):
+    (bits, synbits, errors)=CODES[poly]
+    mk_syn(poly=poly, bits=bits, synbits=synbits, errors=errors, debug=debug)
+
 def init(debug=False):
-    mk_syn(poly=29,   bits=7,  synbits=4,            debug=debug)
-    mk_syn(poly=465,  bits=14, synbits=8,  errors=2, debug=debug)
-    mk_syn(poly=41,   bits=26, synbits=5,            debug=debug)
-    mk_syn(poly=1897, bits=31, synbits=10, errors=2, debug=debug)
-    mk_syn(poly=1207, bits=31, synbits=10, errors=2, debug=debug)
-    mk_syn(poly=3545, bits=31, synbits=11, errors=2, debug=debug)
+    for poly in CODES:
+        setup(poly, debug=debug)
 
-if __name__ == "__main__":
-    init(True)
-else:
+def bench(count=100000):
+    import random
+    import timeit
     init()
+    random.seed(1)
+    print("%-5s %-10s %10s %10s %6s"%("poly","blocks","bits[us]","table[us]","gain"))
+    for (poly, bits, errs) in ((29, 7, 1), (465, 14, 2), (41, 26, 1), (1897, 31, 2), (1207, 31, 2), (3545, 31, 2)):
+        rnd=[random.getrandbits(bits) for _ in range(count)]
+        # valid codewords with up to errs injected bit errors
+        inj=[]
+        for _ in range(count):
+            data=random.getrandbits(bits-poly.bit_length()+1)<<(poly.bit_length()-1)
+            num=data^nndivide_bits(poly, data)
+            for b in random.sample(range(bits), random.randint(0, errs)):
+                num^=1<<b
+            inj.append(num)
+        for (name, nums) in (("random", rnd), ("injected", inj)):
+            assert all(nndivide(poly, x)==nndivide_bits(poly, x) for x in nums)
+            t_bits=timeit.timeit(lambda: [nndivide_bits(poly, x) for x in nums], number=1)
+            t_tbl =timeit.timeit(lambda: [nndivide(poly, x) for x in nums], number=1)
+            print("%-5d %-10s %10.3f %10.3f %5.1fx"%(poly, name, t_bits/count*1e6, t_tbl/count*1e6, t_bits/t_tbl))
+    try:
+        import numpy as np
+    except ImportError:
+        return
+    print()
+    print("%-5s %-10s %10s %10s %6s"%("poly","blocks","repair[us]","batch[us]","gain"))
+    for poly in CODES:
+        (bits, _, errs)=CODES[poly]
+        nums=np.array([random.getrandbits(bits) for _ in range(count)], dtype=np.uint32)
+        mk_batch_tables(poly)
+        t_one  =timeit.timeit(lambda: [nnrepair(poly, x) for x in nums.tolist()], number=1)
+        t_batch=timeit.timeit(lambda: nnrepair_batch(poly, nums), number=1)
+        print("%-5d %-10s %10.3f %10.3f %5.1fx"%(poly, "random", t_one/count*1e6, t_batch/count*1e6, t_one/t_batch))
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv)>1 and sys.argv[1]=="bench":
+        bench()
+    else:
+        init(True)
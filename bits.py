@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# vim: set ts=4 sw=4 tw=0 et pm=:
+
+# Packed bit vector used by bitsparser instead of '0'/'1' strings.
+#
+# A Bits object holds the bits as a python int (first bit is the MSB) plus
+# the number of bits. It behaves like the old bit strings where that is
+# convenient (slicing, indexing, len, +, ==, count, startswith, "%s"),
+# but int(x) is free and the string form is only created when printed.
+
+REV8 = [int(format(x, "08b")[::-1], 2) for x in range(256)]
+
+class Bits(object):
+    __slots__ = ('val', 'len')
+
+    def __init__(self, val=0, length=0):
+        self.val = val
+        self.len = length
+
+    @classmethod
+    def fromstr(cls, bits):
+        if not bits:
+            return cls(0, 0)
+        return cls(int(bits, 2), len(bits))
+
+    @classmethod
+    def cat(cls, parts):
+        """concatenate an iterable of Bits"""
+        val = 0
+        length = 0
+        for p in parts:
+            val = (val << p.len) | p.val
+            length += p.len
+        return cls(val, length)
+
+    def __len__(self):
+        return self.len
+
+    def __int__(self):
+        return self.val
+
+    def __bool__(self):
+        return self.len > 0
+
+    def __str__(self):
+        if self.len == 0:
+            return ""
+        return format(self.val, "0%db" % self.len)
+
+    def __repr__(self):
+        return "Bits('%s')" % str(self)
+
+    def __format__(self, spec):
+        return format(str(self), spec)
+
+    def __iter__(self):
+        return iter(str(self))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.len)
+            if step == 1:
+                if stop <= start:
+                    return Bits(0, 0)
+                n = stop - start
+                return Bits((self.val >> (self.len - stop)) & ((1 << n) - 1), n)
+            if step == -1 and key.start is None and key.stop is None:
+                return self.reverse()
+            return Bits.fromstr(str(self)[key])
+        if key < 0:
+            key += self.len
+        if key < 0 or key >= self.len:
+            raise IndexError("Bits index out of range")
+        return "1" if (self.val >> (self.len - 1 - key)) & 1 else "0"
+
+    def __add__(self, other):
+        if isinstance(other, str):
+            other = Bits.fromstr(other)
+        elif not isinstance(other, Bits):
+            return NotImplemented
+        return Bits((self.val << other.len) | other.val, self.len + other.len)
+
+    def __radd__(self, other):
+        if isinstance(other, str):
+            return other + str(self)
+        return NotImplemented
+
+    def __eq__(self, other):
+        if isinstance(other, Bits):
+            return self.len == other.len and self.val == other.val
+        if isinstance(other, str):
+            return self.len == len(other) and str(self) == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def reverse(self):
+        pad = -self.len % 8
+        raw = (self.val << pad).to_bytes((self.len + pad) // 8, "big")
+        return Bits(int.from_bytes(bytes(REV8[x] for x in reversed(raw)), "big"), self.len)
+
+    def count(self, sub):
+        if sub == "1":
+            return bin(self.val).count("1")
+        if sub == "0":
+            return self.len - bin(self.val).count("1")
+        return str(self).count(sub)
+
+    def startswith(self, prefix):
+        if isinstance(prefix, str):
+            prefix = Bits.fromstr(prefix)
+        if prefix.len > self.len:
+            return False
+        return (self.val >> (self.len - prefix.len)) == prefix.val
+
+    def diff(self, other):
+        """number of differing bits (compared up to the shorter length)"""
+        if isinstance(other, str):
+            other = Bits.fromstr(other)
+        a, b = self.val, other.val
+        if self.len > other.len:
+            a >>= self.len - other.len
+        elif other.len > self.len:
+            b >>= other.len - self.len
+        return bin(a ^ b).count("1")
+
+    def ints(self, n):
+        """split into n-bit chunks (last one may be shorter) and return their values"""
+        full, rest = divmod(self.len, n)
+        val = self.val
+        tail = []
+        if rest:
+            tail = [val & ((1 << rest) - 1)]
+            val >>= rest
+        if n == 8:
+            return list(val.to_bytes(full, "big")) + tail
+        mask = (1 << n) - 1
+        out = [0] * full
+        for i in range(full - 1, -1, -1):
+            out[i] = val & mask
+            val >>= n
+        return out + tail
+
+
+class BitPermutation(object):
+    """Reorder bits according to fixed index lists, using per-byte lookup tables.
+
+    Each entry of `orders` is a list of input bit indices (0 = first bit);
+    calling the object returns one Bits per entry.
+    """
+    def __init__(self, nbits, orders):
+        self.nbits = nbits
+        self.lens = [len(o) for o in orders]
+        order = [i for o in orders for i in o]
+        out = len(order)
+        contrib = [0] * nbits
+        for pos, idx in enumerate(order):
+            contrib[nbits - 1 - idx] |= 1 << (out - 1 - pos)
+        self.tables = []
+        for c in range(0, nbits, 8):
+            tbl = [0] * 256
+            for x in range(1, 256):
+                low = x & -x
+                b = low.bit_length() - 1
+                tbl[x] = tbl[x ^ low] | (contrib[c + b] if c + b < nbits else 0)
+            self.tables.append(tbl)
+        self.out = out
+
+    def __call__(self, bits):
+        val = bits.val
+        res = 0
+        for tbl in self.tables:
+            res |= tbl[val & 0xff]
+            val >>= 8
+        parts = []
+        left = self.out
+        for n in self.lens:
+            left -= n
+            parts.append(Bits((res >> left) & ((1 << n) - 1), n))
+        return tuple(parts)
+
+
+def symbol_reverse(bits):
+    """swap the two bits of every symbol (a trailing odd bit stays in place)"""
+    n = bits.len
+    val = bits.val
+    odd = n % 2
+    if odd:
+        last = val & 1
+        val >>= 1
+    mask = ((1 << (n - odd)) - 1) // 3 # 0b0101...01
+    val = ((val >> 1) & mask) | ((val & mask) << 1)
+    if odd:
+        val = (val << 1) | last
+    return Bits(val, n)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# vim: set ts=4 sw=4 tw=0 et pm=:
+
+# Binary container for the RAW: lines written by the extractor.
+#
+# Each burst is a fixed header (timestamp, frequency, SNR/noise, id,
+# confidence, level, symbol count...) followed by its bits packed 8 per
+# byte. Only lines in the exact format of the extractor are stored that
+# way, everything else (other formats, broken lines) is kept as text, so
+# converting back gives the original file. Every BLOCK lines the index at
+# the end of the file gets an entry with the offset, the line number and
+# the timestamp range, which allows to start reading at a given time.
+#
+# Reading maps the file and unpacks the headers in place. Bursts come out
+# as the fields Message() would get from the text line (see to_line()).
+#
+# File layout:
+#   MAGIC, records..., index, trailer
+#   burst:    HDR, bits
+#   filename: FNAME, name (defines the name index used by the bursts)
+#   text:     TEXT, line
+#   index:    INDEX, names (FNAME, name)..., blocks (BLOCK)...
+#   trailer:  TRAILER (offset of the index, END)
+
+import re
+import sys
+import mmap
+import struct
+
+from bits import Bits
+
+MAGIC=b"IRBITS\x00\x01"
+END=b"IRBINDEX"
+
+KINDS=["RAW", "RWA", "NC1"]
+T_FNAME=3
+T_TEXT=4
+T_INDEX=5
+
+F_ACCESS=1 # "A:OK" instead of "N:snr-noise"
+
+# tag/kind, flags, filename, timestamp/10^-4, frequency, snr/10^-2,
+# noise/10^-2, id, confidence, level/10^-5, raw length, bits
+HDR=struct.Struct("<BBHqIhhQBIHH")
+FNAME=struct.Struct("<BHH")
+TEXT=struct.Struct("<BI")
+INDEX=struct.Struct("<BII")
+BLOCK=struct.Struct("<QQqq")
+TRAILER=struct.Struct("<Q8s")
+
+BLOCK_LINES=1024
+
+line_p=re.compile(r"(RAW|RWA|NC1): (\S+) (\d+\.\d{4}) (\d+) (?:N:(\d+\.\d\d)([+-]\d+\.\d\d)|A:(OK)) I:(\d+) +(\d+)% (\d+\.\d{5}) +(\d+) ([01]*)$")
+
+def to_line(g):
+    """The text line for the fields of a burst"""
+    if g[4] is not None:
+        sn="N:%05.2f%+06.2f"%(g[4], g[5])
+    else:
+        sn="A:"+g[6]
+    return "%s: %s %012.4f %010d %s I:%s %3d%% %.5f %3d %s"%(g[0], g[1], g[2], g[3], sn, g[7], g[8], g[9], g[10], g[11])
+
+def fields(names, hdr, bits):
+    (kind, flags, fn, ts, freq, snr, noise, id, conf, level, rawlen, _)=hdr
+    if flags & F_ACCESS:
+        (snr, noise, access)=(None, None, "OK")
+    else:
+        (snr, noise, access)=(snr/100, noise/100, None)
+    # Message() turns a level of 0.00000 into 0.000001
+    return (KINDS[kind], names[fn], ts/10000, freq, snr, noise, access, "%011d"%id, conf, level/100000 or 0.000001, rawlen, bits, "")
+
+def is_bitsfile(filename):
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(MAGIC))==MAGIC
+    except OSError:
+        return False
+
+class BitsFile(object):
+    def __init__(self, filename):
+        self.file=open(filename, "rb")
+        self.mm=mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buf=memoryview(self.mm)
+        if self.buf[:len(MAGIC)]!=MAGIC:
+            self.close()
+            raise ValueError("%s: not a bits container"%filename)
+        self.names=[]
+        self.blocks=[]
+        self.end=len(self.mm)
+        self.pos=len(MAGIC)
+        if self.end>=len(MAGIC)+TRAILER.size:
+            (index, end)=TRAILER.unpack_from(self.buf, self.end-TRAILER.size)
+            if end==END:
+                self.read_index(index)
+                self.end=index
+
+    def tell(self):
+        return self.pos
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.buf.release()
+        self.mm.close()
+        self.file.close()
+
+    def read_index(self, pos):
+        (_, nnames, nblocks)=INDEX.unpack_from(self.buf, pos)
+        pos+=INDEX.size
+        for _ in range(nnames):
+            pos=self.read_name(pos)
+        for _ in range(nblocks):
+            self.blocks.append(BLOCK.unpack_from(self.buf, pos))
+            pos+=BLOCK.size
+
+    def read_name(self, pos):
+        (_, idx, n)=FNAME.unpack_from(self.buf, pos)
+        pos+=FNAME.size
+        self.names[len(self.names):idx+1]=[None]*(idx+1-len(self.names))
+        self.names[idx]=str(self.buf[pos:pos+n], "utf-8")
+        return pos+n
+
+    def records(self, start=None, end=None):
+        """(lineno, fields) for every line, fields are the text line for
+        lines not stored as burst. With start/end (in ms) only the bursts
+        in that time range and no text lines are returned."""
+        ranged=start is not None or end is not None
+        if not ranged or not self.blocks:
+            spans=[(len(MAGIC), self.end, 0)]
+        else:
+            spans=[]
+            stops=[b[0] for b in self.blocks[1:]]+[self.end]
+            for ((offset, first, lo, hi), stop) in zip(self.blocks, stops):
+                if (start is None or hi/10000>=start) and (end is None or lo/10000<=end):
+                    spans.append((offset, stop, first))
+        for (pos, stop, lineno) in spans:
+            yield from self.scan(pos, stop, lineno, ranged, start, end)
+        self.pos=self.end
+
+    def scan(self, pos, stop, lineno, ranged, start, end):
+        buf=self.buf
+        names=self.names
+        unpack=HDR.unpack_from
+        hsize=HDR.size
+        while pos<stop:
+            self.pos=pos
+            tag=buf[pos]
+            if tag<T_FNAME:
+                hdr=unpack(buf, pos)
+                pos+=hsize
+                nbits=hdr[11]
+                n=(nbits+7)//8
+                bits=Bits(int.from_bytes(buf[pos:pos+n], "big")>>(n*8-nbits), nbits)
+                pos+=n
+                lineno+=1
+                if ranged:
+                    ts=hdr[3]/10000
+                    if (start is not None and ts<start) or (end is not None and ts>end):
+                        continue
+                yield (lineno, fields(names, hdr, bits))
+            elif tag==T_FNAME:
+                pos=self.read_name(pos)
+            elif tag==T_TEXT:
+                (_, n)=TEXT.unpack_from(buf, pos)
+                pos+=TEXT.size
+                lineno+=1
+                if not ranged:
+                    yield (lineno, str(buf[pos:pos+n], "utf-8"))
+                pos+=n
+            else:
+                break
+
+class BitsWriter(object):
+    def __init__(self, out):
+        self.out=out
+        self.names={}
+        self.blocks=[]
+        self.lines=0
+        self.block=None
+        self.pos=len(MAGIC)
+        out.write(MAGIC)
+
+    def write(self, data):
+        self.out.write(data)
+        self.pos+=len(data)
+
+    def name(self, filename):
+        if filename not in self.names:
+            idx=len(self.names)
+            self.names[filename]=idx
+            self.write(self.pack_name(idx, filename))
+        return self.names[filename]
+
+    @staticmethod
+    def pack_name(idx, filename):
+        name=filename.encode("utf-8")
+        return FNAME.pack(T_FNAME, idx, len(name))+name
+
+    def add(self, line):
+        """add a line (without newline)"""
+        if self.lines%BLOCK_LINES==0:
+            self.end_block()
+            self.block=[self.pos, self.lines, None, None]
+        self.lines+=1
+        m=line_p.match(line)
+        if m:
+            g=m.groups()
+            fn=self.name(g[1])
+            ts=round(float(g[2])*10000)
+            if g[4] is not None:
+                (flags, snr, noise)=(0, round(float(g[4])*100), round(float(g[5])*100))
+            else:
+                (flags, snr, noise)=(F_ACCESS, 0, 0)
+            bits=g[11]
+            hdr=(KINDS.index(g[0]), flags, fn, ts, int(g[3]), snr, noise, int(g[7]),
+                    int(g[8]), round(float(g[9])*100000), int(g[10]), len(bits))
+            try:
+                rec=HDR.pack(*hdr)
+            except struct.error:
+                rec=None
+            # only if it converts back to the same line
+            if rec and to_line(fields({fn: g[1]}, hdr, bits))==line:
+                n=(len(bits)+7)//8
+                if n:
+                    rec+=(int(bits, 2)<<(n*8-len(bits))).to_bytes(n, "big")
+                self.write(rec)
+                b=self.block
+                if b[2] is None or ts<b[2]:
+                    b[2]=ts
+                if b[3] is None or ts>b[3]:
+                    b[3]=ts
+                return
+        text=line.encode("utf-8")
+        self.write(TEXT.pack(T_TEXT, len(text))+text)
+
+    def end_block(self):
+        b=self.block
+        if b is not None and b[2] is not None:
+            self.blocks.append(tuple(b))
+
+    def close(self):
+        self.end_block()
+        index=self.pos
+        self.write(INDEX.pack(T_INDEX, len(self.names), len(self.blocks)))
+        for (filename, idx) in self.names.items():
+            self.write(self.pack_name(idx, filename))
+        for b in self.blocks:
+            self.write(BLOCK.pack(*b))
+        self.write(TRAILER.pack(index, END))
+
+def main():
+    import argparse
+    parser=argparse.ArgumentParser(description="Convert between .bits text files and the binary container")
+    parser.add_argument("mode", choices=["pack", "unpack"], help="text to binary or binary to text")
+    parser.add_argument("input", help="input file, - for stdin (pack only)")
+    parser.add_argument("output", nargs="?", default="-", help="output file (default: stdout)")
+    parser.add_argument("--start", type=float, help="unpack: skip bursts before this timestamp (ms)")
+    parser.add_argument("--end", type=float, help="unpack: stop at bursts after this timestamp (ms)")
+    args=parser.parse_args()
+
+    if args.mode=="pack":
+        src=sys.stdin if args.input=="-" else open(args.input, "rt")
+        out=sys.stdout.buffer if args.output=="-" else open(args.output, "wb")
+        w=BitsWriter(out)
+        for line in src:
+            w.add(line.rstrip("\n"))
+        w.close()
+        out.close()
+    else:
+        bf=BitsFile(args.input)
+        out=sys.stdout if args.output=="-" else open(args.output, "wt")
+        for (_, g) in bf.records(args.start, args.end):
+            if isinstance(g, str):
+                print(g, file=out)
+            else:
+                print(to_line(g), file=out)
+        out.close()
+
+if __name__=="__main__":
+    main()
@@ -7,14 +7,17 @@ import re
 import struct
 import fileinput
 import datetime
+import collections
 from math import sqrt,atan2,pi,log
 
 import crcmod
-from bch import ndivide, nrepair, bch_repair, bch_repair1
+from bch import nndivide, nnrepair, nnrepair1
 import rs
 import rs6
 
 from util import *
+from bits import Bits, BitPermutation, symbol_reverse, REV8
+from bitsfile import to_line
 import itl
 
 iridium_access="001100000011000011110011" # Actually 0x789h in BPSK
@@ -31,6 +34,14 @@ messaging_bch_poly=1897
 ringalert_bch_poly=1207
 acch_bch_poly=3545 # 1207 also works?
 hdr_poly=29 # IBC header
+fill_pattern=Bits.fromstr("1010001001110011101111110110110101010100010001011100001011100110")
+
+iridium_access_b=Bits.fromstr(iridium_access)
+uplink_access_b=Bits.fromstr(uplink_access)
+next_access_dl_b=Bits.fromstr(next_access_dl)
+next_access_ul_b=Bits.fromstr(next_access_ul)
+header_messaging_b=Bits.fromstr(header_messaging)
+header_time_location_b=Bits.fromstr(header_time_location)
 
 f_doppler= 36e3  # maximum doppler_shift
 f_jitter=   1e3  # iridium-extractor precision
@@ -42,129 +53,303 @@ f_duplex  = (1625979e3 + f_doppler + f_jitter ) * (1+ sdr_ppm) # upper bound for
 # commandline arguments
 args = None
 
+# counters shown by --stats, name -> Counter
+counters = collections.defaultdict(collections.Counter)
+counters["RS8"] = rs.codec.stats
+counters["RS6"] = rs6.codec.stats
+
 def set_opts(new_args):
-    global args
+    global args, filter_plan
     args = new_args
+    # the error outputs report the same lines as without the push-down
+    filter_plan = FilterPlan(args.linefilter, pushdown=args.errorfile is None and args.errorstats is None)
 
 class ParserError(Exception):
     def __init__(self, message):
         super().__init__(message)
         self.cls=sys._getframe(1).f_locals['self'].__class__.__name__
 
+class DecodeCache(object):
+    """Bounded LRU cache for deterministic decode steps.
+
+    Repeated frames (broadcasts, ring alerts, ITL) decode to the same fields,
+    so the attributes a step sets (and the ParserError it raises) are stored
+    under a key made of everything the step reads and replayed on a hit.
+    Cached values are shared between messages and must not be modified.
+    """
+    def __init__(self, name, size=4096, mutated=()):
+        self.size=size
+        self.mutated=mutated # attributes the step modifies in place
+        self.entries=collections.OrderedDict()
+        self.stats=counters["cache "+name]
+
+    def run(self, msg, key, step):
+        entry=self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.stats["hit"]+=1
+            (cls, changed, removed, errors, exc)=entry
+            msg.__dict__.update(changed)
+            for k in self.mutated:
+                msg.__dict__[k]=list(changed[k])
+            for k in removed:
+                del msg.__dict__[k]
+            for e in errors:
+                if not msg.error_msg or msg.error_msg[-1] != e:
+                    msg.error_msg.append(e)
+            if exc is not None:
+                e=ParserError(exc[0])
+                e.cls=exc[1]
+                raise e
+            res=cls.__new__(cls)
+            res.__dict__=msg.__dict__
+            return res
+
+        self.stats["miss"]+=1
+        before=dict(msg.__dict__)
+        nerr=len(msg.error_msg)
+        res=None
+        exc=None
+        try:
+            res=step(msg)
+        except ParserError as e:
+            err=e
+            exc=(str(e), e.cls)
+        if res is None or res.__dict__ is msg.__dict__:
+            after=msg.__dict__
+            changed={k: v for (k, v) in after.items() if k not in before or before[k] is not v}
+            for k in self.mutated:
+                changed[k]=list(after[k])
+            removed=[k for k in before if k not in after]
+            self.entries[key]=(type(res), changed, removed, msg.error_msg[nerr:], exc)
+            if len(self.entries)>self.size:
+                self.entries.popitem(last=False)
+        if exc is not None:
+            raise err
+        return res
+
+itl_cache=DecodeCache("ITL")
+ibc_cache=DecodeCache("IBC")
+ira_cache=DecodeCache("IRA", mutated=("descrambled",))
+
+def bits_key(x):
+    if isinstance(x, Bits):
+        return (x.val, x.len)
+    return x
+
 tswarning=False
 tsoffset=0
 maxts=0
 
+# filename formats carrying the recording start time
+fn_ts_p       = re.compile(r"i-(\d+)-t1$")
+fn_ts_old_p   = re.compile(r"(\d\d)-(\d\d)-(20\d\d)T(\d\d)-(\d\d)-(\d\d)-[sr]1")
+fn_ts_b26_p   = re.compile(r"i-(\d+(?:\.\d+)?)-[vbsrtl]1.([a-z])([a-z])")
+fn_ts_float_p = re.compile(r"i-(\d+(?:\.\d+)?)-[vbsrtl]1(?:-o[+-]\d+)?$")
+
+def fallback_ts(timestamp):
+    """Make up a monotonic time for files without start time in their name"""
+    global tswarning,tsoffset,maxts
+    if not tswarning:
+        print("Warning: no timestamp found in filename", file=sys.stderr)
+        tswarning=True
+    ts=tsoffset+float(timestamp)/1000
+    if ts<maxts:
+        tsoffset=maxts
+        ts=tsoffset+float(timestamp)/1000
+    maxts=ts
+    return ts
+
+# filename -> (startts, timestamp offset, b26, fileinfo), None if the name
+# has no start time
+fn_info={}
+
+def parse_filename(filename):
+    if filename in fn_info:
+        return fn_info[filename]
+    info=None
+    # Current format:
+    mm=fn_ts_p.match(filename)
+    if mm:
+        startts=int(mm.group(1))
+        info=(startts, 0, None, "p-%d"%startts)
+    # Older file formats:
+    if info is None:
+        mm=fn_ts_old_p.match(filename)
+        if mm:
+            month, day, year, hour, minute, second = map(int, mm.groups())
+            ts=datetime.datetime(year,month,day,hour,minute,second)
+            startts=int(ts.timestamp())
+            info=(startts, 0, None, "p-%d"%startts)
+    if info is None:
+        b26=None
+        mm=fn_ts_b26_p.match(filename)
+        if mm:
+            b26=(ord(mm.group(2))-ord('a'))*26+ ord(mm.group(3))-ord('a')
+            startts=float(mm.group(1))+b26*600
+        else:
+            mm=fn_ts_float_p.match(filename)
+            if mm:
+                startts=float(mm.group(1))
+        if mm:
+            offset=0
+            if startts != int(startts):
+                offset=(startts%1)*(10**3)
+            startts=int(startts)
+            info=(startts, offset, b26, "p-%d"%startts)
+    fn_info[filename]=info
+    return info
+
+def track_ts(line):
+    """Advance the fallback_ts() state exactly as Message(line) would"""
+    if not isinstance(line, str):
+        if parse_filename(line[1]) is None:
+            fallback_ts(line[2])
+        return
+    filename=line.split(" ",2)[1:2]
+    if filename and filename[0] in fn_info:
+        if fn_info[filename[0]] is not None:
+            return
+    g=tokenize(line)
+    if not g:
+        return
+    if parse_filename(g[1]) is None:
+        fallback_ts(float(g[2]))
+
+def tokenize(line):
+    """The fields of an input line (Message.p groups), None if it doesn't match"""
+    m=Message.p.match(line)
+    if m:
+        return m.groups()
+    return None
+
+class lazy(object):
+    """Attribute computed by func on first access and then kept in __dict__"""
+    def __init__(self, func):
+        self.func=func
+        self.name=func.__name__
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        val=obj.__dict__[self.name]=self.func(obj)
+        return val
+
 class Message(object):
     p = re.compile(r'(RAW|RWA|NC1): ([^ ]*) (-?[\d.]+) (\d+) (?:N:([+-]?\d+(?:\.\d+)?)([+-]\d+(?:\.\d+)?)|A:(\w+)) [IL]:(\w+) +(\d+)% ([\d.]+|inf|nan) +(\d+) ([\[\]<> 01]+)(.*)')
     parse_error=False
     error=False
-    def __init__(self,line):
+    def __init__(self,line,lineno=None):
         self.error_msg=[]
-        self.lineno=fileinput.lineno()
-        m=self.p.match(line)
-        if(args.errorfile != None):
-            self.line=line
-        if(not m):
+        if lineno is None:
+            lineno=fileinput.lineno()
+        self.lineno=lineno
+        if isinstance(line, str):
+            g=tokenize(line)
+            if(args.errorfile != None):
+                self.line=line
+        else: # already split, from a bits container
+            g=line
+            if(args.errorfile != None):
+                self.line=to_line(g)
+        if(not g):
             self._new_error("Couldn't parse: "+line)
             self.parse_error=True
             return
-        self.swapped = (m.group(1) != "RWA")
-        self.next = (m.group(1) == "NC1")
-        self.filename=m.group(2)
+        self.swapped = (g[0] != "RWA")
+        self.next = (g[0] == "NC1")
+        self.filename=g[1]
         if self.filename=="/dev/stdin":
             self.filename="-";
-        self.timestamp=float(m.group(3))
+        self.timestamp=float(g[2])
         if self.timestamp<0 or self.timestamp>1000*60*60*24*999: # 999d
             self._new_error("Timestamp out of range")
-        self.frequency=int(m.group(4))
-
-        if args.channelize:
-            self.freq_print=channelize_str(self.frequency)
-        else:
-            self.freq_print="%010d"%(self.frequency)
+        self.frequency=int(g[3])
 
-        if m.group(5) is not None:
-            self.snr=float(m.group(5))
-            self.noise=float(m.group(6))
+        if g[4] is not None:
+            self.snr=float(g[4])
+            self.noise=float(g[5])
         else:
-            self.access_ok=(m.group(7)=="OK")
+            self.access_ok=(g[6]=="OK")
 
-        self.id=m.group(8)
+        self.id=g[7]
 
-        self.confidence=int(m.group(9))
-        self.level=float(m.group(10))
+        self.confidence=int(g[8])
+        self.level=float(g[9])
         if self.level==0:
-            self.level=float(m.group(10)+"1")
-        self.leveldb=20*log(self.level,10)
-#        self.raw_length=m.group(11)
-        self.bitstream_raw=(re.sub(r"[\[\]<> ]","",m.group(12))) # raw bitstring with correct symbols
-        if self.swapped:
-            self.bitstream_raw=symbol_reverse(self.bitstream_raw)
-        self.symbols=len(self.bitstream_raw)//2
-        if m.group(13):
-            self.extra_data=m.group(13)
+            self.level=float(g[9]+"1")
+#        self.raw_length=g[10]
+        self._raw=g[11]
+        if isinstance(self._raw, Bits):
+            self.symbols=len(self._raw)//2
+        else:
+            self.symbols=(self._raw.count("0")+self._raw.count("1"))//2
+        if g[12]:
+            self.extra_data=g[12]
             self._new_error("There is crap at the end in extra_data")
 
         # Make a "global" timestamp - needs to be an int to avoid precision loss
-        # Current format:
-        mm=re.match(r"i-(\d+)-t1$",self.filename)
-        if mm:
-            startts=int(mm.group(1))
-            self.fileinfo="p-%d"%startts
-            self.globalns=startts*(10**9)+int(float(self.timestamp)*(10**6))
-            return
-        # Older file formats:
-        mm=re.match(r"(\d\d)-(\d\d)-(20\d\d)T(\d\d)-(\d\d)-(\d\d)-[sr]1",self.filename)
-        if mm:
-            month, day, year, hour, minute, second = map(int, mm.groups())
-            ts=datetime.datetime(year,month,day,hour,minute,second)
-            startts=int(ts.timestamp())
-            self.fileinfo="p-%d"%startts
-            self.globalns=startts*(10**9)+int(float(self.timestamp)*(10**6))
-            return
-        mm=re.match(r"i-(\d+(?:\.\d+)?)-[vbsrtl]1.([a-z])([a-z])",self.filename)
-        if mm:
-            self.b26=(ord(mm.group(2))-ord('a'))*26+ ord(mm.group(3))-ord('a')
-            startts=float(mm.group(1))+self.b26*600
-            if startts != int(startts):
-                self.timestamp+=(startts%1)*(10**3)
-            startts=int(startts)
-            self.fileinfo="p-%d"%startts
-            self.globalns=startts*(10**9)+int(float(self.timestamp)*(10**6))
-            return
-        mm=re.match(r"i-(\d+(?:\.\d+)?)-[vbsrtl]1(?:-o[+-]\d+)?$",self.filename)
-        if mm:
-            startts=float(mm.group(1))
-            if startts != int(startts):
-                self.timestamp+=(startts%1)*(10**3)
-            startts=int(startts)
-            self.fileinfo="p-%d"%startts
+        info=parse_filename(self.filename)
+        if info:
+            (startts, offset, b26, fileinfo)=info
+            if b26 is not None:
+                self.b26=b26
+            if offset:
+                self.timestamp+=offset
+            self.fileinfo=fileinfo
             self.globalns=startts*(10**9)+int(float(self.timestamp)*(10**6))
             return
 
-        global tswarning,tsoffset,maxts
         self.fileinfo="u-"+self.filename.replace("-",".")
-        if not tswarning:
-            print("Warning: no timestamp found in filename", file=sys.stderr)
-            tswarning=True
-        ts=tsoffset+float(self.timestamp)/1000
-        if ts<maxts:
-            tsoffset=maxts
-            ts=tsoffset+float(self.timestamp)/1000
-        maxts=ts
+        ts=fallback_ts(self.timestamp)
         self.globalns=int(ts*(10**9))
 
+    # computed on first use, so dropped lines don't pay for them
+    @lazy
+    def freq_print(self):
+        if args.channelize:
+            return channelize_str(self.frequency)
+        return "%010d"%(self.frequency)
+
+    @lazy
+    def leveldb(self):
+        return 20*log(self.level,10)
+
+    @lazy
+    def bitstream_raw(self): # raw bitstring with correct symbols
+        bits=self._raw
+        if not isinstance(bits, Bits):
+            bits=Bits.fromstr(re.sub(r"[\[\]<> ]","",bits))
+        if self.swapped:
+            bits=symbol_reverse(bits)
+        return bits
+
+    # lazy fields by the field they follow in fields()
+    lazy_after={"frequency": ("freq_print",), "level": ("leveldb", "bitstream_raw")}
+
+    def fields(self, exclude=()):
+        """Public attributes including the lazy ones, in __init__ order"""
+        d={}
+        for (k, v) in list(self.__dict__.items()):
+            if k.startswith("_") or k in exclude or k in ("freq_print", "leveldb", "bitstream_raw"):
+                continue
+            if k=="msgtype" and v in ("TL", "MS") and "ec_lcw" in self.__dict__ and "ec_lcw" not in exclude:
+                d["ec_lcw"]=self.ec_lcw # --harder ITL/IMS matches always had it first
+            d[k]=v
+            for x in self.lazy_after.get(k, ()):
+                if x not in exclude:
+                    d[x]=getattr(self, x)
+        return d
+
     def upgrade(self):
         if self.error: return self
-        if(not self.next and self.bitstream_raw.startswith(iridium_access)):
+        if(not self.next and self.bitstream_raw.startswith(iridium_access_b)):
             self.uplink=0
-        elif(not self.next and self.bitstream_raw.startswith(uplink_access)):
+        elif(not self.next and self.bitstream_raw.startswith(uplink_access_b)):
             self.uplink=1
-        elif(self.bitstream_raw.startswith(next_access_dl)):
+        elif(self.bitstream_raw.startswith(next_access_dl_b)):
             self.uplink = 0
             self.next = True
-        elif(self.bitstream_raw.startswith(next_access_ul)):
+        elif(self.bitstream_raw.startswith(next_access_ul_b)):
             self.uplink = 1
             self.next = True
         else:
@@ -188,6 +373,8 @@ class Message(object):
             if("uplink" not in self.__dict__):
                 self._new_error("Access code missing")
                 return self
+        if filter_plan.early_reject(self):
+            return None # dropped like after decoding, not an error
         try:
             return IridiumMessage(self).upgrade()
         except ParserError as e:
@@ -237,7 +424,7 @@ class Message(object):
         else:
             str = "RAW: "
         str += self._pretty_header()
-        bs=self.bitstream_raw
+        bs="%s"%self.bitstream_raw
         if "uplink" in self.__dict__:
             str+= " %03d"%(self.symbols-len(iridium_access)//2)
             if (self.uplink):
@@ -252,14 +439,127 @@ class Message(object):
         str+=self._pretty_trailer()
         return str
 
+# frame types known from the first 32 bits after the access code
+lead_type={header_messaging_b.val: "MS", header_time_location_b[:32].val: "TL"}
+bc_hdr_ok=[nndivide(hdr_poly, x)==0 for x in range(1<<6)]
+lcw1_ok=[nndivide(29, x)==0 for x in range(1<<7)]
+
+def classify(data, frequency, uplink, memo):
+    """Detect the frame type from the bits after the access code.
+
+    Returns (msgtype, found), msgtype is None if no type matched. found has
+    the de-interleaved blocks computed on the way ("bc", "lcw", "ra") and
+    the "ec_lcw" of a --harder match. BCH repairs are kept in memo.
+    """
+    n=len(data)
+    simplex= not args.freqclass or frequency > f_simplex
+    duplex=  not args.freqclass or frequency < f_duplex
+    dl= not (args.freqclass and uplink)
+    found={}
+
+    if simplex and dl and n>=32:
+        lead=lead_type.get(data.val>>(n-32))
+        if lead=="MS":
+            return ("MS", found)
+        if lead=="TL" and n>=96 and data.val>>(n-96)==header_time_location_b.val:
+            return ("TL", found)
+
+    if duplex and dl and n>6+64:
+        if bc_hdr_ok[data.val>>(n-6)]:
+            found["bc"]=(o_bc1,o_bc2)=de_interleave(data[6:6+64])
+            if nndivide(ringalert_bch_poly,int(o_bc1[:31]))==0:
+                if nndivide(ringalert_bch_poly,int(o_bc2[:31]))==0:
+                    return ("BC", found)
+
+    if duplex and n>64: # XXX: heuristic based on LCW / first BCH block, can we do better?
+        found["lcw"]=(o_lcw1,o_lcw2,o_lcw3)=de_interleave_lcw(data[:46])
+        if lcw1_ok[int(o_lcw1)] and nndivide(41,int(o_lcw3))==0:
+            (e2,lcw2,bch)= bch_repair(465,o_lcw2+'0',memo)  # One bit missing, so we guess
+            if (e2==1): # Maybe the other one...
+                (e2,lcw2,bch)= bch_repair(465,o_lcw2+'1',memo)
+            if e2==0:
+                return ("LW", found)
+
+    if simplex and dl and n>=3*32:
+        found["ra"]=(o_ra1,o_ra2,o_ra3)=de_interleave3(data[:3*32])
+        if nndivide(ringalert_bch_poly,int(o_ra1[:31]))==0:
+            if nndivide(ringalert_bch_poly,int(o_ra2[:31]))==0:
+                if nndivide(ringalert_bch_poly,int(o_ra3[:31]))==0:
+                    return ("RA", found)
+
+    if duplex and uplink and n>=2*26 and n<2*50:
+        return ("AQ", found)
+
+    if not args.harder:
+        return (None, found)
+
+    # try IBC
+    if n>=70 and dl:
+        (e1,_,_)=bch_repair1(hdr_poly,data[:6],memo)
+        (o_bc1,o_bc2)=found.get("bc") or de_interleave(data[6:6+64])
+        (e2,d2,b2)=bch_repair(ringalert_bch_poly,o_bc1[:31],memo)
+        (e3,d3,b3)=bch_repair(ringalert_bch_poly,o_bc2[:31],memo)
+        if e1>=0 and e2>=0 and e3>=0:
+            if ((d2+b2+o_bc1[31:]).count('1') % 2)==0:
+                if ((d3+b3+o_bc2[31:]).count('1') % 2)==0:
+                    found["ec_lcw"]=e1
+                    return ("BC", found)
+
+    # try for LCW
+    if n>=64:
+        (o_lcw1,o_lcw2,o_lcw3)=found.get("lcw") or de_interleave_lcw(data[:46])
+        (e1 ,lcw1,bch)=bch_repair( 29,o_lcw1,memo)     # BCH(7,3)
+        (e2a,lcw2,bch)=bch_repair(465,o_lcw2+'0',memo) # BCH(13,16)
+        (e2b,lcw2,bch)=bch_repair(465,o_lcw2+'1',memo)
+        (e3 ,lcw3,bch)=bch_repair( 41,o_lcw3,memo)     # BCH(26,21)
+
+        e2=e2a
+        if (e2b>=0 and e2b<e2a) or (e2a<0):
+            e2=e2b
+
+        if e1>=0 and e2>=0 and e3>=0:
+            found["ec_lcw"]=(e1+e2+e3)
+            return ("LW", found)
+
+    # try for IRA
+    if n>=3*32 and dl:
+        (o_ra1,o_ra2,o_ra3)=found.get("ra") or de_interleave3(data[:3*32])
+
+        (e1,d1,b1)=bch_repair(ringalert_bch_poly,o_ra1[:31],memo)
+        (e2,d2,b2)=bch_repair(ringalert_bch_poly,o_ra2[:31],memo)
+        (e3,d3,b3)=bch_repair(ringalert_bch_poly,o_ra3[:31],memo)
+
+        if e1>=0 and e2>=0 and e3>=0:
+            if ((d1+b1+o_ra1[31:]).count('1') % 2)==0:
+                if ((d2+b2+o_ra2[31:]).count('1') % 2)==0:
+                    if ((d3+b3+o_ra3[31:]).count('1') % 2)==0:
+                        return ("RA", found)
+
+    # try ITL
+    if n>=96+(8*8*12) and dl:
+        if data[:96].diff(header_time_location_b)<4:
+            found["ec_lcw"]=1
+            return ("TL", found)
+
+    # try IMS
+    if n>=32 and dl:
+        if data[:32].diff(header_messaging_b)<2:
+            found["ec_lcw"]=1
+            return ("MS", found)
+
+    return (None, found)
+
 class IridiumMessage(Message):
     def __init__(self,msg):
         self.__dict__=msg.__dict__
+        self.bch_memo={} # BCH repairs of this frame, see nnrepair_memo()
         if self.next:
             data = self.bitstream_raw[len(next_access_dl):]
             self.msgtype = "NX"
             self.header = self.bitstream_raw[:len(next_access_dl)]
             self.descrambled = data
+            if not filter_plan.wants(IridiumNXTMessage):
+                self._new_error("filtered message")
             return
         elif self.uplink:
             data=self.bitstream_raw[len(uplink_access):]
@@ -269,127 +569,21 @@ class IridiumMessage(Message):
         # Try to detect packet type.
         # Will not detect packets with correctable bit errors at the beginning
         # unless '--harder' is specifed
-        if "msgtype" not in self.__dict__ and (not args.freqclass or self.frequency > f_simplex) and not (args.freqclass and self.uplink):
-            if data[:32] == header_messaging:
-                self.msgtype="MS"
-
-        if "msgtype" not in self.__dict__ and args.linefilter['type'] == "IridiumMSMessage":
-            self._new_error("filtered message")
-            return
-
-        if "msgtype" not in self.__dict__ and (not args.freqclass or self.frequency > f_simplex) and not (args.freqclass and self.uplink):
-            if data[:96]==header_time_location:
-                self.msgtype="TL"
-
-        if "msgtype" not in self.__dict__ and args.linefilter['type'] == "IridiumSTLMessage":
-            self._new_error("filtered message")
-            return
-
-        if "msgtype" not in self.__dict__ and (not args.freqclass or self.frequency < f_duplex) and not (args.freqclass and self.uplink):
-            hdrlen=6
-            blocklen=64
-            if len(data)>hdrlen+blocklen:
-                if ndivide(hdr_poly,data[:hdrlen])==0:
-                    (o_bc1,o_bc2)=de_interleave(data[hdrlen:hdrlen+blocklen])
-                    if ndivide(ringalert_bch_poly,o_bc1[:31])==0:
-                        if ndivide(ringalert_bch_poly,o_bc2[:31])==0:
-                            self.msgtype="BC"
-
-        if "msgtype" not in self.__dict__ and args.linefilter['type'] == "IridiumBCMessage":
-            self._new_error("filtered message")
-            return
-
-        if "msgtype" not in self.__dict__ and (not args.freqclass or self.frequency < f_duplex):
-            if len(data)>64: # XXX: heuristic based on LCW / first BCH block, can we do better?
-                (o_lcw1,o_lcw2,o_lcw3)=de_interleave_lcw(data[:46])
-                if ndivide( 29,o_lcw1)==0:
-                    if ndivide( 41,o_lcw3)==0:
-                        (e2,lcw2,bch)= bch_repair(465,o_lcw2+'0')  # One bit missing, so we guess
-                        if (e2==1): # Maybe the other one...
-                            (e2,lcw2,bch)= bch_repair(465,o_lcw2+'1')
-                        if e2==0:
-                            self.msgtype="LW"
-
-        if "msgtype" not in self.__dict__ and args.linefilter['type'] == "IridiumLCWMessage":
-            self._new_error("filtered message")
-            return
+        (msgtype, found)=classify(data, self.frequency, self.uplink, self.bch_memo)
+        if msgtype is None:
+            # AQ is detected last, by length only
+            if not filter_plan.wants(IridiumAQMessage):
+                self._new_error("filtered message")
+                return
+        else:
+            self.msgtype=msgtype
+            if "ec_lcw" in found:
+                self.ec_lcw=found["ec_lcw"]
 
-        if "msgtype" not in self.__dict__ and (not args.freqclass or self.frequency > f_simplex) and not (args.freqclass and self.uplink):
-            firstlen=3*32
-            if len(data)>=3*32:
-                (o_ra1,o_ra2,o_ra3)=de_interleave3(data[:firstlen])
-                if ndivide(ringalert_bch_poly,o_ra1[:31])==0:
-                    if ndivide(ringalert_bch_poly,o_ra2[:31])==0:
-                        if ndivide(ringalert_bch_poly,o_ra3[:31])==0:
-                            self.msgtype="RA"
-
-        if "msgtype" not in self.__dict__ and args.linefilter['type'] == "IridiumRAMessage":
+        if filter_plan.stage_types is not None and msgtype not in filter_plan.stage_types:
             self._new_error("filtered message")
             return
 
-        if "msgtype" not in self.__dict__ and (not args.freqclass or self.frequency < f_duplex) and self.uplink:
-            if len(data)>=2*26 and len(data)<2*50:
-                self.msgtype="AQ"
-
-        if "msgtype" not in self.__dict__:
-            if args.harder:
-                # try IBC
-                if len(data)>=70 and not (args.freqclass and self.uplink):
-                    hdrlen=6
-                    blocklen=64
-                    (e1,_,_)=bch_repair1(hdr_poly,data[:hdrlen])
-                    (o_bc1,o_bc2)=de_interleave(data[hdrlen:hdrlen+blocklen])
-                    (e2,d2,b2)=bch_repair(ringalert_bch_poly,o_bc1[:31])
-                    (e3,d3,b3)=bch_repair(ringalert_bch_poly,o_bc2[:31])
-                    if e1>=0 and e2>=0 and e3>=0:
-                        if ((d2+b2+o_bc1[31]).count('1') % 2)==0:
-                            if ((d3+b3+o_bc2[31]).count('1') % 2)==0:
-                                self.msgtype="BC"
-                                self.ec_lcw=e1
-
-                # try for LCW
-                if "msgtype" not in self.__dict__ and len(data)>=64:
-                    (o_lcw1,o_lcw2,o_lcw3)=de_interleave_lcw(data[:46])
-                    (e1 ,lcw1,bch)=bch_repair( 29,o_lcw1)     # BCH(7,3)
-                    (e2a,lcw2,bch)=bch_repair(465,o_lcw2+'0') # BCH(13,16)
-                    (e2b,lcw2,bch)=bch_repair(465,o_lcw2+'1')
-                    (e3 ,lcw3,bch)=bch_repair( 41,o_lcw3)     # BCH(26,21)
-
-                    e2=e2a
-                    if (e2b>=0 and e2b<e2a) or (e2a<0):
-                        e2=e2b
-
-                    if e1>=0 and e2>=0 and e3>=0:
-                        self.msgtype="LW"
-                        self.ec_lcw=(e1+e2+e3)
-
-                # try for IRA
-                firstlen=3*32
-                if "msgtype" not in self.__dict__ and len(data)>=firstlen and not (args.freqclass and self.uplink):
-                    (o_ra1,o_ra2,o_ra3)=de_interleave3(data[:firstlen])
-
-                    (e1,d1,b1)=bch_repair(ringalert_bch_poly,o_ra1[:31])
-                    (e2,d2,b2)=bch_repair(ringalert_bch_poly,o_ra2[:31])
-                    (e3,d3,b3)=bch_repair(ringalert_bch_poly,o_ra3[:31])
-
-                    if e1>=0 and e2>=0 and e3>=0:
-                        if ((d1+b1+o_ra1[31]).count('1') % 2)==0:
-                            if ((d2+b2+o_ra2[31]).count('1') % 2)==0:
-                                if ((d3+b3+o_ra3[31]).count('1') % 2)==0:
-                                    self.msgtype="RA"
-
-                # try ITL
-                if "msgtype" not in self.__dict__ and len(data)>=96+(8*8*12) and not (args.freqclass and self.uplink):
-                    if bitdiff(data[:96],header_time_location)<4:
-                        self.ec_lcw=1
-                        self.msgtype="TL"
-
-                # try IMS
-                if "msgtype" not in self.__dict__ and len(data)>=32 and not (args.freqclass and self.uplink):
-                    if bitdiff(data[:32],header_messaging)<2:
-                        self.ec_lcw=1
-                        self.msgtype="MS"
-
         if "msgtype" not in self.__dict__:
             if len(data)<64:
                 raise ParserError("Iridium message too short")
@@ -400,10 +594,14 @@ class IridiumMessage(Message):
         if "msgtype" not in self.__dict__:
             raise ParserError("unknown Iridium message type")
 
+        if not filter_plan.wants(msgtype_class.get(self.msgtype, IridiumMessage)):
+            self._new_error("filtered message")
+            return
+
         if self.msgtype=="MS":
             hdrlen=32
             self.header=data[:hdrlen]
-            if self.header==header_messaging:
+            if self.header==header_messaging_b:
                 self.header=""
             self.descrambled=[]
             (blocks,self.descramble_extra)=slice_extra(data[hdrlen:],64)
@@ -425,16 +623,16 @@ class IridiumMessage(Message):
                 self._new_error("No data to descramble")
             self.header=""
             self.descrambled=[]
-            self.descrambled+=de_interleave3(data[:firstlen])
+            self.descrambled+=found.get("ra") or de_interleave3(data[:firstlen])
             (blocks,self.descramble_extra)=slice_extra(data[firstlen:],64)
             for x in blocks:
                 self.descrambled+=de_interleave(x)
         elif self.msgtype=="BC":
             hdrlen=6
             self.header=data[:hdrlen]
-            (e,d,bch)=bch_repair1(hdr_poly,self.header)
+            (e,d,bch)=bch_repair1(hdr_poly,self.header,self.bch_memo)
 
-            self.bc_type = int(d, 2)
+            self.bc_type = int(d)
 
             if e<0:
                 self.header="%s/E%d"%(self.header,e)
@@ -461,25 +659,25 @@ class IridiumMessage(Message):
 
             if len(self.descrambled) == 8:
                 self.symbols -= len(self.descramble_extra)//2
-                self.descramble_extra = ""
+                self.descramble_extra = Bits()
         elif self.msgtype=="LW":
             lcwlen=46
-            (o_lcw1,o_lcw2,o_lcw3)=de_interleave_lcw(data[:lcwlen])
-            (e1, self.lcw1,bch)= bch_repair( 29,o_lcw1)
-            (e2, self.lcw2,bch)= bch_repair(465,o_lcw2+'0')  # One bit error expected
-            (e2b,lcw2b,    bch)= bch_repair(465,o_lcw2+'1')  # Other bit flip?
-            (e3,self.lcw3, bch)= bch_repair( 41,o_lcw3)
+            (o_lcw1,o_lcw2,o_lcw3)=found.get("lcw") or de_interleave_lcw(data[:lcwlen])
+            (e1, self.lcw1,bch)= bch_repair( 29,o_lcw1,self.bch_memo)
+            (e2, self.lcw2,bch)= bch_repair(465,o_lcw2+'0',self.bch_memo)  # One bit error expected
+            (e2b,lcw2b,    bch)= bch_repair(465,o_lcw2+'1',self.bch_memo)  # Other bit flip?
+            (e3,self.lcw3, bch)= bch_repair( 41,o_lcw3,self.bch_memo)
 
             if (e2b>=0 and e2b<=e2) or (e2<0):
                 e2=e2b
                 self.lcw2=lcw2b
 
-            self.ft=int(self.lcw1,2) # Frame type
+            self.ft=int(self.lcw1) # Frame type
 
             if e1<0 or e2<0 or e3<0:
                 if not ( args.forcetype and ':' in args.forcetype):
                     self._new_error("LCW decode failed")
-                self.header="LCW(%s_%s/%01dE%d,%s_%sx/%03dE%d,%s_%s/%06dE%d)"%(o_lcw1[:3],o_lcw1[3:],int(self.lcw1,2),e1,o_lcw2[:6],o_lcw2[6:],int(self.lcw2,2),e2,o_lcw3[:21],o_lcw3[21:],int(self.lcw3,2),e3)
+                self.header="LCW(%s_%s/%01dE%d,%s_%sx/%03dE%d,%s_%s/%06dE%d)"%(o_lcw1[:3],o_lcw1[3:],int(self.lcw1),e1,o_lcw2[:6],o_lcw2[6:],int(self.lcw2),e2,o_lcw3[:21],o_lcw3[21:],int(self.lcw3),e3)
 
             data=data[lcwlen:]
             self.descramble_extra=data[312:]
@@ -494,10 +692,17 @@ class IridiumMessage(Message):
             if self.msgtype=="LW":
                 return IridiumLCWMessage(self).upgrade()
             elif self.msgtype=="TL":
-                return IridiumSTLMessage(self).upgrade()
+                key=(self.descrambled.val, self.descrambled.len, args.forcetype and bits_key(self.header))
+                return itl_cache.run(self, key, lambda m: IridiumSTLMessage(m).upgrade())
             elif self.msgtype=="AQ":
                 return IridiumAQMessage(self).upgrade()
-            elif self.msgtype in ("MS", "RA", "BC"):
+            elif self.msgtype=="BC":
+                key=(self.bc_type, tuple((b.val, b.len) for b in self.descrambled), bits_key(self.descramble_extra))
+                return ibc_cache.run(self, key, lambda m: IridiumECCMessage(m).upgrade())
+            elif self.msgtype=="RA":
+                key=(tuple((b.val, b.len) for b in self.descrambled), bits_key(self.descramble_extra))
+                return ira_cache.run(self, key, lambda m: IridiumECCMessage(m).upgrade())
+            elif self.msgtype=="MS":
                 return IridiumECCMessage(self).upgrade()
             elif self.msgtype == "NX":
                 return IridiumNXTMessage(self).upgrade()
@@ -518,7 +723,7 @@ class IridiumMessage(Message):
         return str
     def _pretty_trailer(self):
         str= super()._pretty_trailer()
-        if("descramble_extra" in self.__dict__) and self.descramble_extra != "":
+        if("descramble_extra" in self.__dict__) and self.descramble_extra:
             str+= " descr_extra:"+self.descramble_extra
         return str
     def pretty(self):
@@ -529,7 +734,7 @@ class IridiumMessage(Message):
             sstr+= " <"+" ".join(self.q)+">"
         elif self.descrambled!="":
             sstr+= " ["
-            sstr+=".".join(["%02x"%int("0"+x,2) for x in slice("".join(self.descrambled), 8) ])
+            sstr+=".".join(["%02x"%x for x in bits_join(self.descrambled).ints(8)])
             sstr+="]"
         sstr+= self._pretty_trailer()
         return sstr
@@ -553,17 +758,15 @@ class IridiumLCWMessage(IridiumMessage):
 
         if self.ft==0: # Voice - Mission data - voice
             self.msgtype="VO"
-            for x in slice(data,8):
-                self.descrambled+=[x]
-                self.payload_f+=[int(x,2)]
-                self.payload_r+=[int(x[::-1],2)]
-            self.payload_6=[int(x,2) for x in slice(data[:312], 6)]
+            self.descrambled=slice(data,8)
+            self.payload_f=data.ints(8)
+            self.payload_r=ints_rev8(data)
+            self.payload_6=data[:312].ints(6)
         elif self.ft==1: # IP via PPP - Mission data - data
             self.msgtype="IP"
-            for x in slice(data,8):
-                self.descrambled+=[x[::-1]]
-                self.payload_f+=[int(x,2)]
-                self.payload_r+=[int(x[::-1],2)]
+            self.descrambled=[x[::-1] for x in slice(data,8)]
+            self.payload_f=data.ints(8)
+            self.payload_r=ints_rev8(data)
         elif self.ft==2: # DAta (SBD) - Mission control data - ISU/SV
             self.msgtype="DA"
             blocks=slice(data,124)
@@ -577,12 +780,12 @@ class IridiumLCWMessage(IridiumMessage):
         elif self.ft==7: # Synchronisation
             self.msgtype="SY"
             self.descrambled=data
-            self.sync=[int(x,2) for x in slice(self.descrambled, 8)]
+            self.sync=self.descrambled.ints(8)
         elif self.ft==3: # Mission control data - inband sig
             self.msgtype="U3"
             self.descrambled=data
-            self.payload6=[int(x,2) for x in slice(self.descrambled, 6)]
-            self.payload8=[int(x,2) for x in slice(self.descrambled, 8)]
+            self.payload6=self.descrambled.ints(6)
+            self.payload8=self.descrambled.ints(8)
         elif self.ft==6: # "PT=,"
             self.msgtype="U6"
             self.descrambled=data
@@ -594,7 +797,11 @@ class IridiumLCWMessage(IridiumMessage):
             self._new_error("No data to descramble")
 
     def upgrade(self):
-        if args.linefilter['type']=='IridiumLCW3Message' and self.msgtype!="U3":
+        # stays an IridiumLCWMessage if decoding fails
+        cls=lcw_class.get(self.msgtype)
+        if filter_plan.pushdown and not (filter_plan.matches(IridiumLCWMessage) or (cls and filter_plan.wants(cls))):
+            self._new_error("filtered message")
+        if filter_plan.lcw3_only and self.msgtype!="U3":
             self._new_error("filtered message")
         if self.error: return self
         try:
@@ -636,8 +843,8 @@ class IridiumLCWMessage(IridiumMessage):
 #    3: handoff resp. [cand[%c[0=P,1=S::0xb,1]], denied[0xc,1], ref[xd,1], slot[xf,2]+1, subband up[x11,5], subband down[x16,5], access[x1b,3]+1]
 #    *: reserved
 # 3: reserved
-        self.lcw_ft=int(self.lcw2[:2],2)
-        self.lcw_code=int(self.lcw2[2:],2)
+        self.lcw_ft=int(self.lcw2[:2])
+        self.lcw_code=int(self.lcw2[2:])
         lcw3bits=self.lcw3
         if self.lcw_ft == 0:
             ty="maint"
@@ -647,19 +854,19 @@ class IridiumLCWMessage(IridiumMessage):
                 code="<silent>"
             elif self.lcw_code == 12:
                 code="maint[1]"
-                code+="[lqi:%d,power:%d]"%(int(self.lcw3[19:21],2),int(self.lcw3[16:19],2))
+                code+="[lqi:%d,power:%d]"%(int(self.lcw3[19:21]),int(self.lcw3[16:19]))
                 lcw3bits="%s"%(self.lcw3[:16])
             elif self.lcw_code == 0:
                 code="sync"
-                code+="[status:%d,dtoa:%d,dfoa:%d]"%(int(self.lcw3[1:2],2),int(self.lcw3[3:13],2),int(self.lcw3[13:21],2))
+                code+="[status:%d,dtoa:%d,dfoa:%d]"%(int(self.lcw3[1:2]),int(self.lcw3[3:13]),int(self.lcw3[13:21]))
                 lcw3bits="%s|%s"%(self.lcw3[0],self.lcw3[2])
             elif self.lcw_code == 3:
                 code="maint[2]"
-                code+="[lqi:%d,power:%d,f_dtoa:%d,f_dfoa:%d]"%(int(self.lcw3[1:3],2),int(self.lcw3[3:6],2),int(self.lcw3[6:13],2),int(self.lcw3[13:20],2))
+                code+="[lqi:%d,power:%d,f_dtoa:%d,f_dfoa:%d]"%(int(self.lcw3[1:3]),int(self.lcw3[3:6]),int(self.lcw3[6:13]),int(self.lcw3[13:20]))
                 lcw3bits="%s|%s"%(self.lcw3[0],self.lcw3[20:])
             elif self.lcw_code == 1:
                 code="switch"
-                code+="[dtoa:%d,dfoa:%d]"%(int(self.lcw3[3:13],2),int(self.lcw3[13:21],2))
+                code+="[dtoa:%d,dfoa:%d]"%(int(self.lcw3[3:13]),int(self.lcw3[13:21]))
                 lcw3bits="%s"%(self.lcw3[0:3])
             else:
                 code="rsrvd(%d)"%(self.lcw_code)
@@ -667,8 +874,8 @@ class IridiumLCWMessage(IridiumMessage):
             ty="acchl"
             if self.lcw_code == 1:
                 code="acchl" # 1(0), 3(msg_type), 1(block_num), 3(sapi_code), 8(segm_list), 5(unused)
-                code+="[msg_type:%01x,bloc_num:%01x,sapi_code:%01x,segm_list:%08s]"%(int(self.lcw3[1:4],2),int(self.lcw3[4:5],2),int(self.lcw3[5:8],2),self.lcw3[8:16])
-                lcw3bits="%s,%02x"%(self.lcw3[:1],int(self.lcw3[16:],2))
+                code+="[msg_type:%01x,bloc_num:%01x,sapi_code:%01x,segm_list:%08s]"%(int(self.lcw3[1:4]),int(self.lcw3[4:5]),int(self.lcw3[5:8]),self.lcw3[8:16])
+                lcw3bits="%s,%02x"%(self.lcw3[:1],int(self.lcw3[16:]))
             else:
                 code="rsrvd(%d)"%(self.lcw_code)
         elif self.lcw_ft == 2:
@@ -678,7 +885,7 @@ class IridiumLCWMessage(IridiumMessage):
                 lcw3bits="%s,%s"%(self.lcw3[:11],self.lcw3[11:])
             elif self.lcw_code == 3:
                 code="handoff_resp"
-                code+="[cand:%s,denied:%d,ref:%d,slot:%d,sband_up:%d,sband_dn:%d,access:%d]"%(['P','S'][int(self.lcw3[2:3],2)],int(self.lcw3[3:4],2),int(self.lcw3[4:5],2),1+int(self.lcw3[6:8],2),int(self.lcw3[8:13],2),int(self.lcw3[13:18],2),1+int(self.lcw3[18:21],2))
+                code+="[cand:%s,denied:%d,ref:%d,slot:%d,sband_up:%d,sband_dn:%d,access:%d]"%(['P','S'][int(self.lcw3[2:3])],int(self.lcw3[3:4]),int(self.lcw3[4:5]),1+int(self.lcw3[6:8]),int(self.lcw3[8:13]),int(self.lcw3[13:18]),1+int(self.lcw3[18:21]))
                 lcw3bits="%s,%s"%(self.lcw3[0:2],self.lcw3[5:6])
             elif self.lcw_code == 15:
                 code="<silent>"
@@ -695,7 +902,7 @@ class IridiumLCWMessage(IridiumMessage):
         sstr+= " %2s"%self.msgtype
         if self.descrambled!="":
             sstr+= " ["
-            sstr+=".".join(["%02x"%int("0"+x,2) for x in slice("".join(self.descrambled), 8) ])
+            sstr+=".".join(["%02x"%x for x in bits_join(self.descrambled).ints(8)])
             sstr+="]"
         sstr+= self._pretty_trailer()
         return sstr
@@ -704,9 +911,9 @@ class IridiumSYMessage(IridiumLCWMessage):
     def __init__(self,imsg):
         self.__dict__=imsg.__dict__
     def upgrade(self):
-        self.fixederrs=(1+bitdiff(self.descrambled,"10"*(len(self.descrambled)//2)))//2 # count symbols
+        self.fixederrs=(1+self.descrambled.diff(Bits.fromstr("10"*(len(self.descrambled)//2))))//2 # count symbols
         if self.uplink:
-            fe=(1+bitdiff(self.descrambled,"11"*(len(self.descrambled)//2)))//2 # count symbols
+            fe=(1+self.descrambled.diff(Bits.fromstr("11"*(len(self.descrambled)//2))))//2 # count symbols
             if fe + 5 < self.fixederrs:
                 self.fixederrs=fe
                 self.pattern="11"
@@ -735,8 +942,8 @@ class IridiumAQMessage(IridiumMessage):
         self.sym=[]
         imap=['0','e','e','1']
         bits=self.descrambled
-        for x in range(0,len(bits)-1,2):
-            self.sym.append(imap[int(bits[x+0])*2 + int(bits[x+1])])
+        for x in bits[:len(bits)-len(bits)%2].ints(2):
+            self.sym.append(imap[x])
 
         if 'e' in self.sym:
             raise ParserError("IAQ content not BPSK")
@@ -779,8 +986,8 @@ class IridiumSTLMessage(IridiumMessage):
 
         (i_list,q_list)=split_qpsk(symbols)
 
-        i_list=["%02x"%int(x,2) for x in slice(i_list,8)]
-        q_list=["%02x"%int(x,2) for x in slice(q_list,8)]
+        i_list=["%02x"%x for x in i_list.ints(8)]
+        q_list=["%02x"%x for x in q_list.ints(8)]
 
         self.i=["".join(x) for x in (i_list[:16],i_list[16:])]
         self.q=["".join(x) for x in slice(q_list,12)]
@@ -788,6 +995,7 @@ class IridiumSTLMessage(IridiumMessage):
         if args.harder:
             MAX_DIFF=10
             self.ib=[bin(int(x, 16))[2:].zfill(len(x*4)) for x in self.i]
+            ib=[int(x, 16) for x in self.i]
 
         # Try to determine ITL version
         self.itl_version= None
@@ -795,7 +1003,7 @@ class IridiumSTLMessage(IridiumMessage):
             self.itl_version= itl.PRS_HDR.index(self.i[0])
         except ValueError:
             if args.harder: # harder only supports V2
-                if bitdiff(self.ib[0],itl.BIN_HDR[2])<MAX_DIFF:
+                if popcount(ib[0]^itl.BIN_HDR[2])<MAX_DIFF:
                     self.fixederrs+= 1
                     self.itl_version= 2
                 else:
@@ -855,17 +1063,15 @@ class IridiumSTLMessage(IridiumMessage):
             if self.i[1] in itl.MAP_PLANE:
                 self.plane= itl.MAP_PLANE[self.i[1]]
             else:
-                for i,p in enumerate(itl.BIN_PLANES):
-                    if bitdiff(self.ib[1],p)<MAX_DIFF*2:
-                        self.plane=i+1
-                        self.fixederrs+=1
-                        break
+                (i,dist)=itl.PLANE_INDEX.nearest(ib[1])
+                if dist<MAX_DIFF*2:
+                    self.plane=i+1
+                    self.fixederrs+=1
                 if self.plane is None:
                     raise ParserError("ITL V2 PRS I#1 (plane) unknown")
 
             cat=None
             for qidx in range(len(self.q)):
-                mindist=999
                 if qidx > 0 and self.msg[0] == 108:
                     self.msg[qidx]=self.q[qidx]
                     next
@@ -873,7 +1079,7 @@ class IridiumSTLMessage(IridiumMessage):
                     self.msg[qidx]= itl.MAP_PRS[self.q[qidx]]
                     cat=itl.MAP_PRS_TYPE[self.q[qidx]]
                 else:
-                    q=bin(int(self.q[qidx], 16))[2:].zfill(len(self.q[qidx]*4))
+                    q=int(self.q[qidx], 16)
                     if qidx==0: # Only search in correct PRS subset
                         if self.plane%2==0:
                             s=0
@@ -891,15 +1097,14 @@ class IridiumSTLMessage(IridiumMessage):
                         e=128*(cat+1)
                     else:
                         raise AssertionError("ITL category error")
-                    for i,prs in enumerate(itl.BIN_PRS[s:e]):
-                        dist=bitdiff(q,prs)
-                        if dist<mindist: mindist=dist
-                        if dist<MAX_DIFF:
-                            self.msg[qidx]=i%128
-                            if cat is None:
-                                cat=(i+s)//128
-                            self.fixederrs+=1
-                            break
+                    # the codes in a subset differ in at least 42 bits, so
+                    # there is at most one within MAX_DIFF
+                    (i,mindist)=itl.PRS_INDEX.nearest(q, s, e)
+                    if mindist<MAX_DIFF:
+                        self.msg[qidx]=i%128
+                        if cat is None:
+                            cat=i//128
+                        self.fixederrs+=1
                 if self.msg[qidx] is None:
                     self._new_error("ITL V2 PRS Q#%d unknown"%qidx)
                     raise ParserError("ITL PRS dist=%d"%mindist)
@@ -1023,7 +1228,7 @@ class IridiumLCW3Message(IridiumLCWMessage):
         else:
             str+=" RS=no"
             str+= " ["
-            str+=group(self.descrambled,8)
+            str+=group("%s"%self.descrambled,8)
             str+="]"
         str+=self._pretty_trailer()
         return str
@@ -1074,6 +1279,7 @@ class IridiumVOMessage(IridiumLCWMessage):
         self.vdata=self.payload_f
 
     def upgrade(self):
+        counters["VO"][self.vtype]+=1
         if self.vtype=="VDA":
             new= IridiumIPMessage(self).upgrade()
             new.itype="VDA"
@@ -1198,7 +1404,7 @@ class IridiumECCMessage(IridiumMessage):
         else:
             raise AssertionError("unknown Iridium message type")
 
-        self.bitstream_bch=""
+        self.bitstream_bch=Bits()
         self.fixederrs=0
         self.fill=0
         self.ecc_cut=False
@@ -1212,9 +1418,9 @@ class IridiumECCMessage(IridiumMessage):
             # remove optional FILL pattern
             while True:
                 (first,second)=self.descrambled[-2:]
-                if (first+second == "1010001001110011101111110110110101010100010001011100001011100110") or \
-                        (bitdiff(first, "10100010011100111011111101101101") <=2 and
-                         bitdiff(second,"01010100010001011100001011100110") <=2):
+                if (first+second == fill_pattern) or \
+                        (first.diff(fill_pattern[:32]) <=2 and
+                         second.diff(fill_pattern[32:]) <=2):
                     # XXX: do it properly with BCH(ringalert_bch_poly)?
                     self.fill+=1
                     self.descrambled.pop()
@@ -1230,7 +1436,7 @@ class IridiumECCMessage(IridiumMessage):
             parity=block[31:]
             block=block[:31]
 
-            (errs,data,bch)=bch_repair(self.poly, block)
+            (errs,data,bch)=bch_repair(self.poly, block, self.bch_memo)
 
             if errs<0: # cut packet on uncorrectable error
                 self.ecc_cut=True
@@ -1276,9 +1482,9 @@ class IridiumECCMessage(IridiumMessage):
         str= "IME: "+self._pretty_header()+" "+self.msgtype+" "
         for block in range(len(self.descrambled)):
             b=self.descrambled[block]
-            (errs,foo)=nrepair(self.poly,b[:31])
-            res=ndivide(self.poly,b[:31])
-            parity=(foo+b[31]).count('1') % 2
+            (errs,foo)=nnrepair_memo(self.bch_memo,self.poly,int(b[:31]))
+            res=nndivide(self.poly,int(b[:31]))
+            parity=(bin(foo).count('1')+int(b[31])) % 2
             str+="{%s %s %s/%04d E%s P%d}"%(b[:21],b[21:31],b[31],res,("0","1","2","-")[errs],parity)
         if self.fill>0:
             str+=" FILL=%02d"%self.fill
@@ -1293,13 +1499,13 @@ class IridiumLCWECCMessage(IridiumMessage):
         else:
             raise AssertionError("unknown Iridium message type")
 
-        self.bitstream_bch=""
+        self.bitstream_bch=Bits()
         self.fixederrs=0
 
         for block in self.descrambled:
             assert len(block)==31, "unknown BCH block len:%d"%len(block)
 
-            (errs,data,bch)=bch_repair(self.poly, block)
+            (errs,data,bch)=bch_repair(self.poly, block, self.bch_memo)
 
             if errs<0:
                 self.descramble_extra=""
@@ -1328,9 +1534,9 @@ class IridiumLCWECCMessage(IridiumMessage):
         str= "IME: "+self._pretty_header()+" "+self.msgtype+" "
         for block in range(len(self.descrambled)):
             b=self.descrambled[block]
-            (errs,foo)=nrepair(self.poly,b)
-            res=ndivide(self.poly,b)
-            parity=(foo).count('1') % 2
+            (errs,foo)=nnrepair_memo(self.bch_memo,self.poly,int(b))
+            res=nndivide(self.poly,int(b))
+            parity=bin(foo).count('1') % 2
             str+="{%s %s/%04d E%s P%d}"%(b[:21],b[21:31],res,("0","1","2","-")[errs],parity)
         str+=self._pretty_trailer()
         return str #
@@ -1342,11 +1548,11 @@ class IridiumDAMessage(IridiumLCWECCMessage):
         # Decode stuff from self.bitstream_bch
         self.flags1=self.bitstream_bch[:4]
         self.flag1b=self.bitstream_bch[4:5]
-        self.da_ctr=int(self.bitstream_bch[5:8],2)
+        self.da_ctr=int(self.bitstream_bch[5:8])
         self.flags2=self.bitstream_bch[8:11]
-        self.da_len=int(self.bitstream_bch[11:16],2)
-        self.flags3=int(self.bitstream_bch[16:17],2)
-        self.zero1=int(self.bitstream_bch[17:20],2)
+        self.da_len=int(self.bitstream_bch[11:16])
+        self.flags3=int(self.bitstream_bch[16:17])
+        self.zero1=int(self.bitstream_bch[17:20])
         if self.zero1 != 0:
             self._new_error("zero1 not 0")
 
@@ -1354,25 +1560,23 @@ class IridiumDAMessage(IridiumLCWECCMessage):
             raise ParserError("Not enough data in data packet")
 
         if self.da_len>0:
-            self.da_crc=int(self.bitstream_bch[9*20:9*20+16],2)
-            self.da_ta=[int(x,2) for x in slice(self.bitstream_bch[20:9*20],8)]
+            self.da_crc=int(self.bitstream_bch[9*20:9*20+16])
+            self.da_ta=self.bitstream_bch[20:9*20].ints(8)
             crcstream=self.bitstream_bch[:20]+"0"*12+self.bitstream_bch[20:-4]
 #            the_crc=ida_crc16("".join([chr(int(x,2)) for x in slice(crcstream,8)]))
-            the_crc=ida_crc16(bytes([int(x,2) for x in slice(crcstream,8)]))
+            the_crc=ida_crc16(bytes(crcstream.ints(8)))
             self.the_crc=the_crc
             self.crc_ok=(the_crc==0)
         else:
             self.crc_ok=False
-            self.da_ta=[int(x,2) for x in slice(self.bitstream_bch[20:11*20],8)]
+            self.da_ta=self.bitstream_bch[20:11*20].ints(8)
 
-        self.zero2=int(self.bitstream_bch[9*20+16:],2)
+        self.zero2=int(self.bitstream_bch[9*20+16:])
         if self.zero2 != 0:
             self._new_error("zero2 not 0")
 
         sbd= self.bitstream_bch[1*20:9*20]
-        self.data=[]
-        for x in slice(sbd, 8):
-            self.data+=[int(x,2)]
+        self.data=sbd.ints(8)
 
     def upgrade(self):
         if self.error: return self
@@ -1404,7 +1608,7 @@ class IridiumDAMessage(IridiumLCWECCMessage):
         str+= "%-60s"%(mstr+"]")
 
         if self.da_len>0:
-            str+= " %04x"%int(self.bitstream_bch[9*20:9*20+16],2)
+            str+= " %04x"%int(self.bitstream_bch[9*20:9*20+16])
             str+="/%04x"%self.the_crc
             if self.crc_ok:
                 str+=" CRC:OK"
@@ -1419,8 +1623,7 @@ class IridiumDAMessage(IridiumLCWECCMessage):
             sbd= self.bitstream_bch[1*20:9*20]
 
             str+=' SBD: '
-            for x in slice(sbd, 8):
-                c=int(x,2)
+            for c in sbd.ints(8):
                 if( c>=32 and c<127):
                     str+=chr(c)
                 else:
@@ -1445,30 +1648,30 @@ class IridiumBCMessage(IridiumECCMessage):
         if blocks and self.bc_type == 0:
             data = blocks.pop(0)
 
-            self.sv_id =         int(data[ 0: 7], 2)
-            self.beam_id =       int(data[ 7:13], 2)
+            self.sv_id =         int(data[ 0: 7])
+            self.beam_id =       int(data[ 7:13])
             self.unknown01 =         data[13:14]
-            self.slot =          int(data[14:15], 2) # previously: timeslot
-            self.sv_blocking =   int(data[15:16], 2) # aka: Acq
+            self.slot =          int(data[14:15]) # previously: timeslot
+            self.sv_blocking =   int(data[15:16]) # aka: Acq
             self.acqu_classes =      data[16:32]
-            self.acqu_subband =  int(data[32:37], 2)
-            self.acqu_channels = int(data[37:40], 2)
+            self.acqu_subband =  int(data[32:37])
+            self.acqu_channels = int(data[37:40])
             self.unknown02 =         data[40:42]
 
         if blocks and self.bc_type == 0:
             data = blocks.pop(0)
 
-            self.type = int(data[0:6], 2)
+            self.type = int(data[0:6])
             if self.type == 0:
                 self.unknown11 = data[6:36]
-                self.max_uplink_pwr = int(data[36:42], 2)
+                self.max_uplink_pwr = int(data[36:42])
             elif self.type == 1:
                 self.unknown21 = data[6:10]
-                self.iri_time = int(data[10:42], 2) # a.k.a. LBFC (L-Band Frame Counter)
+                self.iri_time = int(data[10:42]) # a.k.a. LBFC (L-Band Frame Counter)
                 (self.iri_time_ux, self.iri_time_str)= fmt_iritime(self.iri_time)
             elif self.type == 2:
                 self.unknown31 = data[6:10]
-                self.tmsi_expiry = int(data[10:42], 2)
+                self.tmsi_expiry = int(data[10:42])
                 (self.tmsi_expiry_ux, self.tmsi_expiry_str)= fmt_iritime(self.tmsi_expiry)
             else: # Unknown Type
                 self.type_data=data
@@ -1476,18 +1679,18 @@ class IridiumBCMessage(IridiumECCMessage):
         self.assignments=[]
         for data in blocks: # Parse assignments (if any)
             assignment={
-                'type':      int(data[ 0: 3], 2),
+                'type':      int(data[ 0: 3]),
             }
             if assignment['type'] == 0: # "classic" assignment
                 assignment = {
                     **assignment,
-                    'random_id':   int(data[ 3:11], 2),
-                    'timeslot':  1+int(data[11:13], 2),
-                    'ul_sb':       int(data[13:18], 2), # uplink_subband
-                    'dl_sb':       int(data[18:23], 2), # downlink_subband
-                    'access':    1+int(data[23:26], 2),
-                    'dtoa':        int(data[26:34], 2),
-                    'dfoa':        int(data[34:40], 2),
+                    'random_id':   int(data[ 3:11]),
+                    'timeslot':  1+int(data[11:13]),
+                    'ul_sb':       int(data[13:18]), # uplink_subband
+                    'dl_sb':       int(data[18:23]), # downlink_subband
+                    'access':    1+int(data[23:26]),
+                    'dtoa':        int(data[26:34]),
+                    'dfoa':        int(data[34:40]),
                     'unknown4':        data[40:42],
                 }
                 if assignment['dtoa'] > 128:
@@ -1557,15 +1760,15 @@ class IridiumRAMessage(IridiumECCMessage):
         # 3 blocks (63 bits) fixed "header".
         if len(self.bitstream_bch)<63:
             raise ParserError("RA content too short")
-        self.ra_sat=   int(self.bitstream_bch[0:7],2)   # sv_id
-        self.ra_cell=  int(self.bitstream_bch[7:13],2)  # beam_id
-        self.ra_pos_x= int(self.bitstream_bch[14:25],2) - int(self.bitstream_bch[13])*(1<<11)
-        self.ra_pos_y= int(self.bitstream_bch[26:37],2) - int(self.bitstream_bch[25])*(1<<11)
-        self.ra_pos_z= int(self.bitstream_bch[38:49],2) - int(self.bitstream_bch[37])*(1<<11)
-        self.ra_int=   int(self.bitstream_bch[49:56],2) # 90ms interval of RA (within same sat/cell)
-        self.ra_ts=    int(self.bitstream_bch[56:57],2) # Broadcast slot 1 or 4
-        self.ra_eip=   int(self.bitstream_bch[57:58],2) # EPI ?
-        self.ra_bc_sb= int(self.bitstream_bch[58:63],2) # BCH downlink sub-band
+        self.ra_sat=   int(self.bitstream_bch[0:7])   # sv_id
+        self.ra_cell=  int(self.bitstream_bch[7:13])  # beam_id
+        self.ra_pos_x= int(self.bitstream_bch[14:25]) - int(self.bitstream_bch[13])*(1<<11)
+        self.ra_pos_y= int(self.bitstream_bch[26:37]) - int(self.bitstream_bch[25])*(1<<11)
+        self.ra_pos_z= int(self.bitstream_bch[38:49]) - int(self.bitstream_bch[37])*(1<<11)
+        self.ra_int=   int(self.bitstream_bch[49:56]) # 90ms interval of RA (within same sat/cell)
+        self.ra_ts=    int(self.bitstream_bch[56:57]) # Broadcast slot 1 or 4
+        self.ra_eip=   int(self.bitstream_bch[57:58]) # EPI ?
+        self.ra_bc_sb= int(self.bitstream_bch[58:63]) # BCH downlink sub-band
 
         # this calculates geocentric latitude (=arcsin(z/r)) instead of geodetic latitude:
         self.ra_lat = atan2(self.ra_pos_z,sqrt(self.ra_pos_x**2+self.ra_pos_y**2))*180/pi
@@ -1595,10 +1798,10 @@ class IridiumRAMessage(IridiumECCMessage):
         blocks, _ = slice_extra(ra_msg,42)
         for page in blocks:
             paging={
-                'tmsi':  int(page[ 0:32],2),
-                'zero1': int(page[32:34],2),
-                'msc_id':int(page[34:39],2),
-                'zero2': int(page[39:42],2),
+                'tmsi':  int(page[ 0:32]),
+                'zero1': int(page[32:34]),
+                'msc_id':int(page[34:39]),
+                'zero2': int(page[39:42]),
             }
 
             paging['str'] = "tmsi:%08x"%paging['tmsi']
@@ -1659,7 +1862,7 @@ class IridiumRAMessage(IridiumECCMessage):
         if self.fill>0:
             str+=" FILL=%d"%self.fill
         if "ra_extra" in self.__dict__:
-            str+= " +" + " ".join(slice(self.ra_extra,42))
+            str+= " +" + " ".join(slice("%s"%self.ra_extra,42))
 
         str+=self._pretty_trailer()
         return str
@@ -1670,11 +1873,11 @@ class IridiumMSMessage(IridiumECCMessage):
         self.__dict__=imsg.__dict__
         blocks= slice(self.bitstream_bch,21)
 
-        self.ms_type=    int(blocks[0][0],     2) # 1 if Acq group
+        self.ms_type=    int(blocks[0][0]) # 1 if Acq group
         self.zero1 =         blocks[0][ 1: 5]
-        self.block =     int(blocks[0][ 5: 9], 2) # Block number in the super frame
-        self.frame =     int(blocks[0][ 9:15], 2) # Current frame number (OR: Current cell number)
-        self.bch_blocks= int(blocks[0][15:19], 2) # Number of (42-bit) BCH blocks in this message
+        self.block =     int(blocks[0][ 5: 9]) # Block number in the super frame
+        self.frame =     int(blocks[0][ 9:15]) # Current frame number (OR: Current cell number)
+        self.bch_blocks= int(blocks[0][15:19]) # Number of (42-bit) BCH blocks in this message
 
         if self.ms_type==1:
             self.group="A"
@@ -1682,7 +1885,7 @@ class IridiumMSMessage(IridiumECCMessage):
             self.unknown1  = blocks[0][19]        # ?
             self.secondary = int(blocks[0][20])   # Something like secondary SV
         else:
-            self.group=      int(blocks[0][19:21], 2)
+            self.group=      int(blocks[0][19:21])
             self.group_int= 1+self.group
 
         if self.zero1 != '0000':
@@ -1703,7 +1906,7 @@ class IridiumMSMessage(IridiumECCMessage):
             self.bch_extra=self.bitstream_bch[self.bch_blocks*42:]
             blocks=blocks[:2*self.bch_blocks]
 
-        myodd="".join([x[:1] for x in blocks]) # collect "oddbits"
+        myodd="".join([x[0] for x in blocks]) # collect "oddbits"
         if self.group=="A":
             myodd=myodd[0]+"_"+myodd[1:5]+"_"+myodd[5:]
         else:
@@ -1754,7 +1957,7 @@ class IridiumMSMessage(IridiumECCMessage):
         str+= "/T%d" % (self.msg_trailer)
         str+= "/F%02d" % (self.fill)
         if(self.group == "A"):
-            str+= " %s %s %-87s" % (self.unknown1, self.secondary, " ".join(self.ablocks))
+            str+= " %s %s %-87s" % (self.unknown1, self.secondary, " ".join(["%s"%x for x in self.ablocks]))
         else:
             str+= " %s %s %-87s" % (" "," "," ")
         return str
@@ -1777,22 +1980,22 @@ class IridiumMSMessageBody(IridiumMSMessage):
         blocks=self.blocks
 
 
-        self.msg_odd="".join([x[:1] for x in blocks]) # collect "oddbits"
-        rest="".join([x[1:] for x in blocks]) # remove "oddbits"
+        self.msg_odd="".join([x[0] for x in blocks]) # collect "oddbits"
+        rest=Bits.cat([x[1:] for x in blocks]) # remove "oddbits"
 
         if len(rest)<=27:
             raise ParserError("message too short(body)")
 
-        self.msg_ric=int(rest[0:22][::-1],2) # XXX: rest[20:22] maybe not part of RIC?
-        self.msg_format=int(rest[22:27],2)
+        self.msg_ric=int(rest[0:22][::-1]) # XXX: rest[20:22] maybe not part of RIC?
+        self.msg_format=int(rest[22:27])
         rest=rest[27:]
 
         if len(rest)<=16:
             self._new_error("incomplete MSG body")
             return
 
-        self.msg_seq=int(rest[0:6],2) # 0-61 (62/63 seem unused)
-        self.msg_zero1=int(rest[6:10],2)
+        self.msg_seq=int(rest[0:6]) # 0-61 (62/63 seem unused)
+        self.msg_zero1=int(rest[6:10])
         if(self.msg_zero1 != 0):
             self._new_error("zero1 is not all-zero")
         self.pkt_cs1=rest[10:16]
@@ -1825,22 +2028,22 @@ class IridiumMSMessageBody(IridiumMSMessage):
     def pretty(self):
         str= "MSG: "+self._pretty_header()
         if "msg_data" in self.__dict__:
-            str+= " "+group(self.msg_data,20)
+            str+= " "+group("%s"%self.msg_data,20)
         str+=self._pretty_trailer()
         return str
 
 # MSG checksum:
 def msg_checksum(blocks):
-    csum_val=int((blocks[0][-3:]+blocks[1][1:8])[::-1], 2)
+    csum_val=int((blocks[0][-3:]+blocks[1][1:8])[::-1])
     csum=0
     # sum of each 21-bit BCH block, split into 8,8,5 bit values
     # need to exclude the actual checksum bits from the sum
     for idx,contents in enumerate(blocks):
         if idx!=1:
-            csum+=int(contents[:8],   2) # including "odd" bit
-        csum+=int(contents[8:16], 2)
+            csum+=int(contents[:8]) # including "odd" bit
+        csum+=int(contents[8:16])
         if idx!=0:
-            csum+=int(contents[16:],  2) # 5 bits
+            csum+=int(contents[16:]) # 5 bits
 
     # this sum plus the 10-bit checksum value should be 1023
     csum_ok= (csum_val+csum) % 1024 == 1023
@@ -1859,14 +2062,14 @@ class IridiumMessagingAscii(IridiumMSMessageBody):
         self.msg_len_bit=rest[4]
         rest=rest[5:]
         if(self.msg_len_bit=="1"):
-            lfl=int(rest[0:4],2)
+            lfl=int(rest[0:4])
             self.msg_len_field_len=lfl
             if(lfl == 0):
                 raise ParserError("len_field_len unexpectedly 0")
-            self.msg_ctr=    int(rest[4:4+lfl],2)
+            self.msg_ctr=    int(rest[4:4+lfl])
             if len(rest[4+lfl:4+lfl*2])==0:
                 raise ParserError("message too short(lfl)")
-            self.msg_ctr_max=int(rest[4+lfl:4+lfl*2],2)
+            self.msg_ctr_max=int(rest[4+lfl:4+lfl*2])
             rest=rest[4+lfl*2:]
             if(lfl<1 or lfl>2):
                 self._new_error("len_field_len not 1 or 2")
@@ -1881,7 +2084,7 @@ class IridiumMessagingAscii(IridiumMSMessageBody):
         self.msg_zero2=rest[0]
         if(self.msg_zero2 != "0"):
             self._new_error("zero2 is not zero")
-        self.msg_checksum=int(rest[1:8],2)
+        self.msg_checksum=int(rest[1:8])
         self.msg_msgdata=rest[8:]
 
         chars, self.msg_rest= slice_extra(self.msg_msgdata, 7)
@@ -1889,7 +2092,7 @@ class IridiumMessagingAscii(IridiumMSMessageBody):
         end=0
         errs=0
         for (group) in chars:
-            character = int(group, 2)
+            character = int(group)
             if(character==3):
                 end=1
             elif(end==1):
@@ -1915,7 +2118,7 @@ class IridiumMessagingAscii(IridiumMSMessageBody):
             str+= "C:no/%04d"%(self.pkt_csum)
         str+= " %1d/%1d"%(self.msg_ctr,self.msg_ctr_max)
         (full,rest)=slice_extra(self.msg_msgdata,8)
-        msgx="".join(["%02x"%int(x,2) for x in full])
+        msgx="".join(["%02x"%int(x) for x in full])
         return str+ " csum:%02x msg:%s.%s"%(self.msg_checksum,msgx,rest)
     def pretty(self):
         str= "MSG: "+self._pretty_header()
@@ -1932,7 +2135,7 @@ class IridiumMessagingBCD(IridiumMSMessageBody):
         self.msg_unknown2=rest[:1] # msg_len_bit ?
         self.msg_msgdata=rest[1:]
         bcd=slice(self.msg_msgdata,4)
-        self.bcd="".join(["%01x"%int(x,2) for x in bcd])
+        self.bcd="".join(["%01x"%int(x) for x in bcd])
     def upgrade(self):
         if self.error: return self
         return self
@@ -1966,41 +2169,206 @@ class IridiumNXTMessage(IridiumMessage):
 
     def pretty(self):
         st = "NXT: " + self._pretty_header()
-        st += " " + group(self.descrambled[:32], 8)
+        st += " " + group(str(self.descrambled[:32]), 8)
         st += " | "
-        st += group(self.descrambled[32:36], 2)
+        st += group(str(self.descrambled[32:36]), 2)
         st += " > "
-        st += group(self.descrambled[36:], 10)
+        st += group(str(self.descrambled[36:]), 10)
         st += self._pretty_trailer()
         return st
 
-def symbol_reverse(bits):
-    r = bytearray(bits.encode("us-ascii"))
-    for x in range(0,len(r)-1,2):
-        i=r[x+0]
-        r[x+0]=r[x+1]
-        r[x+1]=i
-    return r.decode("us-ascii")
-
+# classes the upgrade() of a class can return, besides itself
+upgrades={
+    Message:              [IridiumMessage],
+    IridiumMessage:       [IridiumLCWMessage, IridiumSTLMessage, IridiumAQMessage, IridiumECCMessage, IridiumNXTMessage],
+    IridiumLCWMessage:    [IridiumVOMessage, IridiumIPMessage, IridiumSYMessage, IridiumLCWECCMessage, IridiumLCW3Message],
+    IridiumVOMessage:     [IridiumIPMessage],
+    IridiumLCWECCMessage: [IridiumDAMessage],
+    IridiumECCMessage:    [IridiumMSMessage, IridiumRAMessage, IridiumBCMessage],
+    IridiumMSMessage:     [IridiumMSMessageBody],
+    IridiumMSMessageBody: [IridiumMessagingAscii, IridiumMessagingBCD],
+}
+
+msgtype_class={
+    "MS": IridiumMSMessage,
+    "TL": IridiumSTLMessage,
+    "BC": IridiumBCMessage,
+    "LW": IridiumLCWMessage,
+    "RA": IridiumRAMessage,
+    "AQ": IridiumAQMessage,
+    "NX": IridiumNXTMessage,
+}
+
+lcw_class={
+    "VO": IridiumVOMessage,
+    "IP": IridiumIPMessage,
+    "SY": IridiumSYMessage,
+    "DA": IridiumLCWECCMessage,
+    "U3": IridiumLCW3Message,
+}
+
+# set by Message() / Message.upgrade() and not changed afterwards
+early_attrs=("lineno", "filename", "timestamp", "frequency", "snr", "noise", "id",
+             "confidence", "level", "leveldb", "fileinfo", "globalns", "freq_print", "uplink")
+
+class FilterPlan(object):
+    """--filter compiled once.
+
+    wants(cls) tells if a message of class cls can still be upgraded to a
+    matching class, so decoding can stop as soon as it can't. A check that
+    only uses q.<early_attrs> is also evaluated before decoding.
+
+    Without pushdown every line is decoded, except for the few types that
+    were always filtered during the type detection: stage_types are the
+    msgtypes that get past it, lcw3_only drops other LCW frames.
+    """
+    # filter type: msgtypes detected up to its stage of the detection
+    stages={
+        "IridiumMSMessage":  ("MS",),
+        "IridiumSTLMessage": ("MS", "TL"),
+        "IridiumBCMessage":  ("MS", "TL", "BC"),
+        "IridiumLCWMessage": ("MS", "TL", "BC", "LW"),
+        "IridiumRAMessage":  ("MS", "TL", "BC", "LW", "RA"),
+    }
+
+    def __init__(self, linefilter, pushdown=True):
+        self.cls=None
+        if linefilter['type']!="All":
+            self.cls=globals()[linefilter['type']]
+        self.pushdown=pushdown
+        self.stage_types=None
+        self.lcw3_only=False
+        if not pushdown:
+            self.stage_types=self.stages.get(linefilter['type'])
+            self.lcw3_only=linefilter['type']=="IridiumLCW3Message"
+        self.attr=linefilter['attr']
+        self.check=None
+        self.early_check=None
+        if linefilter['check']:
+            import ast
+            self.check=compile(linefilter['check'], "--filter", "eval")
+            if pushdown and early_expr(ast.parse(linefilter['check'], mode="eval")):
+                self.early_check=self.check
+        self._wants={}
+
+    def matches(self, cls):
+        return self.cls is None or issubclass(cls, self.cls)
+
+    def wants(self, *classes):
+        if self.cls is None or not self.pushdown:
+            return True
+        for cls in classes:
+            if cls not in self._wants:
+                self._wants[cls]=self.matches(cls) or self.wants(*upgrades.get(cls, []))
+            if self._wants[cls]:
+                return True
+        return False
+
+    def early_reject(self, q):
+        if self.early_check is None:
+            return False
+        try:
+            return not eval(self.early_check, {}, {'q': q})
+        except Exception:
+            return False # let the full check decide
+
+    def match(self, q):
+        if not self.matches(type(q)):
+            return False
+        if self.attr and self.attr not in q.__dict__:
+            return False
+        return True
+
+def early_expr(tree):
+    """True if tree only uses builtins and q.<early_attrs>"""
+    import ast
+    import builtins
+    attrs=set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id=='q':
+            if node.attr not in early_attrs:
+                return False
+            attrs.add(id(node.value))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            if node.id=='q':
+                if id(node) not in attrs:
+                    return False
+            elif not hasattr(builtins, node.id):
+                return False
+    return True
+
+filter_plan=None
+
+def bits_join(blocks): # descrambled is either a Bits or a list of them
+    if isinstance(blocks, Bits):
+        return blocks
+    return Bits.cat(blocks)
+
+def ints_rev8(bits): # like [int(x[::-1],2) for x in slice(bits,8)]
+    vals=[REV8[x] for x in bits.ints(8)]
+    if len(bits)%8:
+        vals[-1]=int(bits[-(len(bits)%8):][::-1])
+    return vals
+
+def nnrepair_memo(memo,poly,num):
+    """nnrepair() with the result kept in memo (a message's bch_memo)"""
+    key=(poly,num)
+    if key not in memo:
+        memo[key]=nnrepair(poly,num)
+    return memo[key]
+
+def bch_repair(poly,bits,memo=None):
+    if memo is None:
+        (errs,num)=nnrepair(poly,bits.val)
+    else:
+        (errs,num)=nnrepair_memo(memo,poly,bits.val)
+    repaired=Bits(num,bits.len)
+    return (errs,repaired[:-poly.bit_length()+1],repaired[-poly.bit_length()+1:])
+
+def bch_repair1(poly,bits,memo=None):
+    if memo is None:
+        (errs,num)=nnrepair1(poly,bits.val,bits.len)
+    else:
+        key=(poly,bits.val,bits.len)
+        if key not in memo:
+            memo[key]=nnrepair1(poly,bits.val,bits.len)
+        (errs,num)=memo[key]
+    repaired=Bits(num,bits.len)
+    return (errs,repaired[:-poly.bit_length()+1],repaired[-poly.bit_length()+1:])
+
+# The de-interleavers are bit permutations, built once per block length
+_de_interleave={}
 def de_interleave(group):
-    symbols = [group[z+1]+group[z] for z in range(0,len(group),2)]
-    even = ''.join([symbols[x] for x in range(len(symbols)-2,-1, -2)])
-    odd  = ''.join([symbols[x] for x in range(len(symbols)-1,-1, -2)])
-    return (odd,even)
-
+    n=len(group)
+    if n not in _de_interleave:
+        symbols = [(z+1,z) for z in range(0,n,2)]
+        even = [i for x in range(len(symbols)-2,-1, -2) for i in symbols[x]]
+        odd  = [i for x in range(len(symbols)-1,-1, -2) for i in symbols[x]]
+        _de_interleave[n]=BitPermutation(n,(odd,even))
+    return _de_interleave[n](group)
+
+_de_interleave3={}
 def de_interleave3(group):
-    symbols = [group[z+1]+group[z] for z in range(0,len(group),2)]
-    third  = ''.join([symbols[x] for x in range(len(symbols)-3, -1, -3)])
-    second = ''.join([symbols[x] for x in range(len(symbols)-2, -1, -3)])
-    first  = ''.join([symbols[x] for x in range(len(symbols)-1, -1, -3)])
-    return (first,second,third)
-
-def de_interleave_lcw(bits):
-    tbl= [ 40, 39, 36, 35, 32, 31, 28, 27, 24, 23, 20, 19, 16, 15, 12, 11,  8,  7,  4,  3,
+    n=len(group)
+    if n not in _de_interleave3:
+        symbols = [(z+1,z) for z in range(0,n,2)]
+        third  = [i for x in range(len(symbols)-3, -1, -3) for i in symbols[x]]
+        second = [i for x in range(len(symbols)-2, -1, -3) for i in symbols[x]]
+        first  = [i for x in range(len(symbols)-1, -1, -3) for i in symbols[x]]
+        _de_interleave3[n]=BitPermutation(n,(first,second,third))
+    return _de_interleave3[n](group)
+
+lcw_tbl= [ 40, 39, 36, 35, 32, 31, 28, 27, 24, 23, 20, 19, 16, 15, 12, 11,  8,  7,  4,  3,
            41, 38, 37, 34, 33, 30, 29, 26, 25, 22, 21, 18, 17, 14, 13, 10,  9,  6,  5,  2,
             1, 46, 45, 44, 43, 42]
-    lcw=[bits[x-1:x] for x in tbl]
-    return (''.join(lcw[:7]),''.join(lcw[7:20]),''.join(lcw[20:]))
+lcw_permutation=BitPermutation(46,([x-1 for x in lcw_tbl[:7]],[x-1 for x in lcw_tbl[7:20]],[x-1 for x in lcw_tbl[20:]]))
+
+def de_interleave_lcw(bits):
+    if len(bits)!=len(lcw_tbl): # only with --forcetype on short frames
+        lcw=[bits[x-1:x] for x in lcw_tbl]
+        return (Bits.cat(lcw[:7]),Bits.cat(lcw[7:20]),Bits.cat(lcw[20:]))
+    return lcw_permutation(bits)
 
 def messagechecksum(msg):
     csum=0
@@ -2014,11 +2382,9 @@ def checksum_16(msg):
     return csum^0xffff
 
 def de_dqpsk(bits):
-    symbols=[]
     imap=[0,1,3,2]
     # back into bpsk symbols
-    for x in range(0,len(bits)-1,2):
-        symbols.append(imap[int(bits[x+0])*2 + int(bits[x+1])])
+    symbols=[imap[x] for x in bits[:len(bits)-len(bits)%2].ints(2)]
 
     # undo differential decoding
     for c in range(1,len(symbols)):
@@ -2027,19 +2393,37 @@ def de_dqpsk(bits):
     return symbols
 
 def split_qpsk(symbols):
-    i_list=""
-    q_list=""
-    for sym in symbols:
-        if sym==0:
-            i_list+="0"
-            q_list+="0"
-        elif sym==1:
-            i_list+="1"
-            q_list+="0"
-        elif sym==2:
-            i_list+="1"
-            q_list+="1"
-        elif sym==3:
-            i_list+="0"
-            q_list+="1"
-    return (i_list,q_list)
+    i_list="".join(["0110"[sym] for sym in symbols])
+    q_list="".join(["0011"[sym] for sym in symbols])
+    return (Bits.fromstr(i_list),Bits.fromstr(q_list))
+
+def bench(filename):
+    """time splitting the input lines into fields, per line and per filename"""
+    import timeit
+    lines=[l.strip() for l in open(filename)]
+    fn_res=(fn_ts_p, fn_ts_old_p, fn_ts_b26_p, fn_ts_float_p)
+
+    def regex(): # as done before: group() per field, filename regexes every line
+        for l in lines:
+            m=Message.p.match(l)
+            if m:
+                [m.group(i) for i in range(1, 14)]
+                for p in fn_res:
+                    if p.match(m.group(2)):
+                        break
+
+    def memo():
+        for l in lines:
+            g=tokenize(l)
+            if g:
+                parse_filename(g[1])
+
+    fn_info.clear()
+    t_regex=timeit.timeit(regex, number=1)
+    t_memo=timeit.timeit(memo, number=1)
+    print("%-8s %10s %10s %6s"%("lines","regex[us]","memo[us]","gain"))
+    print("%-8d %10.3f %10.3f %5.1fx"%(len(lines), t_regex/len(lines)*1e6, t_memo/len(lines)*1e6, t_regex/t_memo))
+
+if __name__ == "__main__":
+    if len(sys.argv)>2 and sys.argv[1]=="bench":
+        bench(sys.argv[2])
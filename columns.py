@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# vim: set ts=4 sw=4 tw=0 et pm=:
+
+# Columnar output of parsed frames (iridium-parser.py -o columns).
+#
+# Every field becomes a typed array. Fields every frame has keep their
+# type (see DTYPES), other numeric fields are float64 with NaN where a
+# frame doesn't have them, and strings (like "type") are stored as int32
+# codes into a list of categories, -1 if missing. A float column becomes a
+# category column when a string shows up in it later.
+#
+# The output is either a directory with one raw little-endian file per
+# field (<field>.bin, appended in chunks, readable with np.memmap) and a
+# schema.json, or a single .npz file with the schema in "_schema".
+#
+#   (cols, schema)=columns.load("out.cols")
+#   ira=cols["type"]==schema["categories"]["type"].index("IridiumRAMessage")
+#   plt.plot(cols["globalns"][ira], cols["ra_alt"][ira], ".")
+
+import os
+import json
+
+import numpy as np
+
+DEFAULT_FIELDS=["globalns", "frequency", "type", "confidence", "level", "snr", "noise",
+        "ra_sat", "ra_cell", "ra_pos_x", "ra_pos_y", "ra_pos_z", "ra_alt",
+        "iri_time", "iri_time_ux", "sv_id", "beam_id", "slot"]
+
+DTYPES={"globalns": "<i8", "frequency": "<i8", "confidence": "u1", "level": "<f8",
+        "snr": "<f8", "noise": "<f8", "type": "category"}
+
+CHUNK_ROWS=1<<16
+
+def row(q, fields):
+    """the values of fields for frame q, None where q doesn't have them"""
+    return tuple(type(q).__name__ if f=="type" else getattr(q, f, None) for f in fields)
+
+class ColumnWriter(object):
+    def __init__(self, path, fields):
+        self.path=path
+        self.fields=fields
+        self.npz=path.endswith(".npz")
+        self.dtypes=dict(DTYPES)
+        self.categories={}
+        self.rows=[]
+        self.count=0
+        self.chunks={f: [] for f in fields}
+        self.files={}
+        if not self.npz:
+            os.makedirs(path, exist_ok=True)
+
+    def add(self, q):
+        self.rows.append(row(q, self.fields))
+        if len(self.rows)>=CHUNK_ROWS:
+            self.flush()
+
+    def extend(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows)>=CHUNK_ROWS:
+            self.flush()
+
+    def column(self, name, values):
+        if name not in self.dtypes:
+            v=next((v for v in values if v is not None), None)
+            if v is None or isinstance(v, (int, float, np.number)):
+                self.dtypes[name]="<f8"
+            else:
+                self.dtypes[name]="category"
+        dtype=self.dtypes[name]
+        if dtype=="<f8":
+            try:
+                return np.array([np.nan if v is None else v for v in values], dtype=dtype)
+            except (ValueError, TypeError):
+                if name in DTYPES:
+                    raise
+                # the first chunk had no value or a number, this one a string
+                self.to_category(name)
+                dtype="category"
+        if dtype=="category":
+            codes=self.categories.setdefault(name, {})
+            return np.array([-1 if v is None else codes.setdefault(str(v), len(codes)) for v in values], dtype="<i4")
+        return np.array(values, dtype=dtype)
+
+    def to_category(self, name):
+        """turn the float column written so far into category codes"""
+        codes=self.categories.setdefault(name, {})
+        def convert(arr):
+            return np.array([-1 if np.isnan(x) else codes.setdefault(str(int(x)) if x.is_integer() else str(x), len(codes))
+                for x in arr.tolist()], dtype="<i4")
+        if self.npz:
+            self.chunks[name]=[convert(c) for c in self.chunks[name]]
+        elif name in self.files:
+            self.files[name].close()
+            fn=os.path.join(self.path, name+".bin")
+            arr=convert(np.fromfile(fn, dtype="<f8"))
+            self.files[name]=open(fn, "wb")
+            arr.tofile(self.files[name])
+        self.dtypes[name]="category"
+
+    def flush(self):
+        if not self.rows:
+            return
+        for (name, values) in zip(self.fields, zip(*self.rows)):
+            arr=self.column(name, values)
+            if self.npz:
+                self.chunks[name].append(arr)
+            else:
+                if name not in self.files:
+                    self.files[name]=open(os.path.join(self.path, name+".bin"), "wb")
+                arr.tofile(self.files[name])
+        self.count+=len(self.rows)
+        self.rows=[]
+        if not self.npz:
+            for f in self.files.values():
+                f.flush()
+            self.write_schema()
+
+    def write_schema(self):
+        with open(os.path.join(self.path, "schema.json"), "w") as f:
+            json.dump(self.schema(), f, indent=1)
+
+    def dtype(self, name):
+        """numpy dtype of a column (before it has values: float64)"""
+        dtype=self.dtypes.get(name, "<f8")
+        if dtype=="category":
+            return "<i4"
+        return dtype
+
+    def schema(self):
+        return {
+            "rows": self.count,
+            "fields": [{"name": f, "dtype": self.dtype(f)} for f in self.fields],
+            "categories": {name: list(codes) for (name, codes) in self.categories.items()},
+        }
+
+    def close(self):
+        self.flush()
+        if self.npz:
+            arrays={f: np.concatenate(c) if c else np.zeros(0, self.dtype(f)) for (f, c) in self.chunks.items()}
+            arrays["_schema"]=np.array(json.dumps(self.schema()))
+            np.savez(self.path, **arrays)
+        else:
+            for f in self.files.values():
+                f.close()
+            self.write_schema()
+
+def load(path):
+    """(columns, schema) of an output of ColumnWriter, the columns of a
+    directory are memory mapped"""
+    if path.endswith(".npz"):
+        data=np.load(path)
+        schema=json.loads(str(data["_schema"]))
+        return ({f["name"]: data[f["name"]] for f in schema["fields"]}, schema)
+    with open(os.path.join(path, "schema.json")) as f:
+        schema=json.load(f)
+    cols={}
+    for f in schema["fields"]:
+        if schema["rows"]==0:
+            cols[f["name"]]=np.zeros(0, f["dtype"])
+        else:
+            cols[f["name"]]=np.memmap(os.path.join(path, f["name"]+".bin"), dtype=f["dtype"], mode="r", shape=(schema["rows"],))
+    return (cols, schema)
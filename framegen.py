@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# vim: set ts=4 sw=4 tw=0 et pm=:
+
+# Synthetic RAW: lines for every frame type bitsparser understands, for
+# tests and benchmarks (see tests/bench_parser.py). Each generator builds
+# the frame content with random fields and encodes it the way the parser
+# decodes it (BCH, interleaving, RS, CRCs, DQPSK for ITL), optionally with
+# bit errors injected after the access code.
+#
+#   framegen.py -n 1000 -t IRA,IBC -e 1.5 > test.bits
+#   framegen.py -n 10000 -m capture > mix.bits
+
+import random
+import argparse
+
+import bch
+import rs
+import rs6
+import itl
+from bitsparser import iridium_access, uplink_access, next_access_dl, header_messaging, header_time_location
+from bitsparser import lcw_tbl, iip_crc24, ida_crc16, iaq_crc16
+
+F_SIMPLEX=1626270000
+F_DUPLEX= 1622000000
+
+def tobits(val, n):
+    return ("{0:0%db}"%n).format(val)
+
+def rbits(rng, n):
+    return tobits(rng.getrandbits(n), n) if n>0 else ""
+
+def bytes_to_bits(data, reverse=False):
+    if reverse:
+        return "".join(tobits(x, 8)[::-1] for x in data)
+    return "".join(tobits(x, 8) for x in data)
+
+def bch_encode(poly, data, dlen):
+    r=poly.bit_length()-1
+    val=int(data, 2)<<r if data else 0
+    return tobits(val|bch.nndivide(poly, val), dlen+r)
+
+def with_parity(block):
+    return block+str(block.count('1')%2)
+
+def interleave(odd, even):
+    """inverse of bitsparser.de_interleave"""
+    nsym=(len(odd)+len(even))//2
+    sym=[None]*nsym
+    for j in range(len(odd)//2):
+        sym[nsym-1-2*j]=odd[2*j:2*j+2]
+        sym[nsym-2-2*j]=even[2*j:2*j+2]
+    return "".join(s[1]+s[0] for s in sym)
+
+def interleave3(first, second, third):
+    """inverse of bitsparser.de_interleave3"""
+    nsym=(len(first)+len(second)+len(third))//2
+    sym=[None]*nsym
+    for j in range(len(first)//2):
+        sym[nsym-1-3*j]=first[2*j:2*j+2]
+        sym[nsym-2-3*j]=second[2*j:2*j+2]
+        sym[nsym-3-3*j]=third[2*j:2*j+2]
+    return "".join(s[1]+s[0] for s in sym)
+
+def interleave_lcw(lcw1, lcw2, lcw3):
+    lcw=lcw1+lcw2+lcw3
+    bits=[None]*len(lcw_tbl)
+    for (k, x) in enumerate(lcw_tbl):
+        bits[x-1]=lcw[k]
+    return "".join(bits)
+
+def symbol_reverse(bits):
+    return "".join(bits[x+1]+bits[x] for x in range(0, len(bits)-1, 2))
+
+def solve_crc(fn, prefix, nbytes, suffix=b""):
+    """the nbytes to put after prefix so that fn(...)==0, CRCs are affine
+    so this is a linear system over GF(2)"""
+    base=fn(prefix+bytes(nbytes)+suffix)
+    rows=[]
+    for i in range(nbytes*8):
+        v=fn(prefix+(1<<i).to_bytes(nbytes, 'big')+suffix)^base
+        m=1<<i
+        for (rv, rm) in rows:
+            if v^rv<v:
+                v^=rv
+                m^=rm
+        if v:
+            rows.append((v, m))
+            rows.sort(reverse=True)
+    (v, m)=(base, 0)
+    for (rv, rm) in rows:
+        if v^rv<v:
+            v^=rv
+            m^=rm
+    if v:
+        raise ValueError("crc not solvable")
+    return m.to_bytes(nbytes, 'big')
+
+def rs8_payload(msg):
+    """RS(47,31), the last 8 bytes of the checksum are not sent"""
+    return list(rs.codec.encode(msg)[:39])
+
+def rs6_payload(msg):
+    return list(rs6.codec.encode(msg))
+
+# generators: (frequency, uplink, bits after the access code),
+# uplink is 0, 1 or 'next'
+
+def gen_ira(rng):
+    hdr=tobits(rng.randrange(1, 67), 7)+tobits(rng.randrange(48), 6)
+    for _ in range(3):
+        hdr+=rbits(rng, 12)
+    hdr+=tobits(rng.randrange(128), 7)+rbits(rng, 2)+tobits(rng.randrange(32), 5)
+    pages=[]
+    for _ in range(rng.randrange(0, 4)):
+        pages.append(rbits(rng, 32)+"00"+tobits(rng.randrange(32), 5)+"000")
+    pages.append("1"*42)
+    blocks=[with_parity(bch_encode(1207, hdr[i*21:(i+1)*21], 21)) for i in range(3)]
+    data=interleave3(*blocks)
+    for p in pages:
+        b=[with_parity(bch_encode(1207, p[i*21:(i+1)*21], 21)) for i in range(2)]
+        data+=interleave(*b)
+    return (F_SIMPLEX+rng.randrange(-30000, 30000), 0, data)
+
+def gen_ibc(rng):
+    hdr=bch_encode(29, tobits(0, 2), 2)
+    b0=tobits(rng.randrange(1, 67), 7)+tobits(rng.randrange(48), 6)+"0"+rbits(rng, 2)+rbits(rng, 16)+tobits(rng.randrange(32), 5)+rbits(rng, 3)+"00"
+    b1=tobits(1, 6)+"0000"+tobits(rng.getrandbits(32), 32)
+    asg=[]
+    for _ in range(2):
+        if rng.random()<.5:
+            asg.append("111"+"0"*39)
+        else:
+            asg.append("000"+rbits(rng, 8)+rbits(rng, 2)+rbits(rng, 5)+rbits(rng, 5)+rbits(rng, 3)+rbits(rng, 8)+rbits(rng, 6)+"00")
+    data=hdr
+    for blk in [b0, b1]+asg:
+        b=[with_parity(bch_encode(1207, blk[i*21:(i+1)*21], 21)) for i in range(2)]
+        data+=interleave(*b)
+    return (F_DUPLEX+rng.randrange(0, 3000000), 0, data)
+
+def gen_ims(rng):
+    bch_blocks=rng.randrange(3, 8)
+    nblk=2*bch_blocks
+    blocks=["0"+"0000"+tobits(rng.randrange(16), 4)+tobits(rng.randrange(48), 6)+tobits(bch_blocks, 4)+tobits(rng.randrange(4), 2)]
+    body="".join([tobits(rng.getrandbits(22), 22), tobits(5, 5), tobits(rng.randrange(62), 6), "0000", rbits(rng, 6),
+                  rbits(rng, 4), "0", "0", rbits(rng, 7)])
+    nbody=nblk-2
+    text="".join(tobits(rng.randrange(32, 127), 7) for _ in range(nbody*20//7))
+    body=(body+text+"0"*20*nbody)[:20*nbody]
+    for i in range(nbody):
+        blocks.append("0"+body[i*20:(i+1)*20])
+    blocks.append("1"*21)
+    data=header_messaging
+    for i in range(0, nblk, 2):
+        b=[with_parity(bch_encode(1897, blocks[i+x], 21)) for x in range(2)]
+        data+=interleave(*b)
+    return (F_SIMPLEX+rng.randrange(-30000, 30000), 0, data)
+
+def gen_itl(rng):
+    plane=rng.randrange(1, 7)
+    if plane%2==0:
+        types=rng.choice(([0, 1, 2, 3], [1, 0, 3, 2]))
+    else:
+        types=rng.choice(([2, 3, 0, 1], [3, 2, 1, 0]))
+    nums=[rng.randrange(66)]+[rng.randrange(128) for _ in range(3)]
+    ihex=itl.PRS_HDR[2]+itl.PRS_PLANES[plane-1]
+    qhex="".join(itl.PRS_LIST[t*128+n] for (t, n) in zip(types, nums))
+    ibits=tobits(int(ihex, 16), len(ihex)*4)
+    qbits=tobits(int(qhex, 16), len(qhex)*4)
+    symmap={("0", "0"): 0, ("1", "0"): 1, ("1", "1"): 2, ("0", "1"): 3}
+    syms=[symmap[(i, q)] for (i, q) in zip(ibits, qbits)]
+    diff=[syms[0]]+[(syms[c]-syms[c-1])%4 for c in range(1, len(syms))]
+    inv={0: "00", 1: "01", 3: "10", 2: "11"}
+    data=header_time_location+"".join(inv[x] for x in diff)
+    return (F_SIMPLEX+rng.randrange(-30000, 30000), 0, data)
+
+def lcw(rng, ft):
+    lcw1=bch_encode(29, tobits(ft, 3), 3)
+    lcw2=bch_encode(465, rng.choice(("001100", "000000", "000011", "011100", "010001")), 6)[:13]
+    lcw3=bch_encode(41, rbits(rng, 21), 21)
+    return interleave_lcw(lcw1, lcw2, lcw3)
+
+def gen_lcw(rng, ft, payload, uplink=0):
+    return (F_DUPLEX+rng.randrange(0, 3000000), uplink, lcw(rng, ft)+payload)
+
+def gen_voc(rng):
+    return gen_lcw(rng, 0, rbits(rng, 312))
+
+def gen_vod(rng):
+    return gen_lcw(rng, 0, bytes_to_bits(rs8_payload(bytes(rng.getrandbits(8) for _ in range(31)))))
+
+def gen_vo6(rng):
+    syms=rs6_payload([rng.randrange(64) for _ in range(42)])
+    return gen_lcw(rng, 0, "".join(tobits(x, 6) for x in syms))
+
+def crc24_payload(rng):
+    data=bytes([4, rng.randrange(256), rng.randrange(256), rng.randrange(256)])
+    n=rng.randrange(0, 31)
+    data+=bytes([n])+bytes(rng.getrandbits(8) for _ in range(n))+bytes(31-n)
+    return data+solve_crc(iip_crc24, data, 3)
+
+def gen_vda(rng):
+    return gen_lcw(rng, 0, bytes_to_bits(crc24_payload(rng), reverse=True))
+
+def gen_iip(rng):
+    return gen_lcw(rng, 1, bytes_to_bits(crc24_payload(rng), reverse=True))
+
+def gen_iiq(rng):
+    return gen_lcw(rng, 1, bytes_to_bits(rs8_payload(bytes(rng.getrandbits(8) for _ in range(31)))))
+
+def gen_ida(rng):
+    da_len=rng.randrange(0, 21)
+    hdr="0000"+"0"+tobits(rng.randrange(8), 3)+"000"+tobits(da_len, 5)+"0"+"000"
+    payload=bytes(rng.getrandbits(8) for _ in range(da_len))+bytes(20-da_len)
+    pbits=bytes_to_bits(payload)
+    crcin=bytes(int(x, 2) for x in [(hdr+"0"*12+pbits)[i:i+8] for i in range(0, 192, 8)])
+    crc=solve_crc(ida_crc16, crcin, 2)
+    bsb=hdr+pbits+bytes_to_bits(crc)+"0000"
+    blocks=[bch_encode(3545, bsb[i*20:(i+1)*20], 20) for i in range(10)]
+    payload=""
+    for k in range(2):
+        (b4, b2, b3, b1)=blocks[4*k:4*k+4]
+        x=b1+b2+b3+b4
+        payload+=interleave(x[:62], x[62:])
+    (b2, b1)=blocks[8:10]
+    payload+=interleave("0"+b1, "0"+b2)
+    return gen_lcw(rng, 2, payload)
+
+def gen_isy(rng):
+    return gen_lcw(rng, 7, "10"*156)
+
+def gen_iu3(rng):
+    return gen_lcw(rng, 3, rbits(rng, 312))
+
+def gen_i38(rng):
+    return gen_lcw(rng, 3, bytes_to_bits(rs8_payload(bytes(rng.getrandbits(8) for _ in range(31)))))
+
+def gen_i36(rng):
+    syms=rs6_payload([rng.randrange(64) for _ in range(42)])
+    return gen_lcw(rng, 3, "".join(tobits(x, 6) for x in syms))
+
+def gen_iaq(rng):
+    sym=rbits(rng, 4)+rbits(rng, 8)
+    val=bytes([int(sym[:4], 2), int(sym[4:12], 2)])
+    sym+=tobits(iaq_crc16(val)>>2, 14)
+    data="".join(x+x for x in sym)+rbits(rng, rng.randrange(0, 40))
+    return (F_DUPLEX+rng.randrange(0, 3000000), 1, data)
+
+def gen_nxt(rng):
+    data=rbits(rng, 176)+"1"*30+rbits(rng, 60)
+    return (F_DUPLEX+rng.randrange(0, 3000000), 'next', data)
+
+def gen_err(rng):
+    return (F_DUPLEX+rng.randrange(0, 3000000), rng.randrange(2), rbits(rng, 2*rng.randrange(10, 150)))
+
+# frame type (as the first word of the parser output, ERR: undecodable) -> generator
+GENERATORS={
+    'IRA': gen_ira, 'IBC': gen_ibc, 'MSG': gen_ims, 'ITL': gen_itl,
+    'VOC': gen_voc, 'VOD': gen_vod, 'VO6': gen_vo6, 'VDA': gen_vda,
+    'IIP': gen_iip, 'IIQ': gen_iiq, 'IDA': gen_ida, 'ISY': gen_isy,
+    'IU3': gen_iu3, 'I38': gen_i38, 'I36': gen_i36, 'IAQ': gen_iaq,
+    'NXT': gen_nxt, 'ERR': gen_err,
+}
+
+# relative frequencies of the frame types. "capture" is a rough guess of
+# a capture with a roof antenna, not measured.
+MIXES={
+    'uniform': {t: 1 for t in GENERATORS},
+    'capture': {'IRA': 25, 'IBC': 20, 'MSG': 5, 'ITL': 5, 'VOC': 10, 'VOD': 2, 'VO6': 1, 'VDA': 1,
+                'IIP': 3, 'IIQ': 2, 'IDA': 8, 'ISY': 5, 'IU3': 1, 'I38': 1, 'I36': 1, 'IAQ': 5,
+                'NXT': 5, 'ERR': 15},
+}
+
+def inject_errors(rng, bits, errors):
+    bits=list(bits)
+    for pos in rng.sample(range(len(bits)), min(errors, len(bits))):
+        bits[pos]="1" if bits[pos]=="0" else "0"
+    return "".join(bits)
+
+def make_line(typ, rng, ts, errors=0, fileid=1598047209, lineno=0):
+    (freq, uplink, data)=GENERATORS[typ](rng)
+    if errors>0:
+        data=inject_errors(rng, data, errors)
+    if uplink=='next':
+        bits=next_access_dl+data
+    elif uplink:
+        bits=uplink_access+data
+    else:
+        bits=iridium_access+data
+    bits=symbol_reverse(bits)
+    return "RAW: i-%d-t1 %012.4f %010d N:%05.2f%+06.2f I:%011d %3d%% %.5f %3d %s"%(
+        fileid, ts, freq, 30+rng.random()*10, -80-rng.random()*10, lineno,
+        rng.randrange(70, 101), rng.random()/10, len(bits)//2-12, bits)
+
+def lines(count, types=None, mix=None, errors=0, seed=0):
+    """count lines, of the types in turn or drawn with the weights of mix,
+    with on average errors bit errors each"""
+    rng=random.Random(seed)
+    if mix is not None:
+        (types, weights)=zip(*MIXES[mix].items())
+    elif types is None:
+        types=list(GENERATORS)
+    ts=0.0
+    for n in range(count):
+        ts+=rng.random()*10
+        if mix is not None:
+            typ=rng.choices(types, weights)[0]
+        else:
+            typ=types[n%len(types)]
+        errs=int(errors)+(1 if rng.random()<errors%1 else 0)
+        yield make_line(typ, rng, ts, errors=errs, lineno=n)
+
+def main():
+    parser=argparse.ArgumentParser(description="Generate synthetic RAW: lines")
+    parser.add_argument("-n", "--count", type=int, default=1000, help="number of lines (default: %(default)s)")
+    parser.add_argument("-t", "--types", default=None, help="comma separated frame types, in turn (default: all): "+",".join(GENERATORS))
+    parser.add_argument("-m", "--mix", choices=list(MIXES), help="draw the types with the weights of a mix instead")
+    parser.add_argument("-e", "--errors", type=float, default=0, help="average bit errors per frame")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args=parser.parse_args()
+
+    types=None
+    if args.types:
+        types=args.types.split(',')
+        for t in types:
+            if t not in GENERATORS:
+                parser.error("unknown frame type %s"%t)
+    for line in lines(args.count, types, args.mix, args.errors, args.seed):
+        print(line)
+
+if __name__=="__main__":
+    main()
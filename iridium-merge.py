@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# vim: set ts=4 sw=4 tw=0 et pm=:
+
+# Merge the .bits or .parsed files of several receivers into one stream
+# ordered by time (globalns), e.g.
+#   iridium-merge.py rx1.bits rx2.bits.xz | iridium-parser.py
+#   iridium-merge.py rx1.parsed rx2.parsed | reassembler.py -m live-stats
+#
+# Each input is read through a look-ahead window of --window lines, which
+# puts slightly out of order lines back in order. Memory use only depends
+# on the number of inputs and the window, not on the file sizes.
+
+import sys
+import argparse
+import heapq
+import itertools
+import os
+
+from bitsparser import parse_filename
+
+parser = argparse.ArgumentParser(description="time ordered merge of .bits/.parsed files")
+
+def parse_offsets(arg):
+    return [float(x) for x in arg.split(',')]
+
+parser.add_argument("-w", "--window", type=int, default=1000, metavar='N',
+        help="look-ahead per input to reorder lines (default: %(default)s)")
+parser.add_argument("--offset", type=parse_offsets, default=[], metavar='MS[,MS...]',
+        help="clock correction in ms for each input, added to the timestamps")
+parser.add_argument("-o", "--output", default=None,
+        help="output filename")
+parser.add_argument("inputs", nargs='+', metavar='FILE',
+        help="input files, .gz/.bz2/.xz are decompressed")
+
+args = parser.parse_args()
+
+if len(args.offset) > len(args.inputs):
+    print("ERR: more --offset values than inputs", file=sys.stderr)
+    exit(1)
+
+def open_input(filename):
+    if filename == '-':
+        return sys.stdin
+    ext = os.path.splitext(filename)[1]
+    if ext == '.gz':
+        import gzip
+        return gzip.open(filename, 'rt')
+    elif ext == '.bz2':
+        import bz2
+        return bz2.open(filename, 'rt')
+    elif ext == '.xz':
+        import lzma
+        return lzma.open(filename, 'rt')
+    return open(filename, 'rt')
+
+def shift(field, offset):
+    """add offset to a fixed point number, keeping its format"""
+    decimals = len(field)-field.index('.')-1 if '.' in field else 0
+    return "%0*.*f" % (len(field), decimals, float(field)+offset)
+
+def globalns(f):
+    """time of a split .bits or .parsed line, None if it has none"""
+    try:
+        ts = float(f[2])
+    except (IndexError, ValueError):
+        return None
+    if f[0] in ('RAW:', 'RWA:', 'NC1:'):
+        info = parse_filename(f[1])
+        if info is None:
+            return int(ts*10**6)
+        (startts, offset, _, _) = info
+        return startts*10**9+int((ts+offset)*10**6)
+    if f[1].startswith('p-'):
+        startts = f[1][2:].partition('-')[0]
+        if startts.isdigit():
+            return int(startts)*10**9+int(ts*10**6)
+    return int(ts*10**6)
+
+def keyed(n, lines, offset):
+    """(globalns, input, line no, line) for every line, lines without a time
+    get the one of the line before"""
+    last = 0
+    for (i, line) in enumerate(lines):
+        if offset:
+            f = line.split(' ', 3)
+            if len(f) > 3 and globalns(f) is not None:
+                f[2] = shift(f[2], offset)
+                line = ' '.join(f)
+        ns = globalns(line.split(' ', 3))
+        if ns is None:
+            ns = last
+        last = ns
+        yield (ns, n, i, line)
+
+def reorder(items, window):
+    """sort items within a window of the given size"""
+    heap = list(itertools.islice(items, window))
+    heapq.heapify(heap)
+    for item in items:
+        yield heapq.heappushpop(heap, item)
+    while heap:
+        yield heapq.heappop(heap)
+
+out = sys.stdout if args.output is None else open(args.output, 'wt')
+streams = []
+for (n, filename) in enumerate(args.inputs):
+    offset = args.offset[n] if n < len(args.offset) else 0
+    streams.append(reorder(keyed(n, open_input(filename), offset), args.window))
+
+late = 0
+last = None
+try:
+    for (ns, _, _, line) in heapq.merge(*streams):
+        if last is not None and ns < last:
+            late += 1
+        else:
+            last = ns
+        out.write(line.rstrip('\n')+'\n')
+except BrokenPipeError:
+    pass
+
+if late:
+    print("%d lines out of order by more than the window of %d lines" % (late, args.window), file=sys.stderr)
@@ -12,12 +12,19 @@ import argparse
 import collections.abc
 
 import bitsparser
+import bitsfile
 
 parser = argparse.ArgumentParser(formatter_class=lambda prog: argparse.HelpFormatter(prog, max_help_position=27))
 
 def parse_comma(arg):
     return arg.split(',')
 
+def parse_bins(arg):
+    bins = [float(x) for x in arg.split(',')]
+    if len(bins) != 2 or min(bins) <= 0:
+        raise argparse.ArgumentTypeError("expected two bin sizes > 0")
+    return bins
+
 def parse_filter(arg):
     linefilter = {'type': arg, 'attr': None, 'check': None}
     if ',' in linefilter['type']:
@@ -57,8 +64,12 @@ parser.add_argument("-s", "--satclass",    action="store_true", dest='dosatclass
                     help="enable sat classification")
 parser.add_argument("--plot", type=parse_comma, dest='plotargs', default='time,frequency', metavar='ARGS'
                     )
-parser.add_argument("-o", "--output", metavar='MODE', choices=['json', 'sigmf', 'zmq', 'line', 'plot', 'err', 'sat', 'file'],
+parser.add_argument("--plot-bins", type=parse_bins, dest='plotbins', metavar='X,Y',
+                    help="-o plot: count frames in bins of this size (time in seconds) instead of plotting each")
+parser.add_argument("-o", "--output", metavar='MODE', choices=['json', 'sigmf', 'zmq', 'line', 'plot', 'err', 'sat', 'file', 'columns'],
                     help="output mode")
+parser.add_argument("--compress", choices=['gz', 'xz', 'bz2'],
+                    help="compress the output of -o file or json")
 parser.add_argument("--errorfile", metavar='FILE',
                     help="divert unparsable lines to separate file")
 parser.add_argument("--errorstats", action='store_const', const={},
@@ -71,14 +82,68 @@ parser.add_argument("--format", type=parse_comma, dest='ofmt'
                     )
 parser.add_argument("--sigmf-annotate", dest='sigmffile'
                     )
+parser.add_argument("--columns", default='columns', metavar='PATH',
+                    help="output of -o columns: a directory or a .npz file")
+parser.add_argument("-j", "--jobs", type=int, default=1, metavar='N',
+                    help="decode in %(metavar)s worker processes")
+parser.add_argument("--checkpoint", action="store_true",
+                    help="save the progress in FILE.ckpt for each input FILE and continue from there")
+parser.add_argument("--follow", action="store_true",
+                    help="keep reading the growing input file")
+parser.add_argument("--spool", metavar='DIR',
+                    help="keep parsing the completed input files that appear in %(metavar)s")
+parser.add_argument("--spool-done", metavar='DIR',
+                    help="--spool: move the parsed input files here (default: SPOOL/done)")
+parser.add_argument("--spool-out", default='.', metavar='DIR',
+                    help="--spool: write the output files here (default: current directory)")
+parser.add_argument("--spool-interval", type=float, default=5, metavar='SECONDS',
+                    help="--spool: look for new files every %(metavar)s seconds (default: %(default)s)")
+parser.add_argument("--spool-settle", type=float, default=30, metavar='SECONDS',
+                    help="--spool: a file is complete when it hasn't changed for %(metavar)s seconds (default: %(default)s)")
+parser.add_argument("--zmq-url", default="tcp://127.0.0.1:4223", metavar='URL',
+                    help="where -o zmq publishes (default: %(default)s)")
+parser.add_argument("--zmq-hwm", type=int, default=1000, metavar='N',
+                    help="send high water mark for -o zmq (default: %(default)s)")
+parser.add_argument("--zmq-batch", type=int, default=1, metavar='N',
+                    help="send up to N consecutive frames of one type as one multipart message")
+parser.add_argument("--zmq-drop", action="store_true",
+                    help="drop frames when subscribers are too slow instead of waiting")
 parser.add_argument("--stats", "--no-stats", action=NegateAction, dest="do_stats", nargs=0,
                     help='enable incremental statistics on stderr')
+parser.add_argument("--profile", action="store_true",
+                    help="print the decode time per frame class on stderr at the end")
+parser.add_argument("--profile-interval", type=float, default=0, metavar='SECONDS',
+                    help="--profile: also print it every %(metavar)s seconds with --stats")
 parser.add_argument("remainder", nargs='*',
                     help=argparse.SUPPRESS)
 
 args = parser.parse_args()
 
 # sanity check
+if args.jobs < 1:
+    print("ERR: --jobs needs to be at least 1", file=sys.stderr)
+    exit(1)
+
+if args.jobs > 1 and (args.checkpoint or args.follow):
+    print("ERR: --checkpoint and --follow don't work with --jobs", file=sys.stderr)
+    exit(1)
+
+if args.follow and (len(args.remainder) != 1 or args.remainder[0] == '-' or os.path.splitext(args.remainder[0])[1] in ('.gz', '.bz2', '.xz')):
+    print("ERR: --follow needs a single uncompressed input file", file=sys.stderr)
+    exit(1)
+
+if args.spool and (args.remainder or args.checkpoint or args.follow):
+    print("ERR: --spool doesn't take input files, --checkpoint or --follow", file=sys.stderr)
+    exit(1)
+
+if args.spool and args.output not in (None, 'line', 'file', 'json'):
+    print("ERR: --spool only works with -o line, file or json", file=sys.stderr)
+    exit(1)
+
+if args.compress and (args.checkpoint or args.output not in (None, 'file', 'json')):
+    print("ERR: --compress only works with -o file or json and without --checkpoint", file=sys.stderr)
+    exit(1)
+
 if args.perfect and (args.harder or args.uwec):
     print("WARN: --perfect contradicts --harder or --uw-ec", file=sys.stderr)
 
@@ -91,7 +156,9 @@ if args.sigmffile:
 
 # try to be "intelligent" about defaults
 if args.output is None:
-    if len(args.remainder) == 0:
+    if args.spool:
+        args.output = 'file'
+    elif len(args.remainder) == 0:
         args.output = 'line'
     elif sys.stdout.isatty():
         args.output = 'file'
@@ -114,9 +181,20 @@ if args.output == "json":
 if args.output == "sigmf":
     import json
 
+if args.output == "columns":
+    import columns
+    colwriter=columns.ColumnWriter(args.columns, args.ofmt or columns.DEFAULT_FIELDS)
+
 if args.output == "zmq":
     args.errorfree=True
 
+if args.checkpoint:
+    import json
+
+if args.profile:
+    import parseprof
+    profile=parseprof.install()
+
 if args.do_stats:
     import curses
     statsfile=sys.stderr
@@ -175,41 +253,208 @@ if args.errorfile is not None:
 if args.output == "plot":
     import matplotlib.pyplot as plt
     import matplotlib.ticker as ticker
-    xl=[]
-    yl=[]
-    cl=[]
-    sl=[]
+    from array import array
+
+    class PlotData(object):
+        """The plotted values of every frame in arrays of doubles (a list
+        for a column with non-numeric values), or with bins only the
+        number of frames (and the sum of the color value) per bin."""
+        def __init__(self, bins=None):
+            self.bins=bins
+            self.cols=[array('d') for _ in args.plotargs]
+            self.cells={}
+
+        def add(self, *row):
+            if self.bins:
+                cell=(row[0]//self.bins[0], row[1]//self.bins[1])
+                c=self.cells.get(cell)
+                if c is None:
+                    c=self.cells[cell]=[0, 0]
+                c[0]+=1
+                if len(row)>2:
+                    c[1]+=row[2]
+                return
+            for (i, v) in enumerate(row):
+                try:
+                    self.cols[i].append(v)
+                except TypeError:
+                    if not isinstance(self.cols[i], list):
+                        self.cols[i]=list(self.cols[i])
+                    self.cols[i].append(v)
+
+        def extend(self, rows):
+            for row in rows:
+                self.add(*row)
+
+    plotattrs=["globalns" if a=="time" else a for a in args.plotargs]
+    if args.plotbins and args.plotargs[0]=="time":
+        args.plotbins[0]*=10**9
+    if args.plotbins and args.plotargs[1]=="time":
+        args.plotbins[1]*=10**9
+    plotdata=PlotData(args.plotbins)
+
+if args.output == "sat":
+    import tempfile
+    import shutil
+
+    class SatSpill(object):
+        """Assigns frames to satellites by their doppler curve while they
+        come in and appends them to a temporary file per satellite."""
+        MAX_OPEN=64
 
-poller = None
+        def __init__(self):
+            self.sats=[]
+            self.dir=tempfile.mkdtemp(prefix="iridium-sat-")
+            self.files=collections.OrderedDict()
+
+        def add(self, f, ns, line):
+            t=ns/1e9
+            sats=self.sats
+            # the last satellite the frame fits to
+            for no in range(len(sats)-1, -1, -1):
+                s=sats[no]
+                if f<s[0] and (s[0]-f)//(t+.000001-s[1])<250:
+                    s[0]=f
+                    s[1]=t
+                    break
+            else:
+                no=len(sats)
+                sats.append([f,t])
+            print(line, file=self.file(no))
+
+        def extend(self, rows):
+            for row in rows:
+                self.add(*row)
+
+        def path(self, no):
+            return os.path.join(self.dir, "%d"%no)
+
+        def file(self, no):
+            if no in self.files:
+                self.files.move_to_end(no)
+                return self.files[no]
+            if len(self.files)>=self.MAX_OPEN:
+                self.files.popitem(last=False)[1].close()
+            f=self.files[no]=open(self.path(no), "a")
+            return f
+
+        def close(self, out):
+            for f in self.files.values():
+                f.close()
+            self.files.clear()
+            for no in range(len(self.sats)):
+                print("Sat: %03d"%no, file=out)
+                out.flush()
+                with open(self.path(no)) as f:
+                    shutil.copyfileobj(f, out)
+            shutil.rmtree(self.dir)
+
+    satspill=SatSpill()
 
 if args.output == "zmq":
     import zmq
+    import queue
+    import itertools
+    from threading import Thread, Event
 
-    url = "tcp://127.0.0.1:4223"
+    class ZmqPublisher(object):
+        """Publishes the frames from a thread, fed by a bounded queue.
 
-    context = zmq.Context()
-    socket = context.socket(zmq.XPUB)
-    if args.do_stats:
-        socket.setsockopt(zmq.XPUB_VERBOSE, True)
-        stats['clients']=0
-        poller = zmq.Poller()
-        poller.register(socket, zmq.POLLIN)
-    socket.bind(url)
+        The topic of a frame is its type (the text up to the first ':').
+        With --zmq-batch=N up to N consecutive queued frames of the same
+        topic are sent as one multipart message, so the frames are still
+        published in input order. With --zmq-drop frames are dropped when
+        the queue or the send HWM is full, otherwise parsing waits."""
+        def __init__(self):
+            self.queue=queue.Queue(maxsize=max(args.zmq_hwm, 1000))
+            self.block=not args.zmq_drop
+            self.published=collections.Counter()
+            self.dropped=collections.Counter()
+            self.overflow=collections.Counter() # queue full, counted by the caller
+            self.npublished=0
+            self.ndropped=0
+            self.error=None
+            self.ready=Event()
+            self.thread=Thread(target=self.run, daemon=True, name='zmq')
+            self.thread.start()
+            self.ready.wait()
+            if self.error is not None:
+                raise self.error
 
+        def send_string(self, msg):
+            if self.block:
+                self.queue.put(msg)
+                return
+            try:
+                self.queue.put_nowait(msg)
+            except queue.Full:
+                self.overflow[msg.partition(':')[0]]+=1
+                self.ndropped+=1
 
-    def zmq_xpub(poller, stats):
-        try:
-            while len(rv:=poller.poll(0))>0:
-                event = rv[0][0].recv()
-                 # Event is one byte 0=unsub or 1=sub, followed by topic
-                if event[0] == 1:
-                    log("new subscriber for", event[1:])
-                    stats['clients'] += 1
-                elif event[0] == 0:
-                    log("unsubscribed",event[1:])
-                    stats['clients'] -= 1
-        except zmq.error.ContextTerminated:
-            pass
+        def run(self):
+            context=zmq.Context()
+            socket=context.socket(zmq.XPUB)
+            try:
+                socket.setsockopt(zmq.SNDHWM, args.zmq_hwm)
+                socket.setsockopt(zmq.XPUB_NODROP, True)
+                if args.do_stats:
+                    socket.setsockopt(zmq.XPUB_VERBOSE, True)
+                socket.bind(args.zmq_url)
+            except zmq.ZMQError as e:
+                self.error=e
+                self.ready.set()
+                return
+            self.ready.set()
+            poller=zmq.Poller()
+            poller.register(socket, zmq.POLLIN)
+            flags=0 if self.block else zmq.NOBLOCK
+            stop=False
+            while not stop:
+                try:
+                    msgs=[self.queue.get(timeout=0.1)]
+                except queue.Empty:
+                    msgs=[]
+                while msgs and len(msgs)<args.zmq_batch:
+                    try:
+                        msgs.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in msgs:
+                    msgs=msgs[:msgs.index(None)]
+                    stop=True
+                for (topic, batch) in itertools.groupby(msgs, key=lambda m: m.partition(':')[0]):
+                    batch=list(batch)
+                    try:
+                        if args.zmq_batch>1:
+                            socket.send_multipart([m.encode() for m in batch], flags)
+                        else:
+                            socket.send_string(batch[0], flags)
+                        self.published[topic]+=len(batch)
+                        self.npublished+=len(batch)
+                    except zmq.Again:
+                        self.dropped[topic]+=len(batch)
+                        self.ndropped+=len(batch)
+                while args.do_stats and poller.poll(0):
+                    event = socket.recv()
+                     # Event is one byte 0=unsub or 1=sub, followed by topic
+                    if event[0] == 1:
+                        log("new subscriber for", event[1:])
+                        stats['clients'] += 1
+                    elif event[0] == 0:
+                        log("unsubscribed",event[1:])
+                        stats['clients'] -= 1
+            socket.close()
+            context.term()
+
+        def close(self):
+            self.queue.put(None)
+            self.thread.join()
+            bitsparser.counters["zmq published"].update(self.published)
+            bitsparser.counters["zmq dropped"].update(self.dropped+self.overflow)
+
+    if args.do_stats:
+        stats['clients']=0
+    publisher=ZmqPublisher()
 
     def log(*msg):
         s=time.strftime("%Y-%m-%d %H:%M:%S",time.localtime())
@@ -221,6 +466,7 @@ def stats_thread(stats):
     stime=stats['start']
     stop=stats['stop']
 
+    ptime=ltime
     once=True
     while once or not stop.wait(timeout=1.0):
         once=False
@@ -234,78 +480,778 @@ def stats_thread(stats):
         if 'files' in stats and stats['files']>1:
             progress+="%d/%d:"%(stats['fileno'],stats['files'])
         if 'size' in stats and stats['size']>0:
-            try:
-                pos=os.lseek(fileinput.fileno(),0,os.SEEK_CUR)
-            except OSError:
-                pos=0
+            if 'pos' in stats:
+                pos=stats['pos']
+            else:
+                pos=input_pos()
             progress+="%4.1f%%"%(100*pos/stats['size'])
-            eta=stats['size']/pos*td - td
-            te="%02d:%02d"%(eta/60%60,eta%60)
-            if eta>60*60:
-                te="%02d:"%(eta/60/60)+te
-            progress+="/"+te
+            if pos>0:
+                eta=stats['size']/pos*td - td
+                te="%02d:%02d"%(eta/60%60,eta%60)
+                if eta>60*60:
+                    te="%02d:"%(eta/60/60)+te
+                progress+="/"+te
         if progress:
             hdr+=" [%s]"%progress
         else:
             hdr+=" l:%6d"%stats['in']
+        if args.spool:
+            hdr+=" files:%d queue:%d"%(stats['done'], stats['queue'])
         if args.output=='zmq':
-            hdr+=" %2d clients"%stats['clients']
+            hdr+=" %2d clients pub:%d drop:%d"%(stats['clients'], publisher.npublished, publisher.ndropped)
         print (hdr, "[%.1f l/s] filtered:%3d%%"%((nowl-lline)/(now-ltime),100*(1-stats['out']/(stats['in'] or 1))), end=eol, file=statsfile)
+        if args.profile and args.profile_interval>0 and now-ptime>=args.profile_interval:
+            print(eolnl.join(profile.table()), end=eolnl, file=statsfile)
+            ptime=now
         ltime=now
         lline=nowl
     print (hdr, "[%.1f l/s] drop:%3d%%"%((nowl)/(now-stime),100*(1-stats['out']/(stats['in'] or 1))), end=eolnl, file=statsfile)
 
 selected=[]
 
-def openhook(filename, mode):
+def output_base(filename):
     base, ext = os.path.splitext(os.path.basename(filename))
 
     if base.endswith('.bits'):
         base = os.path.splitext(base)[0]
-    if args.output == 'file':
-        sys.stdout = open(f'{base}.parsed', 'wt')
+    return (base, ext)
+
+def output_for(filename, mode='wt'):
+    base, ext = output_base(filename)
+    if args.output == 'file' and not args.spool:
+        if args.compress and args.jobs == 1:
+            finish_outputs()
+        sys.stdout = open_output(f'{base}.parsed', mode)
+        if mode == 'at' and output_size is not None:
+            # the output after the last checkpoint is written again
+            sys.stdout.truncate(output_size)
+        if args.compress:
+            outputs.append(sys.stdout)
+    return ext
+
+def open_output(filename, mode='wt'):
+    if args.compress:
+        return CompressWriter(filename+'.'+args.compress, mode.replace('t', 'b'))
+    return open(filename, mode)
+
+# --compress: the outputs that are not closed yet, in order
+outputs=[]
+
+def finish_outputs(upto=None):
+    """close the compressed outputs opened before upto (all without)"""
+    while outputs and outputs[0] is not upto:
+        outputs.pop(0).close()
+
+class CompressWriter(object):
+    """Text output that is compressed on a thread, the written text is
+    handed over in blocks through a bounded queue"""
+    BLOCK=1<<20
+
+    def __init__(self, file, mode='wb'):
+        import queue
+        import locale
+        import threading
+        if args.compress == 'gz':
+            import gzip
+            self.file=gzip.open(file, mode, compresslevel=6)
+        elif args.compress == 'bz2':
+            import bz2
+            self.file=bz2.open(file, mode)
+        else:
+            import lzma
+            self.file=lzma.open(file, mode)
+        self.encoding=locale.getpreferredencoding(False)
+        self.parts=[]
+        self.size=0
+        self.error=None
+        self.queue=queue.Queue(4)
+        self.thread=threading.Thread(target=self.run, daemon=True, name='compress')
+        self.thread.start()
+
+    def run(self):
+        try:
+            while True:
+                block=self.queue.get()
+                if block is None:
+                    break
+                self.file.write(block.encode(self.encoding))
+            self.file.close()
+        except Exception as e:
+            self.error=e
+            while self.queue.get() is not None:
+                pass
+
+    def write(self, s):
+        self.parts.append(s)
+        self.size+=len(s)
+        if self.size>=self.BLOCK:
+            self.flush()
+        return len(s)
+
+    def flush(self):
+        if self.error:
+            raise self.error
+        if self.parts:
+            self.queue.put("".join(self.parts))
+            self.parts=[]
+            self.size=0
+
+    def close(self):
+        if self.thread is None:
+            return
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+        self.thread=None
+        if self.error:
+            raise self.error
+
+class ReadAhead(object):
+    """Decompress a file on a thread, the lines are handed over in blocks
+    through a bounded queue"""
+    BLOCK=1<<20
+
+    def __init__(self, filename, opener):
+        import locale
+        import queue
+        from threading import Thread, Event
+        self.raw=open(filename, 'rb')
+        self.file=opener(self.raw)
+        self.encoding=locale.getpreferredencoding(False)
+        self.queue=queue.Queue(maxsize=4)
+        self.stop=Event()
+        self.lines=[]
+        self.idx=0
+        self.start=0
+        self.end=0
+        self.thread=Thread(target=self.run, daemon=True, name='readahead')
+        self.thread.start()
+
+    def run(self):
+        import io
+        rest=b''
+        try:
+            while True:
+                data=self.file.read(self.BLOCK)
+                if not data:
+                    break
+                data=rest+data
+                cut=data.rfind(b'\n')+1
+                rest=data[cut:]
+                if cut:
+                    text=data[:cut].decode(self.encoding)
+                    self.put((io.StringIO(text, newline=None).readlines(), self.raw.tell()))
+            if rest:
+                self.put(([rest.decode(self.encoding)], self.raw.tell()))
+            self.put(None)
+        except Exception as e:
+            self.put(e)
+
+    def put(self, item):
+        import queue
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def next_block(self):
+        if self.lines is None:
+            return False
+        item=self.queue.get()
+        if isinstance(item, Exception):
+            raise item
+        if item is None:
+            self.lines=None
+            return False
+        self.start=self.end
+        (self.lines, self.end)=item
+        self.idx=0
+        return True
+
+    def readline(self):
+        if self.lines is None or (self.idx>=len(self.lines) and not self.next_block()):
+            return ''
+        self.idx+=1
+        return self.lines[self.idx-1]
+
+    def readlines(self, hint=-1):
+        if self.lines is None or (self.idx>=len(self.lines) and not self.next_block()):
+            return []
+        lines=self.lines[self.idx:]
+        self.idx=len(self.lines)
+        return lines
+
+    def tell(self):
+        """approximate compressed offset of the next line"""
+        lines=self.lines
+        if not lines:
+            return self.end
+        return self.start+(self.end-self.start)*self.idx//len(lines)
+
+    def fileno(self):
+        return self.raw.fileno()
+
+    def close(self):
+        self.stop.set()
+        self.thread.join()
+        self.file.close()
+        self.raw.close()
+
+class TailFile(object):
+    """Lines of a plain text file, starting at a byte offset. tell() is the
+    offset after the last complete line. With --follow it waits for the
+    file to grow (yielding None while waiting) and reopens it when it has
+    been rotated or truncated."""
+    POLL=0.1
+
+    def __init__(self, filename, offset=0):
+        import locale
+        self.filename=filename
+        self.encoding=locale.getpreferredencoding(False)
+        self.open(offset)
+
+    def open(self, offset):
+        self.file=open(self.filename, 'rb')
+        self.file.seek(offset)
+        self.offset=offset
+        self.ino=os.fstat(self.file.fileno()).st_ino
+
+    def __iter__(self):
+        part=b''
+        rotated=False
+        while True:
+            data=self.file.readline()
+            if data.endswith(b'\n'):
+                line=part+data
+                part=b''
+                self.offset+=len(line)
+                yield line.decode(self.encoding).strip()
+                continue
+            part+=data
+            if not args.follow:
+                break
+            if rotated: # the old file is read completely
+                if part: # its last line without newline
+                    self.offset+=len(part)
+                    yield part.decode(self.encoding).strip()
+                self.file.close()
+                self.open(0)
+                part=b''
+                rotated=False
+                continue
+            try:
+                st=os.stat(self.filename)
+            except OSError: # in the middle of a rotation
+                st=None
+            if st is not None and st.st_ino!=self.ino:
+                rotated=True
+                continue
+            if st is not None and st.st_size<self.offset+len(part):
+                self.file.seek(0)
+                self.offset=0
+                part=b''
+                continue
+            yield None
+            time.sleep(self.POLL)
+        if part: # last line without newline
+            self.offset+=len(part)
+            yield part.decode(self.encoding).strip()
+
+    def tell(self):
+        return self.offset
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+# the current input if it isn't read by fileinput: a BitsFile, ReadAhead or TailFile
+curinput=None
+append_output=False
+# the size of the -o file output at the checkpoint, the rest is cut off
+output_size=None
+
+def openhook(filename, mode):
+    global curinput
+    ext = output_for(filename, 'at' if append_output else 'wt')
 
     if ext == '.gz':
         import gzip
-        return gzip.open(filename, 'rt')
+        curinput = ReadAhead(filename, gzip.open)
     elif ext == '.bz2':
         import bz2
-        return bz2.open(filename, 'rt')
+        curinput = ReadAhead(filename, bz2.open)
     elif ext == '.xz':
         import lzma
-        return lzma.open(filename, 'rt')
+        curinput = ReadAhead(filename, lzma.open)
     else:
         return open(filename, 'rt')
+    return curinput
 
+# --checkpoint: FILE.ckpt has the progress in FILE, the state when it was
+# saved, the number of lines, (for plain text files) the byte offset to
+# continue at and (for -o file) the size of the output up to there
+CHECKPOINT_LINES=10000
+
+def load_checkpoint(filename):
+    try:
+        with open(filename+'.ckpt') as f:
+            ck=json.load(f)
+        st=os.stat(filename)
+    except (OSError, ValueError):
+        return None
+    if ck['ino']!=st.st_ino or (ck['offset'] or 0)>st.st_size or ck['size']>st.st_size:
+        return None # a different file by now
+    if ck['done'] and ck['size']!=st.st_size:
+        ck['done']=False # it has grown, continue after the parsed part
+    (bitsparser.tsoffset, bitsparser.maxts, bitsparser.tswarning)=ck['ts']
+    for c in bitsparser.counters.values():
+        c.clear()
+    for (name, c) in ck['counters'].items():
+        bitsparser.counters[name].update(c)
+    if isinstance(args.errorstats, collections.abc.Mapping):
+        args.errorstats.clear()
+        args.errorstats.update(ck['errorstats'])
+    return ck
+
+def save_checkpoint(filename, ino, lines, offset, done=False):
+    sys.stdout.flush()
+    if args.errorfile is not None:
+        args.errorfile.flush()
+    ck={
+        'ino': ino,
+        'size': os.stat(filename).st_size,
+        'lines': lines,
+        'offset': offset,
+        'output': os.fstat(sys.stdout.fileno()).st_size if args.output == 'file' else None,
+        'done': done,
+        'ts': (bitsparser.tsoffset, bitsparser.maxts, bitsparser.tswarning),
+        'counters': {name: dict(c) for (name, c) in bitsparser.counters.items() if c},
+        'errorstats': args.errorstats if isinstance(args.errorstats, collections.abc.Mapping) else None,
+    }
+    with open(filename+'.ckpt.tmp', 'w') as f:
+        json.dump(ck, f)
+    os.replace(filename+'.ckpt.tmp', filename+'.ckpt')
+
+def input_lines():
+    """(lineno, line, first line of a file) for all input files, lines of
+    bits containers are the already split fields"""
+    global curinput, append_output, output_size
+    lineno=0
+    for filename in args.remainder or ["-"]:
+        curinput=None
+        ck=None
+        if args.checkpoint and filename!="-":
+            ck=load_checkpoint(filename)
+        append_output=ck is not None
+        output_size=ck.get('output') if ck else None
+        n=skip=ck['lines'] if ck else 0
+        if ck and ck['done']:
+            source=()
+        elif filename!="-" and bitsfile.is_bitsfile(filename):
+            output_for(filename, 'at' if append_output else 'wt')
+            curinput=bitsfile.BitsFile(filename)
+            source=(fields for (_, fields) in curinput.records())
+        elif filename!="-" and (args.checkpoint or args.follow) and os.path.splitext(filename)[1] not in ('.gz', '.bz2', '.xz'):
+            output_for(filename, 'at' if append_output else 'wt')
+            if ck and ck['offset'] is not None:
+                curinput=TailFile(filename, ck['offset'])
+                skip=0
+            else:
+                curinput=TailFile(filename)
+            source=curinput
+        else:
+            source=(line.strip() for line in fileinput.input([filename], openhook=openhook))
+
+        first=True
+        saved=n
+        # file and offset after the last processed line
+        tail=curinput if isinstance(curinput, TailFile) else None
+        ckpt=args.checkpoint and filename!="-"
+        ino=offset=None
+        if tail:
+            (ino, offset)=(tail.ino, tail.tell())
+        elif ckpt:
+            ino=os.stat(filename).st_ino
+            offset=ck['offset'] if ck else None
+        done=False
+        try:
+            for line in source:
+                if line is None: # --follow: waiting for the file to grow
+                    sys.stdout.flush()
+                    if ckpt and saved!=n:
+                        save_checkpoint(filename, ino, n, offset)
+                        saved=n
+                    continue
+                if skip:
+                    skip-=1
+                    continue
+                if tail:
+                    pos=(tail.ino, tail.tell())
+                yield (lineno+n+1, line, first)
+                # the line is completely processed now
+                n+=1
+                first=False
+                if tail:
+                    (ino, offset)=pos
+                if ckpt and n-saved>=CHECKPOINT_LINES:
+                    save_checkpoint(filename, ino, n, offset)
+                    saved=n
+            done=True
+        finally:
+            if ckpt:
+                save_checkpoint(filename, ino, n, offset, done=done)
+            if curinput is not None and not isinstance(curinput, ReadAhead):
+                curinput.close()
+        lineno+=n
+
+def input_size():
+    return os.fstat((curinput or fileinput).fileno()).st_size
+
+def input_pos():
+    if curinput is not None:
+        return curinput.tell()
+    try:
+        return os.lseek(fileinput.fileno(),0,os.SEEK_CUR)
+    except OSError:
+        return 0
+
+def parseline(line, lineno=None):
+    q=bitsparser.Message(line, lineno)
+    if args.min_confidence is not None:
+        try:
+            if q.confidence<args.min_confidence:
+                return None
+        except AttributeError:
+            return None
+    return q.upgrade()
 
 def do_input():
-    if True:
+    if args.spool:
+        do_spool()
+    elif args.jobs > 1:
+        do_input_jobs()
+    elif True:
         if args.do_stats:
             stats['files']=len(args.remainder)
             stats['fileno']=0
-        for line in fileinput.input(args.remainder, openhook=openhook):
+        for (lineno, line, first) in input_lines():
             if args.do_stats:
-                if fileinput.isfirstline():
+                if first:
                     stats['fileno']+=1
-                    stat=os.fstat(fileinput.fileno())
-                    stats['size']=stat.st_size
+                    stats['size']=input_size()
                 stats['in']+=1
-                if poller is not None and len(poller.poll(0))>0:
-                    zmq_xpub(poller, stats)
-            if args.min_confidence is not None:
-                q=bitsparser.Message(line.strip())
-                try:
-                    if q.confidence<args.min_confidence:
-                        continue
-                except AttributeError:
-                    continue
-                perline(q.upgrade())
-            else:
-                perline(bitsparser.Message(line.strip()).upgrade())
+            q=parseline(line, lineno)
+            if q is not None:
+                perline(q)
     else:
         print("Unknown input mode.", file=sys.stderr)
         exit(1)
 
+# --jobs: lines are parsed in chunks by forked worker processes. Each worker
+# runs the normal perline() with its outputs redirected into buffers, the
+# main process writes those back in input order.
+CHUNK_LINES=1000
+
+class ZmqBuffer(object):
+    def __init__(self):
+        self.msgs=[]
+    def send_string(self, msg):
+        self.msgs.append(msg)
+
+class ColumnBuffer(object):
+    def __init__(self, fields):
+        self.fields=fields
+        self.rows=[]
+    def add(self, q):
+        self.rows.append(columns.row(q, self.fields))
+
+class RowBuffer(object):
+    def __init__(self):
+        self.rows=[]
+    def add(self, *row):
+        self.rows.append(row)
+
+def rowsink():
+    """where -o columns/sat/plot put the values of a frame"""
+    if args.output == "columns":
+        return colwriter
+    if args.output == "sat":
+        return satspill
+    if args.output == "plot":
+        return plotdata
+    return None
+
+def init_worker():
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def parse_chunk(state, lines):
+    global publisher, sigmfout, colwriter, satspill, plotdata
+    import io
+    # continue the timestamp fallback where the previous chunk left it
+    (bitsparser.tsoffset, bitsparser.maxts)=state
+    bitsparser.tswarning=True
+
+    sys.stdout=io.StringIO()
+    sigmfout=io.StringIO()
+    if args.errorfile is not None:
+        args.errorfile=io.StringIO()
+    if args.output == "zmq":
+        publisher=ZmqBuffer()
+    if args.output == "columns":
+        colwriter=ColumnBuffer(colwriter.fields)
+    if args.output == "sat":
+        satspill=RowBuffer()
+    if args.output == "plot":
+        plotdata=RowBuffer()
+    if isinstance(args.errorstats, collections.abc.Mapping):
+        args.errorstats={}
+    if args.do_stats:
+        stats['out']=0
+    del selected[:]
+    for c in bitsparser.counters.values():
+        c.clear()
+
+    for (lineno, line) in lines:
+        q=parseline(line, lineno)
+        if q is not None:
+            perline(q)
+
+    return (sys.stdout.getvalue(),
+            sigmfout.getvalue(),
+            args.errorfile.getvalue() if args.errorfile is not None else None,
+            publisher.msgs if args.output == "zmq" else None,
+            rowsink().rows if rowsink() is not None else None,
+            selected if args.output == "err" else None,
+            args.errorstats,
+            stats['out'] if args.do_stats else 0,
+            dict(bitsparser.counters),
+            profile.take() if args.profile else None)
+
+def write_chunk(out, progress, result):
+    (text, sigmftext, errtext, zmqmsgs, rows, sel, errorstats, nout, counters, timers)=result
+    if outputs:
+        finish_outputs(out)
+    out.write(text)
+    sigmfout.write(sigmftext)
+    if errtext:
+        args.errorfile.write(errtext)
+    if zmqmsgs:
+        for msg in zmqmsgs:
+            publisher.send_string(msg)
+    if rows:
+        rowsink().extend(rows)
+    if sel:
+        selected.extend(sel)
+    if errorstats:
+        for (msg, count) in errorstats.items():
+            args.errorstats[msg]=args.errorstats.get(msg, 0)+count
+    if args.do_stats:
+        # progress is shown for the written, not the read input
+        (stats['fileno'], stats['size'], stats['pos'], nin)=progress
+        stats['in']+=nin
+        stats['out']+=nout
+    for (name, c) in counters.items():
+        bitsparser.counters[name].update(c)
+    if timers:
+        profile.merge(timers)
+
+def do_input_jobs():
+    import multiprocessing
+    pool=multiprocessing.get_context('fork').Pool(args.jobs, initializer=init_worker)
+    pending=collections.deque()
+
+    def submit(lines, pos=None):
+        progress=None
+        if args.do_stats:
+            if pos is None:
+                pos=input_pos()
+            progress=(fileno, size, pos, len(lines))
+        pending.append((out, progress, pool.apply_async(parse_chunk, (state, lines))))
+        while len(pending) > 2*args.jobs:
+            write_chunk(*wait_chunk())
+
+    def wait_chunk():
+        (o, progress, res)=pending.popleft()
+        return (o, progress, res.get())
+
+    try:
+        if args.do_stats:
+            stats['files']=len(args.remainder)
+            stats['fileno']=0
+            stats['pos']=0
+        fileno=0
+        size=0
+        lines=[]
+        for (lineno, line, first) in input_lines():
+            if first and lines:
+                # don't mix files in one chunk, --output file switches sys.stdout
+                submit(lines, size)
+                lines=[]
+            if args.do_stats:
+                if first:
+                    fileno+=1
+                    size=input_size()
+            if not lines:
+                out=sys.stdout
+                state=(bitsparser.tsoffset, bitsparser.maxts)
+            bitsparser.track_ts(line)
+            lines.append((lineno, line))
+            if len(lines) >= CHUNK_LINES:
+                submit(lines)
+                lines=[]
+        if lines:
+            submit(lines, size)
+        while pending:
+            write_chunk(*wait_chunk())
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+# --spool: every complete file in the spool directory is parsed as if on
+# its own into a temporary file that is renamed when done, then the input
+# is moved to the done directory. With --jobs the files are parsed by a
+# pool of worker processes that is kept for all files.
+SPOOL_EXTS=('.bits', '.ibits', '.bits.gz', '.bits.bz2', '.bits.xz')
+
+def spool_output(filename):
+    (base, _)=output_base(filename)
+    out=os.path.join(args.spool_out, base+('.json' if args.output == 'json' else '.parsed'))
+    if args.compress:
+        out+='.'+args.compress
+    return out
+
+def spool_file(filename, worker=False):
+    """parse filename into its output file, returns (lines, seconds,
+    errorstats, counters, timers, errors) where the last four are only set
+    in a worker process"""
+    start=time.time()
+    if worker:
+        import io
+        if isinstance(args.errorstats, collections.abc.Mapping):
+            args.errorstats={}
+        # the error lines are written by the main process
+        if args.errorfile is not None:
+            args.errorfile=io.StringIO()
+        for c in bitsparser.counters.values():
+            c.clear()
+    (bitsparser.tsoffset, bitsparser.maxts, bitsparser.tswarning)=(0, 0, False)
+    out=spool_output(filename)
+    stdout=sys.stdout
+    sys.stdout=CompressWriter(out+'.tmp') if args.compress else open(out+'.tmp', 'w')
+    args.remainder=[filename]
+    n=0
+    try:
+        for (lineno, line, first) in input_lines():
+            q=parseline(line, lineno)
+            if q is not None:
+                perline(q)
+            n+=1
+            if args.do_stats and not worker:
+                stats['in']+=1
+        sys.stdout.close()
+        os.replace(out+'.tmp', out)
+    except Exception:
+        sys.stdout.close()
+        os.unlink(out+'.tmp')
+        raise
+    finally:
+        sys.stdout=stdout
+    if not worker:
+        return (n, time.time()-start, None, None, None, None)
+    return (n, time.time()-start, args.errorstats, dict(bitsparser.counters), profile.take() if args.profile else None,
+            args.errorfile.getvalue() if args.errorfile is not None else None)
+
+def spool_worker(filename):
+    return spool_file(filename, True)
+
+def do_spool():
+    done=args.spool_done or os.path.join(args.spool, 'done')
+    os.makedirs(done, exist_ok=True)
+    os.makedirs(args.spool_out, exist_ok=True)
+    pool=None
+    if args.jobs > 1:
+        import multiprocessing
+        pool=multiprocessing.get_context('fork').Pool(args.jobs, initializer=init_worker)
+    seen={}     # name: (size, mtime) at the last look
+    queued=collections.deque() # (name, complete since)
+    running=collections.deque() # (name, complete since, result)
+
+    def finish(name, since, parse):
+        # a file that fails is moved as well, it would fail again
+        try:
+            (n, secs, errorstats, counters, timers, errtext)=parse()
+        except Exception as e:
+            (n, secs, errorstats, counters, timers, errtext)=(0, 0, None, None, None, None)
+            print("ERR: %s: %s"%(name, e), file=sys.stderr, end=eolnl if args.do_stats else None)
+        if errtext:
+            args.errorfile.write(errtext)
+        if args.errorfile is not None:
+            args.errorfile.flush()
+        if errorstats:
+            for (msg, count) in errorstats.items():
+                args.errorstats[msg]=args.errorstats.get(msg, 0)+count
+        if counters:
+            for (counter, c) in counters.items():
+                bitsparser.counters[counter].update(c)
+        if timers:
+            profile.merge(timers)
+        os.replace(os.path.join(args.spool, name), os.path.join(done, name))
+        if args.do_stats:
+            if pool:
+                stats['in']+=n
+            stats['done']+=1
+            stats['queue']=len(queued)+len(running)
+        print("%s: %d lines in %.1fs, done %.1fs after complete, %d queued"%(name, n, secs, time.time()-since, len(queued)+len(running)),
+                file=sys.stderr, end=eolnl if args.do_stats else None)
+
+    try:
+        while True:
+            now=time.time()
+            busy={name for (name, _) in queued}|{name for (name, _, _) in running}
+            present=set()
+            for entry in os.scandir(args.spool):
+                if not entry.name.endswith(SPOOL_EXTS) or entry.name.startswith('.') or entry.name in busy:
+                    continue
+                if not entry.is_file():
+                    continue
+                st=entry.stat()
+                if seen.get(entry.name)==(st.st_size, st.st_mtime) and now-st.st_mtime>=args.spool_settle:
+                    queued.append((entry.name, now))
+                else:
+                    seen[entry.name]=(st.st_size, st.st_mtime)
+                    present.add(entry.name)
+            for name in set(seen)-present:
+                del seen[name]
+            if args.do_stats:
+                stats['queue']=len(queued)+len(running)
+
+            if pool:
+                while queued and len(running) < 2*args.jobs:
+                    (name, since)=queued.popleft()
+                    running.append((name, since, pool.apply_async(spool_worker, (os.path.join(args.spool, name),))))
+                # finish in order, the rest stays running
+                while running and running[0][2].ready():
+                    (name, since, res)=running.popleft()
+                    finish(name, since, res.get)
+                if running:
+                    running[0][2].wait(args.spool_interval)
+                    continue
+            else:
+                while queued:
+                    (name, since)=queued.popleft()
+                    finish(name, since, lambda: spool_file(os.path.join(args.spool, name)))
+            time.sleep(args.spool_interval)
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+
 def perline(q):
     if args.dosatclass is True:
         sat=satclass.classify(q.frequency,q.globaltime)
@@ -328,12 +1274,9 @@ def perline(q):
         if q.error:
             return
         q.descramble_extra=""
-#    if linefilter['type']!="All" and type(q).__name__ != linefilter['type']:
-    if args.linefilter['type']!="All" and not issubclass(type(q),globals()['bitsparser'].__dict__[args.linefilter['type']]):
-        return
-    if args.linefilter['attr'] and args.linefilter['attr'] not in q.__dict__:
+    if not bitsparser.filter_plan.match(q):
         return
-    if args.linefilter['check'] and not eval(args.linefilter['check']):
+    if bitsparser.filter_plan.check and not eval(bitsparser.filter_plan.check):
         return
     if args.do_stats:
         stats["out"]+=1
@@ -342,9 +1285,9 @@ def perline(q):
             selected.append(q)
     elif args.output == "sat":
         if not q.error:
-            selected.append(q)
+            satspill.add(q.frequency, q.globalns, q.pretty())
     elif args.output == "plot":
-        selected.append(q)
+        plotdata.add(*[getattr(q, a) for a in plotattrs])
     elif args.output == "line" or args.output == "file":
         if q.error:
             print(q.pretty()+" ERR:"+", ".join(q.error_msg))
@@ -352,20 +1295,21 @@ def perline(q):
             if not args.ofmt:
                 print(q.pretty())
             else:
-                print(" ".join([str(q.__dict__[x]) for x in args.ofmt]))
+                print(" ".join([str(getattr(q, x)) for x in args.ofmt]))
     elif args.output == "zmq":
-        socket.send_string(q.pretty())
+        publisher.send_string(q.pretty())
     elif args.output == "json":
         if q.error: return
-        for attr in ["parse_error", "error_msg", "descrambled", "bitstream_bch", "bitstream_raw", "rs6c", "rs6m", "rs8c", "rs8m", "idata", "payload_f", "payload_r", "descramble_extra", "swapped", "da_ta", "vdata", "header", "freq_print"]:
-            if attr in q.__dict__:
-                del q.__dict__[attr]
-        q.type = type(q).__name__
+        d=q.fields(exclude=["parse_error", "error_msg", "descrambled", "bitstream_bch", "bitstream_raw", "rs6c", "rs6m", "rs8c", "rs8m", "idata", "payload_f", "payload_r", "descramble_extra", "bch_memo", "swapped", "da_ta", "vdata", "header", "freq_print"])
+        d["type"] = type(q).__name__
         try:
-            print(json.dumps(q.__dict__))
+            print(json.dumps(d, default=json_bits))
         except Exception as e:
-            print("Couldn't serialize: ", q.__dict__, file=sys.stderr)
+            print("Couldn't serialize: ", d, file=sys.stderr)
             raise e
+    elif args.output == "columns":
+        if q.error: return
+        colwriter.add(q)
     elif args.output == "sigmf":
         if q.parse_error:
             return
@@ -403,29 +1347,51 @@ def perline(q):
 def bitdiff(a, b):
     return sum(x != y for x, y in zip(a, b))
 
+def json_bits(o):
+    if isinstance(o, bitsparser.Bits):
+        return str(o)
+    raise TypeError("Object of type %s is not JSON serializable"%type(o).__name__)
+
 if args.do_stats:
     from threading import Thread, Event
     stats['start']=time.time()
     stats['in']=0
     stats['out']=0
     stats['stop']= Event()
+    if args.spool:
+        stats['done']=0
+        stats['queue']=0
     sthread = Thread(target = stats_thread, args = [stats], daemon= True, name= 'stats')
     sthread.start()
 
+if args.compress and args.output == 'json' and not args.spool:
+    sys.stdout=CompressWriter(sys.stdout.buffer)
+    outputs.append(sys.stdout)
+
 try:
     do_input()
 except KeyboardInterrupt:
     pass
 except BrokenPipeError as e:
     print(e, file=sys.stderr, end=eolnl if args.do_stats else None)
+finally:
+    finish_outputs()
+
+if args.output=='zmq':
+    publisher.close()
 
 if args.do_stats:
     stats['stop'].set()
     sthread.join()
+    for (name, c) in sorted(bitsparser.counters.items()):
+        if c:
+            print("%s: %s"%(name, ", ".join("%s %d"%x for x in sorted(c.items()))), file=statsfile)
 
-if args.output=='zmq':
-    socket.close()
-    context.term()
+if args.profile:
+    print("\n".join(profile.table()), file=sys.stderr)
+
+if args.output=='columns':
+    colwriter.close()
 
 if args.sigmffile is not None:
     print("{}]}", file=sigmfout)
@@ -436,28 +1402,7 @@ if args.sigmffile is not None:
 
 if args.output == "sat":
     print("SATs:")
-    sats=[]
-    for m in selected:
-        f=m.frequency
-        t=m.globalns/1e9
-        no=-1
-        for s in range(len(sats)):
-            fdiff=(sats[s][0]-f)//(t+.000001-sats[s][1])
-            if f<sats[s][0] and fdiff<250:
-                no=s
-        if no>-1:
-            m.fdiff=(sats[no][0]-f)//(t-sats[no][1])
-            sats[no][0]=f
-            sats[no][1]=t
-        else:
-            no=len(sats)
-            sats.append([f,t])
-            m.fdiff=0
-        m.satno=no
-    for s in range(len(sats)):
-        print("Sat: %03d"%s)
-        for m in selected:
-            if m.satno == s: print(m.pretty())
+    satspill.close(sys.stdout)
 
 if isinstance(args.errorstats, collections.abc.Mapping):
     total=0
@@ -508,25 +1453,33 @@ if args.output == "plot":
     plt.xlabel(args.plotargs[0])
     plt.ylabel(args.plotargs[1])
     if args.plotargs[0]=="time":
-        args.plotargs[0]="globalns"
         def format_date(x, _pos=None):
             return datetime.datetime.fromtimestamp(x/10**9).strftime('%Y-%m-%d %H:%M:%S')
         plt.gca().xaxis.set_major_formatter(ticker.FuncFormatter(format_date))
         plt.gcf().autofmt_xdate()
 
     if False:
-        plotsats(plt,selected[0].globaltime,selected[-1].globaltime)
+        plotsats(plt,plotdata.cols[0][0]/1e9,plotdata.cols[0][-1]/1e9)
 
-    for m in selected:
-        xl.append(m.__dict__[args.plotargs[0]])
-        yl.append(m.__dict__[args.plotargs[1]])
+    if args.plotbins:
+        cells=plotdata.cells
+        (bx, by)=args.plotbins
+        xl=[(x+.5)*bx for (x, _) in cells]
+        yl=[(y+.5)*by for (_, y) in cells]
         if len(args.plotargs)>2:
-            cl.append(m.__dict__[args.plotargs[2]])
-
-    if len(args.plotargs)>2:
+            cl=[s/n for (n, s) in cells.values()]
+            label="mean %s"%args.plotargs[2]
+        else:
+            cl=[n for (n, _) in cells.values()]
+            label="frames"
+        plt.scatter(x = xl, y= yl, c= cl, marker='s')
+        plt.colorbar().set_label(label)
+    elif len(args.plotargs)>2:
+        (xl, yl, cl)=plotdata.cols[:3]
         plt.scatter(x = xl, y= yl, c= cl)
         plt.colorbar().set_label(args.plotargs[2])
     else:
+        (xl, yl)=plotdata.cols[:2]
         plt.scatter(x = xl, y= yl)
 
     mng = plt.get_current_fig_manager()
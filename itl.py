@@ -1,4 +1,4 @@
-from util import bitdiff, hex2bin
+from util import popcount
 
 PRS_HDR=[
     "00000000000000000000000000000000",
@@ -687,9 +687,50 @@ MAP_PRS_V1=   dict(zip(PRS_LIST_V1, list(range(128))))
 MAP_PRS=      dict(zip(PRS_LIST,   list(range(128))*4))
 MAP_PRS_TYPE= dict(zip(PRS_LIST,   [0]*128+[1]*128+[2]*128+[3]*128))
 
-BIN_HDR=    [hex2bin(x) for x in PRS_HDR]
-BIN_PLANES= [hex2bin(x) for x in PRS_PLANES]
-BIN_PRS=    [hex2bin(x) for x in PRS_LIST]
+BIN_HDR=    [int(x, 16) for x in PRS_HDR]
+BIN_PLANES= [int(x, 16) for x in PRS_PLANES]
+BIN_PRS=    [int(x, 16) for x in PRS_LIST]
+
+class CodeIndex(object):
+    """Nearest code by bit difference. The codes are split into 64 bit
+    words in a numpy array (built on first use), so a search is one
+    xor+popcount over all candidates. Without numpy it loops over them."""
+    def __init__(self, codes, bits):
+        self.codes=codes
+        self.words=(bits+63)//64
+        self.table=None
+
+    def split(self, value):
+        return [(value>>(64*w))&0xffffffffffffffff for w in range(self.words)]
+
+    def nearest(self, value, start=0, end=None):
+        """(index, distance) of the closest of codes[start:end] to value,
+        the first one if several are equally close"""
+        if end is None:
+            end=len(self.codes)
+        if self.table is None:
+            try:
+                import numpy as np
+            except ImportError:
+                self.table=False
+            else:
+                self.table=np.array([self.split(c) for c in self.codes], dtype=np.uint64)
+                self.np=np
+        if self.table is False:
+            dist=[popcount(value^c) for c in self.codes[start:end]]
+            i=min(range(len(dist)), key=dist.__getitem__)
+            return (start+i, dist[i])
+        np=self.np
+        diff=self.table[start:end]^np.array(self.split(value), dtype=np.uint64)
+        if hasattr(np, "bitwise_count"):
+            dist=np.bitwise_count(diff).sum(axis=1, dtype=np.int32)
+        else:
+            dist=np.unpackbits(diff.view(np.uint8), axis=1).sum(axis=1, dtype=np.int32)
+        i=int(dist.argmin())
+        return (start+i, int(dist[i]))
+
+PLANE_INDEX=CodeIndex(BIN_PLANES, len(PRS_PLANES[0])*4)
+PRS_INDEX=  CodeIndex(BIN_PRS,    len(PRS_LIST[0])*4)
 
 def map_sat(num, version):
     if version==2:
@@ -734,12 +775,10 @@ if __name__ == "__main__":
             print("Map: %s %s"%(s,m))
         except KeyError:
             print("Key: %s no exact match"%(seq))
-            bseq=hex2bin(seq)
-            for i,b in enumerate(BIN_PRS):
-                if bitdiff(bseq,b)<10:
-                    print("but: %s (%03d/%d) matched with %d bits difference"%(
-                                '{0:024x}'.format(int(b,2)),i%128,i//128,bitdiff(bseq,b))
-                         )
-                    break
+            (i,dist)=PRS_INDEX.nearest(int(seq,16))
+            if dist<10:
+                print("but: %s (%03d/%d) matched with %d bits difference"%(
+                            '{0:024x}'.format(BIN_PRS[i]),i%128,i//128,dist)
+                     )
         except ValueError:
             pass
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# vim: set ts=4 sw=4 tw=0 et pm=:
+
+# Decode time per frame class (iridium-parser.py --profile).
+#
+# install() wraps the __init__ of every Message class (where the decoding
+# of that class happens), the BCH and RS repair functions and pretty() in
+# timers, nothing is changed without it. The times of a timer are kept as
+# count, total and a histogram with 4 bins per octave for the percentiles.
+# Nested calls of the same timer (e.g. pretty() of a subclass calling the
+# one of its parent) are counted once.
+
+import time
+import math
+import functools
+
+import bitsparser
+import rs
+import rs6
+
+STEPS=4 # histogram bins per octave
+
+class Timer(object):
+    __slots__=("count", "total", "hist", "depth")
+
+    def __init__(self):
+        self.count=0
+        self.total=0
+        self.hist={}
+        self.depth=0
+
+    def add(self, ns):
+        self.count+=1
+        self.total+=ns
+        b=int(math.log2(ns)*STEPS) if ns>0 else 0
+        self.hist[b]=self.hist.get(b, 0)+1
+
+    def reset(self):
+        self.count=0
+        self.total=0
+        self.hist={}
+
+    def merge(self, other):
+        self.count+=other.count
+        self.total+=other.total
+        for (b, n) in other.hist.items():
+            self.hist[b]=self.hist.get(b, 0)+n
+
+    def percentile(self, p):
+        """upper bound of the p-th percentile in ns"""
+        left=self.count*p/100
+        for b in sorted(self.hist):
+            left-=self.hist[b]
+            if left<=0:
+                return 2**((b+1)/STEPS)
+        return 0
+
+class Profile(object):
+    def __init__(self):
+        self.timers={}
+        self.start=time.perf_counter_ns()
+
+    def timer(self, name):
+        if name not in self.timers:
+            self.timers[name]=Timer()
+        return self.timers[name]
+
+    def wrap(self, name, func):
+        t=self.timer(name)
+        clock=time.perf_counter_ns
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            if t.depth:
+                return func(*args, **kwargs)
+            t.depth+=1
+            start=clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                t.add(clock()-start)
+                t.depth-=1
+        return timed
+
+    def take(self):
+        """the timers so far, for merge() in another process"""
+        timers={}
+        for (name, t) in self.timers.items():
+            if t.count:
+                timers[name]=Timer()
+                timers[name].merge(t)
+                t.reset()
+        return timers
+
+    def merge(self, timers):
+        for (name, t) in timers.items():
+            self.timer(name).merge(t)
+
+    def table(self):
+        wall=time.perf_counter_ns()-self.start
+        lines=["%-24s %8s %10s %6s %9s %9s %9s %9s"%("decode time", "count", "total[ms]", "run%", "mean[us]", "p50[us]", "p90[us]", "p99[us]")]
+        for (name, t) in sorted(list(self.timers.items()), key=lambda x: -x[1].total):
+            if not t.count:
+                continue
+            lines.append("%-24s %8d %10.1f %5.1f%% %9.1f %9.1f %9.1f %9.1f"%(name, t.count, t.total/1e6, 100*t.total/wall,
+                t.total/t.count/1e3, t.percentile(50)/1e3, t.percentile(90)/1e3, t.percentile(99)/1e3))
+        return lines
+
+def classes(cls):
+    yield cls
+    for sub in cls.__subclasses__():
+        yield from classes(sub)
+
+def install():
+    prof=Profile()
+    for cls in classes(bitsparser.Message):
+        if "__init__" in cls.__dict__:
+            cls.__init__=prof.wrap(cls.__name__, cls.__dict__["__init__"])
+        if "pretty" in cls.__dict__:
+            cls.pretty=prof.wrap("pretty()", cls.__dict__["pretty"])
+    for name in ("bch_repair", "bch_repair1", "nnrepair_memo"):
+        setattr(bitsparser, name, prof.wrap("bch_repair", getattr(bitsparser, name)))
+    rs.rs_fix=prof.wrap("rs_fix", rs.rs_fix)
+    rs6.rs_fix=prof.wrap("rs_fix", rs6.rs_fix)
+    return prof
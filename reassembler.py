@@ -17,6 +17,20 @@ parser = argparse.ArgumentParser()
 def parse_comma(arg):
     return arg.split(',')
 
+def openhook(filename, mode):
+    """read compressed input (iridium-parser.py --compress) as text"""
+    ext = splitext(filename)[1]
+    if ext == '.gz':
+        import gzip
+        return gzip.open(filename, 'rt')
+    if ext == '.bz2':
+        import bz2
+        return bz2.open(filename, 'rt')
+    if ext == '.xz':
+        import lzma
+        return lzma.open(filename, 'rt')
+    return open(filename, mode)
+
 parser.add_argument("-v", "--verbose",     action="store_true",
         help="increase output verbosity")
 parser.add_argument("-i", "--input",       default=None,
@@ -105,7 +119,9 @@ if config.input is None:
     else:
         config.input = config.remainder[0]
 
-config.outbase, _= splitext(config.input)
+config.outbase, ext= splitext(config.input)
+if ext in ('.gz', '.bz2', '.xz'):
+    config.outbase, _= splitext(config.outbase)
 if config.outbase.startswith('/dev'):
     config.outbase=basename(config.outbase)
 
@@ -140,7 +156,7 @@ if config.input.startswith("zmq:"):
         socket.setsockopt(zmq.SUBSCRIBE, bytes(topic,"ascii"))
     config.iobj=iter(socket.recv_string,"")
 else:
-    config.iobj=fileinput.input(config.input)
+    config.iobj=fileinput.input(config.input, openhook=openhook)
 
 try:
     zx.run(config.iobj)
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # vim: set ts=4 sw=4 tw=0 et pm=:
 
-import reedsolo
+from rscodec import RSCodec, RSError
 
 # IIQ/LCW3:  Message: 31B, checksum: 8B, erasure: 8B - RS(47,31) [total: 312b]
 
@@ -11,21 +11,18 @@ nsym=8  # number of ecc symbols (n-k)
 elen=8  # erasure length (how many bytes erased at end)
 c_exp=8 # bits per symbol
 prim=0x11d
-reedsolo.init_tables(prim=prim,generator=generator,c_exp=c_exp)
+codec=RSCodec(c_exp=c_exp,prim=prim,nsym=nsym+elen,fcr=fcr,generator=generator,elen=elen)
 
 
 def rs_check(data):
 	mlen=len(data)-nsym
-	msg=reedsolo.rs_encode_msg(data[:mlen],nsym+elen,fcr=fcr)
+	msg=codec.encode(data[:mlen])
 	return bytearray(data[mlen:])==msg[mlen:len(data)]
 
 def rs_fix(data):
-#	data=data+bytearray([0]*elen)
-	data=data+([0]*elen)
-	r=list(range(len(data)-elen,len(data)))
 	try:
-		(cmsg,crs)=reedsolo.rs_correct_msg(data,nsym+elen,fcr,generator,erase_pos=r)
-	except reedsolo.ReedSolomonError:
+		(cmsg,crs)=codec.decode(data)
+	except RSError:
 		return (False,None,None)
 	except ZeroDivisionError:
 		return (False,None,None)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# vim: set ts=4 sw=4 tw=0 et pm=:
+
+# Reed-Solomon codec for a fixed code, following the algorithms of
+# reedsolo.py (same results, same failure cases) but with its own field
+# tables, so several codes can be used at the same time, and with
+# everything that only depends on the code precomputed:
+# generator polynomial, syndrome roots and the erasure locator for the
+# fixed erasure positions at the end of the message.
+#
+# Decoding first runs the cheap stages (table driven syndromes, Berlekamp-
+# Massey for the number of errors, table driven Chien search for their
+# positions), which reject most non-codewords, before the Forney algorithm
+# computes the corrections. self.stats counts how each decode ended.
+
+import collections
+
+class RSError(Exception):
+    pass
+
+class RSCodec(object):
+    def __init__(self, c_exp, prim, nsym, fcr=0, generator=2, elen=0):
+        self.c_exp=c_exp
+        self.nsym=nsym        # number of ecc symbols (incl. erased ones)
+        self.fcr=fcr
+        self.generator=generator
+        self.elen=elen        # number of ecc symbols missing at the end
+
+        # GF(2^c_exp) tables, exp is doubled to avoid the modulo in mul
+        fc=self.field_charac=(1<<c_exp)-1
+        self.exp=[0]*(fc*2)
+        self.log=[0]*(fc+1)
+        x=1
+        for i in range(fc):
+            self.exp[i]=x
+            self.log[x]=i
+            # x*=generator (carryless)
+            r=0
+            y=generator
+            while y:
+                if y & 1:
+                    r^=x
+                y>>=1
+                x<<=1
+                if x & (fc+1):
+                    x^=prim
+            x=r
+        for i in range(fc, fc*2):
+            self.exp[i]=self.exp[i-fc]
+
+        g=[1]
+        for i in range(nsym):
+            g=self.poly_mul(g, [1, self.pow(generator, i+fcr)])
+        self.gen=g
+        self.lgen=[self.log[c] for c in g]
+        # log of the points the syndromes are evaluated at
+        self.lsynd=[self.log[self.pow(generator, i+fcr)] for i in range(nsym)]
+
+        self._erasures={}
+        self._tables={}
+        self.stats=collections.Counter()
+
+    # field arithmetic
+    def mul(self, x, y):
+        if x==0 or y==0:
+            return 0
+        return self.exp[(self.log[x]+self.log[y]) % self.field_charac]
+
+    def div(self, x, y):
+        if y==0:
+            raise ZeroDivisionError()
+        if x==0:
+            return 0
+        return self.exp[(self.log[x]+self.field_charac-self.log[y]) % self.field_charac]
+
+    def pow(self, x, power):
+        return self.exp[(self.log[x]*power) % self.field_charac]
+
+    def inverse(self, x):
+        return self.exp[self.field_charac-self.log[x]]
+
+    # polynomials, highest degree first
+    def poly_mul(self, p, q):
+        exp=self.exp
+        log=self.log
+        r=[0]*(len(p)+len(q)-1)
+        lp=[log[c] for c in p]
+        for j in range(len(q)):
+            if q[j]!=0:
+                lq=log[q[j]]
+                for i in range(len(p)):
+                    if p[i]!=0:
+                        r[i+j]^=exp[lp[i]+lq]
+        return r
+
+    def poly_eval(self, poly, x):
+        exp=self.exp
+        log=self.log
+        lx=log[x]
+        y=poly[0]
+        for c in poly[1:]:
+            if y:
+                y=exp[log[y]+lx]^c
+            else:
+                y=c
+        return y
+
+    def poly_add(self, p, q):
+        r=[0]*(max(len(p), len(q)))
+        r[len(r)-len(p):]=p
+        for i in range(len(q)):
+            r[i+len(r)-len(q)]^=q[i]
+        return r
+
+    def encode(self, msg):
+        """return msg with nsym ecc symbols appended"""
+        if len(msg)+self.nsym > self.field_charac:
+            raise ValueError("Message is too long (%i when max is %i)" % (len(msg)+self.nsym, self.field_charac))
+        exp=self.exp
+        log=self.log
+        lgen=self.lgen
+        out=bytearray(msg)+bytearray(self.nsym)
+        for i in range(len(msg)):
+            coef=out[i]
+            if coef!=0:
+                lcoef=log[coef]
+                for j in range(1, len(lgen)):
+                    out[i+j]^=exp[lcoef+lgen[j]]
+        out[:len(msg)]=msg
+        return out
+
+    def erasures(self, n):
+        """erasure positions, their Forney syndrome factors and locator for length n"""
+        if n not in self._erasures:
+            pos=list(range(n-self.elen, n))
+            xlog=[self.log[self.pow(self.generator, n-1-p)] for p in pos]
+            e_loc=[1]
+            for p in pos:
+                e_loc=self.poly_mul(e_loc, [self.pow(self.generator, n-1-p), 1])
+            self._erasures[n]=(pos, xlog, e_loc)
+        return self._erasures[n]
+
+    def forney_syndromes(self, synd, xlog):
+        exp=self.exp
+        log=self.log
+        fsynd=list(synd[1:])
+        for lx in xlog:
+            for j in range(len(fsynd)-1):
+                y=fsynd[j]
+                fsynd[j]=(exp[log[y]+lx] if y else 0)^fsynd[j+1]
+        return fsynd
+
+    def tables(self, n):
+        """lookup tables for messages of length n, built on first use
+
+        synd[j][v]: the syndromes and the Forney syndromes of a message which
+        is v at position j and 0 elsewhere, c_exp bits each, packed into an
+        int. Both are linear, so for a message they are the xor over its
+        symbols.
+        chien[d][v]: v*x^d at all n Chien search points x, one byte each.
+        """
+        if n not in self._tables:
+            fc=self.field_charac
+            w=self.c_exp
+            (_, xlog, _)=self.erasures(n)
+
+            def fill(basis): # extend from the single bit values to all symbols
+                row=[0]*(fc+1)
+                for v in range(1, fc+1):
+                    low=v & -v
+                    row[v]=row[v^low]^basis[low.bit_length()-1]
+                return row
+
+            synd=[]
+            for j in range(n):
+                basis=[]
+                for b in range(w):
+                    lv=self.log[1<<b]
+                    sy=[0]+[self.exp[(lv+lx*(n-1-j)) % fc] for lx in self.lsynd]
+                    packed=0
+                    for (i, y) in enumerate(sy[1:]+self.forney_syndromes(sy, xlog)):
+                        packed|=y<<(w*i)
+                    basis.append(packed)
+                synd.append(fill(basis))
+
+            xs=[self.pow(self.generator, i) for i in range(n)]
+            chien=[]
+            for d in range(self.nsym+1):
+                basis=[]
+                for b in range(w):
+                    packed=0
+                    for (i, x) in enumerate(xs):
+                        packed|=self.mul(1<<b, self.pow(x, d))<<(8*i)
+                    basis.append(packed)
+                chien.append(fill(basis))
+
+            self._tables[n]=(synd, chien)
+        return self._tables[n]
+
+    def find_error_locator(self, synd, erase_count):
+        """Berlekamp-Massey on the Forney syndromes, None if too many errors"""
+        exp=self.exp
+        log=self.log
+        nsym=self.nsym
+        err_loc=[1]
+        old_loc=[1]
+        synd_shift=0
+        if len(synd) > nsym: synd_shift=len(synd)-nsym
+
+        for i in range(nsym-erase_count):
+            K=i+synd_shift
+            delta=synd[K]
+            for j in range(1, len(err_loc)):
+                a=err_loc[-(j+1)]
+                b=synd[K-j]
+                if a and b:
+                    delta^=exp[log[a]+log[b]]
+            old_loc=old_loc+[0]
+            if delta!=0:
+                ld=log[delta]
+                if len(old_loc) > len(err_loc):
+                    new_loc=[exp[log[c]+ld] if c else 0 for c in old_loc]
+                    li=log[self.inverse(delta)]
+                    old_loc=[exp[log[c]+li] if c else 0 for c in err_loc]
+                    err_loc=new_loc
+                err_loc=self.poly_add(err_loc, [exp[log[c]+ld] if c else 0 for c in old_loc])
+
+        while len(err_loc)>1 and err_loc[0]==0:
+            err_loc=err_loc[1:]
+        if err_loc==[0]:
+            err_loc=[]
+        errs=len(err_loc)-1
+        if (errs-erase_count)*2+erase_count > nsym:
+            return None
+        return err_loc
+
+    def find_errors(self, err_loc, n):
+        """Chien search, returns error positions or None if the number of
+        roots doesn't match the degree of err_loc"""
+        errs=len(err_loc)-1
+        chien=self.tables(n)[1]
+        y=0
+        for (d, c) in enumerate(reversed(err_loc)):
+            y^=chien[d][c]
+        vals=y.to_bytes(n, "little")
+        if vals.count(0)!=errs:
+            return None
+        return [n-1-i for i in range(n) if vals[i]==0]
+
+    def correct_errata(self, msg, synd, err_pos, e_loc):
+        # Forney algorithm, e_loc is the locator of the leading erasures
+        n=len(msg)
+        coef_pos=[n-1-p for p in err_pos]
+        err_loc=e_loc
+        for i in coef_pos[self.elen:]:
+            err_loc=self.poly_mul(err_loc, [self.pow(self.generator, i), 1])
+        err_eval_r=self.poly_mul(synd[::-1], err_loc)[-len(err_loc):]
+
+        X=[self.pow(self.generator, -(self.field_charac-c)) for c in coef_pos]
+        E=[0]*n
+        for i, Xi in enumerate(X):
+            Xi_inv=self.inverse(Xi)
+            err_loc_prime=1
+            for j in range(len(X)):
+                if j!=i:
+                    err_loc_prime=self.mul(err_loc_prime, 1^self.mul(Xi_inv, X[j]))
+            y=self.poly_eval(err_eval_r, Xi_inv)
+            y=self.mul(self.pow(Xi, 1-self.fcr), y)
+            E[err_pos[i]]=self.div(y, err_loc_prime)
+        return bytearray(m^e for (m, e) in zip(msg, E))
+
+    def decode(self, data):
+        """correct data (without the erased symbols), returns (msg, ecc)
+
+        raises RSError or ZeroDivisionError if it can't be corrected"""
+        nsym=self.nsym
+        msg=bytearray(data)+bytearray(self.elen)
+        n=len(msg)
+        if n > self.field_charac:
+            raise ValueError("Message is too long (%i when max is %i)" % (n, self.field_charac))
+        (erase_pos, _, e_loc)=self.erasures(n)
+        if len(erase_pos) > nsym:
+            raise RSError("Too many erasures to correct")
+
+        # cheap checks first: syndromes, number of errors and their positions
+        (synd_tbl, _)=self.tables(n)
+        s=0
+        for (row, c) in zip(synd_tbl, msg):
+            s^=row[c]
+        if s==0:
+            self.stats["clean"]+=1
+            return msg[:-nsym], msg[-nsym:]
+        w=self.c_exp
+        mask=self.field_charac
+        synd=[0]+[(s>>(w*i)) & mask for i in range(nsym)]
+        fsynd=[(s>>(w*i)) & mask for i in range(nsym, 2*nsym)]
+
+        err_loc=self.find_error_locator(fsynd, len(erase_pos))
+        if err_loc is None:
+            self.stats["too many errors"]+=1
+            raise RSError("Too many errors to correct")
+        err_pos=self.find_errors(err_loc[::-1], n)
+        if err_pos is None:
+            self.stats["roots mismatch"]+=1
+            raise RSError("Too many (or few) errors found by Chien Search for the errata locator polynomial!")
+
+        # full correction
+        try:
+            msg=self.correct_errata(msg, synd, erase_pos+err_pos, e_loc)
+        except ZeroDivisionError:
+            self.stats["uncorrectable"]+=1
+            raise
+        s=0
+        for (row, c) in zip(synd_tbl, msg):
+            s^=row[c]
+        if s & ((1<<(w*nsym))-1):
+            self.stats["uncorrectable"]+=1
+            raise RSError("Could not correct message")
+        self.stats["corrected"]+=1
+        return msg[:-nsym], msg[-nsym:]
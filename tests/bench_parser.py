@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Throughput of iridium-parser.py on synthetic input (see framegen.py):
+# lines/s for each frame type and for the mixes, with and without errors
+# and with the --harder/--uw-ec options. Every case runs the parser RUNS
+# times on the same file and keeps the fastest run. The startup time
+# (same options, empty input) is subtracted.
+#
+#   ./bench_parser.py -o before.json
+#   ./bench_parser.py -o after.json --compare before.json
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, TOP)
+
+import framegen
+
+OPTIONS={
+    "plain": [],
+    "harder": ["--harder"],
+    "uw-ec": ["--uw-ec"],
+    "harder+uw-ec": ["--harder", "--uw-ec"],
+}
+
+def run(args, filename):
+    start=time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(TOP, "iridium-parser.py"), "-o", "line", "--no-stats"]+args+[filename],
+            stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter()-start
+
+def fastest(args, filename, runs):
+    return min(run(args, filename) for _ in range(runs))
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=TOP,
+                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser=argparse.ArgumentParser(description="Benchmark iridium-parser.py on synthetic frames")
+    parser.add_argument("-n", "--lines", type=int, default=2000, help="lines per case (default: %(default)s)")
+    parser.add_argument("-r", "--runs", type=int, default=3, help="runs per case, the fastest counts (default: %(default)s)")
+    parser.add_argument("-t", "--types", default=",".join(framegen.GENERATORS), help="frame types (default: all)")
+    parser.add_argument("-m", "--mixes", default=",".join(framegen.MIXES), help="mixes (default: all)")
+    parser.add_argument("-e", "--errors", default="0,2", help="average bit errors per frame to test (default: %(default)s)")
+    parser.add_argument("--options", default=",".join(OPTIONS), help="parser options to test (default: all): "+",".join(OPTIONS))
+    parser.add_argument("-o", "--output", help="save the results as JSON")
+    parser.add_argument("--compare", metavar="JSON", help="show the change against earlier results")
+    args=parser.parse_args()
+
+    options=args.options.split(",")
+    inputs=[("type", t) for t in args.types.split(",") if t]+[("mix", m) for m in args.mixes.split(",") if m]
+    errors=[float(e) for e in args.errors.split(",")]
+
+    old={}
+    if args.compare:
+        with open(args.compare) as f:
+            for r in json.load(f)["results"]:
+                old[(r["input"], r["errors"], r["options"])]=r["lines_per_s"]
+
+    results=[]
+    with tempfile.TemporaryDirectory(prefix="bench-parser-") as tmp:
+        empty=os.path.join(tmp, "empty.bits")
+        open(empty, "w").close()
+        startup={o: fastest(OPTIONS[o], empty, args.runs) for o in options}
+
+        print("%-12s %6s %-14s %10s %8s"%("input", "errors", "options", "lines/s", "change"))
+        for (kind, name) in inputs:
+            for e in errors:
+                filename=os.path.join(tmp, "%s-%s.bits"%(name, e))
+                with open(filename, "w") as f:
+                    if kind=="mix":
+                        gen=framegen.lines(args.lines, mix=name, errors=e)
+                    else:
+                        gen=framegen.lines(args.lines, types=[name], errors=e)
+                    for line in gen:
+                        print(line, file=f)
+                for o in options:
+                    t=fastest(OPTIONS[o], filename, args.runs)-startup[o]
+                    lps=args.lines/t if t>0 else float("inf")
+                    change=""
+                    if (name, e, o) in old:
+                        change="%+.1f%%"%(100*(lps/old[(name, e, o)]-1))
+                    print("%-12s %6g %-14s %10.0f %8s"%(name, e, o, lps, change))
+                    results.append({"input": name, "kind": kind, "errors": e, "options": o,
+                        "lines": args.lines, "seconds": t, "lines_per_s": lps})
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "runs": args.runs,
+                "startup": startup,
+                "results": results,
+            }, f, indent=1)
+
+if __name__=="__main__":
+    main()
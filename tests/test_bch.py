@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# The numpy batch repair gives the same results as nnrepair() per block.
+
+import os
+import sys
+import random
+import pytest
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, TOP)
+
+np=pytest.importorskip("numpy")
+import bch
+
+COUNT=5000
+
+def blocks(poly, seed):
+    """random blocks and codewords with up to errors+1 injected bit errors"""
+    (bits, _, errors)=bch.CODES[poly]
+    rng=random.Random(seed)
+    r=poly.bit_length()-1
+    nums=[rng.getrandbits(bits) for _ in range(COUNT)]
+    for _ in range(COUNT):
+        data=rng.getrandbits(bits-r)<<r
+        num=data^bch.nndivide(poly, data)
+        for b in rng.sample(range(bits), rng.randint(0, errors+1)):
+            num^=1<<b
+        nums.append(num)
+    return nums
+
+@pytest.mark.parametrize("poly", list(bch.CODES))
+def test_batch_repair(poly):
+    bch.setup(poly)
+    nums=blocks(poly, seed=poly)
+    (errs, repaired)=bch.nnrepair_batch(poly, np.array(nums, dtype=np.uint32))
+    assert list(bch.nndivide_batch(poly, nums))==[bch.nndivide(poly, x) for x in nums]
+    assert [(int(e), int(x)) for (e, x) in zip(errs, repaired)]==[bch.nnrepair(poly, x) for x in nums]
+    assert {-1, 0, 1} <= set(errs.tolist())
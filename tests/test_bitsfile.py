@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# The bits container converts back to the original text file, and reading
+# a time range gives the same bursts as filtering the text lines.
+
+import os
+import re
+import sys
+import subprocess
+import pytest
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, TOP)
+
+import framegen
+import bitsfile
+
+def make_lines():
+    """RAW lines of several files, some with A:OK, and lines that are
+    kept as text"""
+    out=[]
+    for (n, line) in enumerate(framegen.lines(3000, mix="capture", seed=1)):
+        line=line.replace("i-1598047209-t1", "i-1598047209-t%d"%(1+n//1000))
+        if n%7==0:
+            line=re.sub(r"N:\S+", "A:OK", line)
+        if n%500==0:
+            out.append("# comment %d"%n)
+            out.append(line+" ") # not in the exact extractor format
+            out.append(line.replace("RAW:", "RAW: "))
+            out.append("RAW: truncated ünicode")
+            out.append("")
+        out.append(line)
+    return out
+
+@pytest.fixture(scope="module")
+def files(tmp_path_factory):
+    tmp=tmp_path_factory.mktemp("bitsfile")
+    (text, packed)=(str(tmp/"test.bits"), str(tmp/"test.irbits"))
+    with open(text, "w") as f:
+        f.write("".join(line+"\n" for line in make_lines()))
+    subprocess.run([sys.executable, os.path.join(TOP, "bitsfile.py"), "pack", text, packed], check=True)
+    return (text, packed)
+
+def test_roundtrip(files, tmp_path):
+    (text, packed)=files
+    unpacked=str(tmp_path/"unpacked.bits")
+    subprocess.run([sys.executable, os.path.join(TOP, "bitsfile.py"), "unpack", packed, unpacked], check=True)
+    with open(text, "rb") as a, open(unpacked, "rb") as b:
+        assert a.read()==b.read()
+
+def test_stored(files):
+    """most lines are stored as bursts, the odd ones as text"""
+    bf=bitsfile.BitsFile(files[1])
+    recs=list(bf.records())
+    bf.close()
+    texts=[g for (_, g) in recs if isinstance(g, str)]
+    assert len(texts)==5*6
+    assert len(recs)==len(make_lines())
+    assert [n for (n, _) in recs]==list(range(1, len(recs)+1))
+    assert len(bf.blocks)>1
+    assert any(g[6]=="OK" for (_, g) in recs if not isinstance(g, str))
+    assert len({g[1] for (_, g) in recs if not isinstance(g, str)})==3
+
+@pytest.mark.parametrize("start,end", [
+    (None, 2000),
+    (4000.5, 9000),
+    (12000, None),
+    (100000, None),
+])
+def test_range(files, start, end):
+    expected=[]
+    for line in make_lines():
+        m=bitsfile.line_p.match(line)
+        if m:
+            ts=float(m.group(3))
+            if (start is None or ts>=start) and (end is None or ts<=end):
+                expected.append(line)
+    bf=bitsfile.BitsFile(files[1])
+    got=[bitsfile.to_line(g) for (_, g) in bf.records(start, end)]
+    bf.close()
+    assert got==expected
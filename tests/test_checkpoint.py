@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# --checkpoint continues after the already parsed part of a growing file.
+
+import os
+import sys
+import subprocess
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, TOP)
+
+import framegen
+
+def parse(*args):
+    out=subprocess.run([sys.executable, os.path.join(TOP, "iridium-parser.py"), "-o", "line", "--no-stats"]+list(args),
+            capture_output=True, text=True, cwd=TOP).stdout
+    return out.splitlines()
+
+def test_grown_file(tmp_path):
+    lines=list(framegen.lines(40, mix="capture", seed=1))
+    bits=str(tmp_path/"test.bits")
+    with open(bits, "w") as f:
+        f.write("".join(line+"\n" for line in lines[:20]))
+    first=parse("--checkpoint", bits)
+    assert len(first)==20
+    assert parse("--checkpoint", bits)==[] # nothing new
+
+    with open(bits, "a") as f:
+        f.write("".join(line+"\n" for line in lines[20:]))
+    second=parse("--checkpoint", bits)
+    assert first+second==parse(bits)
+    assert len(second)==20
+
+def test_replaced_file(tmp_path):
+    lines=list(framegen.lines(20, mix="capture", seed=1))
+    bits=str(tmp_path/"test.bits")
+    with open(bits, "w") as f:
+        f.write("".join(line+"\n" for line in lines))
+    parse("--checkpoint", bits)
+    os.unlink(bits)
+    with open(bits, "w") as f:
+        f.write("".join(line+"\n" for line in lines[:10]))
+    assert len(parse("--checkpoint", bits))==10
+
+def test_killed(tmp_path):
+    """output written after the last checkpoint isn't duplicated"""
+    import json
+    import time
+    lines=list(framegen.lines(25000, types=["ISY", "NXT"], seed=1)) # quick to parse
+    bits=str(tmp_path/"test.bits")
+    with open(bits, "w") as f:
+        f.write("".join(line+"\n" for line in lines))
+    cmd=[sys.executable, os.path.join(TOP, "iridium-parser.py"), "-o", "file", "--no-stats", "--checkpoint", bits]
+    (ckpt, parsed)=(bits+".ckpt", str(tmp_path/"test.parsed"))
+
+    p=subprocess.Popen(cmd, cwd=str(tmp_path))
+    try:
+        while p.poll() is None:
+            try:
+                with open(ckpt) as f:
+                    ck=json.load(f)
+            except (OSError, ValueError):
+                ck=None
+            if ck is not None and os.path.getsize(parsed)>ck['output']:
+                break
+            time.sleep(0.01)
+    finally:
+        p.kill()
+        p.wait()
+    assert not ck['done']
+    assert os.path.getsize(parsed)>ck['output'] # killed between two saves
+
+    subprocess.run(cmd, cwd=str(tmp_path), check=True)
+    with open(parsed) as f:
+        assert f.read().splitlines()==parse(bits)
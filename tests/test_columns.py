@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ColumnWriter output loads back with the same values, in both layouts.
+
+import os
+import sys
+import math
+import random
+import pytest
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, TOP)
+
+np=pytest.importorskip("numpy")
+import columns
+
+class IridiumRAMessage(object):
+    pass
+
+class IridiumBCMessage(object):
+    pass
+
+FIELDS=["globalns", "frequency", "type", "confidence", "level", "ra_alt", "ra_sat", "bc_name"]
+
+def frames(count, seed=1):
+    rng=random.Random(seed)
+    for n in range(count):
+        q=rng.choice((IridiumRAMessage, IridiumBCMessage))()
+        q.globalns=1598047209*10**9+n*10**6
+        q.frequency=rng.randrange(1616000000, 1627000000)
+        q.confidence=rng.randrange(101)
+        q.level=rng.random()
+        if isinstance(q, IridiumRAMessage):
+            q.ra_alt=rng.randrange(-100, 900)
+            q.ra_sat=rng.randrange(128)
+        else:
+            q.bc_name="sat:%d"%rng.randrange(5)
+        yield q
+
+@pytest.mark.parametrize("name", ["out.cols", "out.npz"])
+def test_roundtrip(tmp_path, monkeypatch, name):
+    monkeypatch.setattr(columns, "CHUNK_ROWS", 100)
+    path=str(tmp_path/name)
+    qs=list(frames(1050))
+    w=columns.ColumnWriter(path, FIELDS)
+    for q in qs[:500]:
+        w.add(q)
+    w.extend([columns.row(q, FIELDS) for q in qs[500:]])
+    w.close()
+
+    (cols, schema)=columns.load(path)
+    assert schema["rows"]==len(qs)
+    assert {f["name"]: f["dtype"] for f in schema["fields"]}=={"globalns": "<i8", "frequency": "<i8", "type": "<i4",
+            "confidence": "u1", "level": "<f8", "ra_alt": "<f8", "ra_sat": "<f8", "bc_name": "<i4"}
+    types=schema["categories"]["type"]
+    names=schema["categories"]["bc_name"]
+    for (i, q) in enumerate(qs):
+        assert cols["globalns"][i]==q.globalns
+        assert cols["frequency"][i]==q.frequency
+        assert cols["confidence"][i]==q.confidence
+        assert cols["level"][i]==q.level
+        assert types[cols["type"][i]]==type(q).__name__
+        if isinstance(q, IridiumRAMessage):
+            assert cols["ra_alt"][i]==q.ra_alt
+            assert cols["ra_sat"][i]==q.ra_sat
+            assert cols["bc_name"][i]==-1
+        else:
+            assert math.isnan(cols["ra_alt"][i])
+            assert math.isnan(cols["ra_sat"][i])
+            assert names[cols["bc_name"][i]]==q.bc_name
+    if name.endswith(".cols"):
+        assert isinstance(cols["globalns"], np.memmap)
+
+def test_empty(tmp_path):
+    for name in ("out.cols", "out.npz"):
+        path=str(tmp_path/name)
+        columns.ColumnWriter(path, FIELDS).close()
+        (cols, schema)=columns.load(path)
+        assert schema["rows"]==0
+        assert all(len(c)==0 for c in cols.values())
+
+def test_parser(tmp_path):
+    """-o columns has a row for every frame of -o line -e"""
+    import subprocess
+    import framegen
+    bits=str(tmp_path/"test.bits")
+    with open(bits, "w") as f:
+        f.write("".join(line+"\n" for line in framegen.lines(300, mix="capture", seed=1)))
+    parser=[sys.executable, os.path.join(TOP, "iridium-parser.py"), "--no-stats", "-e"]
+    lines=subprocess.run(parser+["-o", "line", bits], capture_output=True, text=True, cwd=TOP).stdout.splitlines()
+    path=str(tmp_path/"out.npz")
+    subprocess.run(parser+["-o", "columns", "--columns", path, bits], check=True, cwd=TOP)
+    (cols, schema)=columns.load(path)
+    assert schema["rows"]==len(lines)
+    assert [int(line.split()[3]) for line in lines]==cols["frequency"].tolist()
+
+@pytest.mark.parametrize("name", ["out.cols", "out.npz"])
+def test_late_strings(tmp_path, monkeypatch, name):
+    """a column without values or with numbers in the first chunk still
+    takes strings later"""
+    monkeypatch.setattr(columns, "CHUNK_ROWS", 100)
+    path=str(tmp_path/name)
+    qs=[IridiumRAMessage() for _ in range(250)]
+    for (i, q) in enumerate(qs):
+        if i>=150:
+            q.bc_name="sat:%d"%(i%3)
+        if i%2==0:
+            q.ra_sat=i if i<120 else "x%d"%i
+    w=columns.ColumnWriter(path, ["bc_name", "ra_sat"])
+    for q in qs:
+        w.add(q)
+    w.close()
+
+    (cols, schema)=columns.load(path)
+    assert schema["rows"]==len(qs)
+    assert {f["name"]: f["dtype"] for f in schema["fields"]}=={"bc_name": "<i4", "ra_sat": "<i4"}
+    for (col, default) in (("bc_name", None), ("ra_sat", None)):
+        categories=schema["categories"][col]
+        got=[None if c==-1 else categories[c] for c in cols[col].tolist()]
+        assert got==[None if getattr(q, col, default) is None else str(getattr(q, col)) for q in qs]
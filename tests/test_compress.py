@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# --compress gives the same output as without it, and reassembler.py
+# reads the compressed files.
+
+import os
+import sys
+import bz2
+import gzip
+import lzma
+import subprocess
+import pytest
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, TOP)
+
+import framegen
+
+OPEN={"gz": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+def parse(cwd, *args):
+    subprocess.run([sys.executable, os.path.join(TOP, "iridium-parser.py"), "--no-stats"]+list(args),
+            check=True, capture_output=True, cwd=cwd)
+
+@pytest.fixture(scope="module")
+def bits(tmp_path_factory):
+    tmp=tmp_path_factory.mktemp("compress")
+    name=str(tmp/"test.bits")
+    with open(name, "w") as f:
+        f.write("".join(line+"\n" for line in framegen.lines(1500, mix="capture", seed=1)))
+    parse(str(tmp), "-o", "file", name)
+    return name
+
+@pytest.mark.parametrize("comp", ["gz", "bz2", "xz"])
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_file(bits, tmp_path, comp, jobs):
+    parse(str(tmp_path), "-o", "file", "--compress", comp, "-j", str(jobs), bits)
+    with OPEN[comp](str(tmp_path/("test.parsed."+comp)), "rb") as f:
+        data=f.read()
+    with open(os.path.splitext(bits)[0]+".parsed", "rb") as f:
+        assert data==f.read()
+
+def test_reassembler(bits, tmp_path):
+    # the reassembler loads all its modes, some of them need these
+    pytest.importorskip("scipy")
+    pytest.importorskip("pyproj")
+    parse(str(tmp_path), "-o", "file", "--compress", "xz", bits)
+    def reassemble(filename):
+        return subprocess.run([sys.executable, os.path.join(TOP, "reassembler.py"), "-m", "ira", "-i", filename],
+                check=True, capture_output=True, text=True, cwd=str(tmp_path)).stdout
+    out=reassemble(os.path.splitext(bits)[0]+".parsed")
+    assert out
+    assert reassemble(str(tmp_path/"test.parsed.xz"))==out
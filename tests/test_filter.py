@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# --filter stops decoding early, but that doesn't change the output or
+# what --errorfile reports.
+
+import os
+import sys
+import subprocess
+import pytest
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, TOP)
+
+import framegen
+
+@pytest.fixture(scope="module")
+def bits(tmp_path_factory):
+    name=str(tmp_path_factory.mktemp("filter")/"test.bits")
+    with open(name, "w") as f:
+        f.write("".join(line+"\n" for line in framegen.lines(1000, mix="capture", errors=1, seed=1)))
+    return name
+
+def parse(bits, *args):
+    out=subprocess.run([sys.executable, os.path.join(TOP, "iridium-parser.py"), "-o", "line", "--no-stats"]+list(args)+[bits],
+            capture_output=True, text=True, check=True, cwd=TOP).stdout
+    return out.splitlines()
+
+def errors(bits, tmp_path, *args):
+    errfile=str(tmp_path/"errors")
+    parse(bits, "--errorfile", errfile, *args)
+    with open(errfile) as f:
+        return f.read().splitlines()
+
+@pytest.mark.parametrize("linefilter", [
+    "All,q.frequency>1625000000",
+    "IridiumRAMessage,q.confidence>80",
+    "IridiumVOMessage",
+    "IridiumLCW3Message",
+])
+def test_same_output(bits, tmp_path, linefilter):
+    """with --errorfile the lines are decoded without the push-down"""
+    out=parse(bits, "-e", "--filter", linefilter)
+    assert out
+    assert parse(bits, "-e", "--filter", linefilter, "--errorfile", str(tmp_path/"errors"))==out
+
+def test_check_errors(bits, tmp_path):
+    """a check doesn't turn lines into errors"""
+    assert errors(bits, tmp_path, "--filter", "All,q.frequency>1625000000")==errors(bits, tmp_path)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# The synthetic frames of framegen.py decode as the type they were made for.
+
+import os
+import sys
+import subprocess
+import pytest
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, TOP)
+
+import framegen
+
+def parse(lines):
+    out=subprocess.run([sys.executable, os.path.join(TOP, "iridium-parser.py"), "-o", "line", "--no-stats"],
+            input="".join(line+"\n" for line in lines), capture_output=True, text=True, cwd=TOP).stdout
+    return out.splitlines()
+
+@pytest.mark.parametrize("typ", [t for t in framegen.GENERATORS if t!="ERR"])
+def test_frame_type(typ):
+    out=parse(framegen.lines(20, types=[typ], seed=1))
+    assert len(out)==20
+    for line in out:
+        assert line.split(":")[0]==typ
+        assert "ERR:" not in line
+
+def test_mix():
+    out=parse(framegen.lines(200, mix="capture", seed=1))
+    assert len(out)==200
+    assert len({line.split(":")[0] for line in out})>10
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Startup time budget: the import time of iridium-parser.py (as reported by
+# python -X importtime, with compiled bytecode) on top of the one of a bare
+# interpreter (site, .pth files) must stay below BUDGET_MS. Measured 17 ms
+# for the parser and 14 ms for bitsparser alone on a slow machine, the
+# default leaves 3x slack, IMPORTTIME_BUDGET_MS overrides it.
+
+import os
+import sys
+import subprocess
+import pytest
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BUDGET_MS=float(os.environ.get("IMPORTTIME_BUDGET_MS", 3*17))
+RUNS=5
+
+@pytest.fixture(scope="module")
+def pycache(tmp_path_factory):
+    """keep the compiled bytecode out of the source tree"""
+    return str(tmp_path_factory.mktemp("pycache"))
+
+def importtime(args, pycache):
+    """total import time in ms of the fastest of RUNS runs"""
+    env=dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPYCACHEPREFIX"]=pycache
+    # write the bytecode first
+    subprocess.run([sys.executable]+args, cwd=TOP, env=env, capture_output=True)
+    best=None
+    for _ in range(RUNS):
+        err=subprocess.run([sys.executable, "-X", "importtime"]+args, cwd=TOP, env=env, capture_output=True, text=True).stderr
+        total=0
+        for line in err.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            (_, cumulative, name)=line[len("import time:"):].split("|")
+            if not name.startswith("  "): # only top level imports
+                total+=int(cumulative)
+        if best is None or total<best:
+            best=total
+    return best/1000
+
+@pytest.mark.parametrize("args", [
+    ["iridium-parser.py", "-o", "line", os.devnull],
+    ["-c", "import bitsparser"],
+])
+def test_importtime(args, pycache):
+    ms=importtime(args, pycache)-importtime(["-c", "pass"], pycache)
+    assert ms < BUDGET_MS, "import time %.1f ms over budget of %.1f ms"%(ms, BUDGET_MS)
+
+def test_no_eager_tables(pycache):
+    """codec tables are only built when first used"""
+    env=dict(os.environ, PYTHONPYCACHEPREFIX=pycache)
+    out=subprocess.run([sys.executable, "-c", "import bitsparser, bch; print(len(bch.syndromes))"],
+            cwd=TOP, env=env, capture_output=True, text=True).stdout
+    assert out.split()[-1]=="1" # only the IBC header code (29), checked at import
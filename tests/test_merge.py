@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# iridium-merge.py puts the lines of several inputs back in time order.
+
+import os
+import sys
+import subprocess
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, TOP)
+
+import framegen
+
+def merge(*args):
+    return subprocess.run([sys.executable, os.path.join(TOP, "iridium-merge.py")]+list(args),
+            capture_output=True, text=True, check=True, cwd=TOP).stdout
+
+def test_merge(tmp_path):
+    lines=list(framegen.lines(500, mix="capture", seed=1))
+    (a, b)=(str(tmp_path/"a.bits"), str(tmp_path/"b.bits"))
+    with open(a, "w") as f:
+        f.write("".join(line+"\n" for line in lines[0::2]))
+    with open(b, "w") as f:
+        f.write("\n".join(lines[1::2])) # truncated, no newline at the end
+    assert merge(a, b)=="".join(line+"\n" for line in lines)
+
+def test_offset(tmp_path):
+    lines=list(framegen.lines(100, mix="capture", seed=1))
+    a=str(tmp_path/"a.bits")
+    with open(a, "w") as f:
+        f.write("".join(line+"\n" for line in lines))
+    out=merge("--offset", "1000.5", a).splitlines()
+    assert len(out)==len(lines)
+    for (line, shifted) in zip(lines, out):
+        (f, g)=(line.split(" "), shifted.split(" "))
+        assert float(g[2])==round(float(f[2])+1000.5, 4)
+        assert len(g[2])==len(f[2])
+        assert f[:2]+f[3:]==g[:2]+g[3:]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# rs.py and rs6.py (RSCodec) give the same results as the reedsolo
+# path they replace, for correctable and uncorrectable codewords.
+
+import os
+import sys
+import random
+import pytest
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, TOP)
+
+import rs
+import rs6
+import reedsolo
+import reedsolo6
+
+reedsolo.init_tables(prim=rs.prim, generator=rs.generator, c_exp=rs.c_exp)
+reedsolo6.init_tables(prim=rs6.prim, generator=rs6.generator, c_exp=rs6.c_exp)
+
+CASES=1500
+
+def ref_fix(rsmod, reedsolomod, data):
+    """rs_fix() as it was implemented with reedsolo"""
+    data=data+([0]*rsmod.elen)
+    r=list(range(len(data)-rsmod.elen, len(data)))
+    try:
+        (cmsg,crs)=reedsolomod.rs_correct_msg(data, rsmod.nsym+rsmod.elen, rsmod.fcr, rsmod.generator, erase_pos=r)
+    except reedsolomod.ReedSolomonError:
+        return (False,None,None)
+    except ZeroDivisionError:
+        return (False,None,None)
+    return (True,list(cmsg),list(crs[:rsmod.nsym]))
+
+def ref_check(rsmod, reedsolomod, data):
+    mlen=len(data)-rsmod.nsym
+    msg=reedsolomod.rs_encode_msg(data[:mlen], rsmod.nsym+rsmod.elen, fcr=rsmod.fcr)
+    return bytearray(data[mlen:])==msg[mlen:len(data)]
+
+def words(rsmod, reedsolomod, length, seed):
+    """codewords with 0 up to nsym symbol errors, and random words"""
+    rng=random.Random(seed)
+    symbols=1<<rsmod.c_exp
+    mlen=length-rsmod.nsym
+    for n in range(CASES):
+        if n%4==3:
+            yield [rng.randrange(symbols) for _ in range(length)]
+            continue
+        msg=[rng.randrange(symbols) for _ in range(mlen)]
+        data=list(reedsolomod.rs_encode_msg(msg, rsmod.nsym+rsmod.elen, fcr=rsmod.fcr)[:length])
+        for pos in rng.sample(range(length), rng.randint(0, rsmod.nsym)):
+            data[pos]^=rng.randrange(1, symbols)
+        yield data
+
+@pytest.mark.parametrize("rsmod,reedsolomod,length", [
+    (rs, reedsolo, 39),
+    (rs6, reedsolo6, 52),
+], ids=["rs", "rs6"])
+def test_same_as_reedsolo(rsmod, reedsolomod, length):
+    failed=0
+    for data in words(rsmod, reedsolomod, length, seed=1):
+        (ok, cmsg, crs)=rsmod.rs_fix(data)
+        if ok:
+            (cmsg, crs)=(list(cmsg), list(crs))
+        assert (ok, cmsg, crs)==ref_fix(rsmod, reedsolomod, data), data
+        assert rsmod.rs_check(data)==ref_check(rsmod, reedsolomod, data), data
+        failed+=not ok
+    # both outcomes are covered
+    assert 0<failed<CASES
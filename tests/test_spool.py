@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# --spool parses a complete file like a normal run and moves it to done/.
+
+import os
+import sys
+import time
+import subprocess
+import pytest
+
+TOP=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, TOP)
+
+import framegen
+
+PARSER=[sys.executable, os.path.join(TOP, "iridium-parser.py"), "--no-stats"]
+
+def spool(spooldir, outdir, *args):
+    """run --spool until the files in spooldir have been moved to done/"""
+    names=[e for e in os.listdir(spooldir) if not e.startswith(".")]
+    p=subprocess.Popen(PARSER+["--spool", spooldir, "--spool-out", outdir, "--spool-settle", "0", "--spool-interval", "0.1"]+list(args),
+            stderr=subprocess.DEVNULL, cwd=TOP)
+    try:
+        deadline=time.time()+30
+        while not all(os.path.exists(os.path.join(spooldir, "done", name)) for name in names):
+            assert time.time()<deadline, "spool timed out"
+            time.sleep(0.1)
+    finally:
+        p.terminate()
+        p.wait()
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_spool(tmp_path, jobs):
+    (spooldir, outdir)=(tmp_path/"spool", tmp_path/"out")
+    spooldir.mkdir()
+    for n in range(2):
+        with open(spooldir/("i-%d-t1.bits"%n), "w") as f:
+            f.write("".join(line+"\n" for line in framegen.lines(500, mix="capture", errors=3, seed=n)))
+    spool(str(spooldir), str(outdir), "-j", str(jobs), "--errorfile", str(tmp_path/"errors"))
+
+    expected=""
+    for n in range(2):
+        done=str(spooldir/"done"/("i-%d-t1.bits"%n))
+        errfile=str(tmp_path/("errors.%d"%n))
+        out=subprocess.run(PARSER+["-o", "line", "--errorfile", errfile, done], capture_output=True, text=True, cwd=TOP).stdout
+        with open(outdir/("i-%d-t1.parsed"%n)) as f:
+            assert f.read()==out
+        with open(errfile) as f:
+            expected+=f.read()
+    assert os.listdir(spooldir)==["done"]
+    assert expected
+    with open(tmp_path/"errors") as f:
+        assert f.read()==expected
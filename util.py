@@ -114,6 +114,9 @@ def to_ascii(data, dot=False, escape=False, mask=False):
 def bitdiff(a, b):
     return sum(x != y for x, y in zip(a, b))
 
+def popcount(x):
+    return bin(x).count("1")
+
 def objprint(q):
     for i in dir(q):
         attr = getattr(q, i)